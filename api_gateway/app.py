@@ -44,6 +44,11 @@ def read_root():
 db = Database(Settings.POSTGRES_CONFIG)
 volume_tracker = VolumeTracker(db)
 
+@app.on_event("shutdown")
+def close_database():
+    logger.info(f"Closing database pool: {db.get_pool_metrics()}")
+    db.close()
+
 @app.get("/dex_volume")
 async def get_dex_volume(
     start_time: int,
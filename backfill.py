@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from database import Database
+from config.settings import Settings
+from factory.pipeline_factory import PipelineFactory
+from pipelines.backfill import Backfill
+from pipelines.ingestion import ingest
+from pipelines.process_pool import close_process_pool
+from query.transport import get_async_transport
+
+logging.basicConfig(
+    filename='maintenance.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the history of a DEX, resuming the windows left by earlier runs")
+    parser.add_argument("dex", help="DEX ID, such as uniswap_v3")
+    parser.add_argument("start", type=datetime.fromisoformat, help="Start of the range, ISO date or datetime")
+    parser.add_argument("end", type=datetime.fromisoformat, nargs="?", default=None, help="End of the range, defaults to now")
+    parser.add_argument("--workers", type=int, default=Settings.BACKFILL_WORKERS, help="Windows processed concurrently")
+    parser.add_argument("--live", action="store_true", help="Also run live ingestion of DEXES, ahead of the backfill")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    try:
+        db = Database(Settings.POSTGRES_CONFIG)
+        backfill = Backfill(
+            PipelineFactory.get_pipeline(args.dex, db),
+            args.start,
+            args.end or datetime.now(),
+            workers=args.workers,
+        )
+        if not args.live:
+            await backfill.run()
+            return
+
+        # The live loop never returns, stop it once the backfill is done
+        live = asyncio.create_task(ingest(PipelineFactory.load_pipelines(db, Settings.DEXES)))
+        try:
+            await backfill.run()
+        finally:
+            live.cancel()
+            await asyncio.gather(live, return_exceptions=True)
+
+    except Exception as e:
+        logger.error(f"Backfill failed: {str(e)}", exc_info=True)
+        raise
+
+    finally:
+        await get_async_transport().close()
+        close_process_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
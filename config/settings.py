@@ -15,17 +15,97 @@ class Settings:
         "port": int(os.getenv('DB_PORT')) if os.getenv('DB_PORT') else 5432,
     }
     BATCH_SIZE = 1000
+
+    # Connection pool shared by every thread using a Database
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))  # Connections opened up front and kept open
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))  # Connections open at most, further checkouts wait
+    DB_POOL_TIMEOUT = timedelta(seconds=30)  # Wait for a free connection before giving up
+    DB_POOL_MAX_LIFETIME = timedelta(minutes=30)  # Connections older than this are replaced
+    DB_POOL_CHECK_IDLE = timedelta(seconds=30)  # Connections idle longer than this are pinged before use
+
+    # Event insert settings
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 100000))  # Known token ids kept in memory, only unknown tokens are written
+    COPY_MIN_ROWS = int(os.getenv('COPY_MIN_ROWS', 500))  # Event rows of one table in a batch loaded with COPY instead of INSERT, 0 never copies
     
     DEXES = os.getenv('DEXES').split(',')
     
     # Time-based partition settings
     PARTITION_INTERVAL = timedelta(days=90)  # 3-month partitions
+    PARTITION_AHEAD = int(os.getenv('PARTITION_AHEAD', 3))  # Months of partitions created ahead of the present
+    PARTITION_MAINTENANCE_INTERVAL = timedelta(hours=6)  # How often partitions ahead are provisioned and the registry reloaded
     
     # Query optimization settings
     MAX_QUERY_INTERVAL = timedelta(days=30)  # Maximum time range for a single query
     DEFAULT_QUERY_LIMIT = 1000
     QUERY_INTERVAL=os.getenv('QUERY_INTERVAL')
-    MAX_CONCURRENT_QUERIES=os.getenv('MAX_CONCURRENT_QUERIES')
+    MAX_CONCURRENT_QUERIES = int(os.getenv('MAX_CONCURRENT_QUERIES', 3))  # Subgraph requests in flight across all DEXes before the limiter adapts
+    QUERY_BATCH_SIZE = int(os.getenv('QUERY_BATCH_SIZE', 4))  # Logical queries combined into one request
+
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 4))  # Pages waiting between fetch, process and write stages
+    PROCESS_WORKERS = int(os.getenv('PROCESS_WORKERS', 0))  # Worker processes decoding and processing pages, 0 processes on threads
+
+    # 'transactions' pages transactions with nested events, 'events' pages each event entity directly
+    FETCH_MODE = os.getenv('FETCH_MODE', 'transactions')
+    STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'true').lower() == 'true'  # Decode transaction pages while they are received
+
+    SCHEDULER_MIN_INTERVAL = timedelta(seconds=15)  # Shortest interval between runs of a busy DEX
+    SCHEDULER_MAX_INTERVAL = timedelta(minutes=30)  # Longest interval between runs of a quiet DEX
+    SCHEDULER_TARGET_ROWS = int(os.getenv('SCHEDULER_TARGET_ROWS', 1000))  # Transactions a run should bring in, intervals adapt towards it
+    SCHEDULER_LAG_SAMPLES = 1000  # Recent runs the lag percentiles are computed over
+
+    # Share the live windows of the DEXes with other ingestors through the work_units table
+    WORK_QUEUE = os.getenv('WORK_QUEUE', 'false').lower() == 'true'
+    WORK_CONCURRENCY = int(os.getenv('WORK_CONCURRENCY', 4))  # Windows processed at once by one ingestor
+    WORK_WINDOW = timedelta(minutes=5)  # Width of a queued window
+    WORK_LEASE = timedelta(minutes=2)  # A window is claimed again when its ingestor sends no heartbeat for this long
+    WORK_SETTLE = timedelta(seconds=30)  # Windows are queued once they are over by this long
+    WORK_POLL_INTERVAL = timedelta(seconds=5)  # Wait before looking for work again when the queue is empty
+
+    # Compare stored per-minute event counts with the subgraph and refetch the minutes missing events
+    RECONCILE = os.getenv('RECONCILE', 'true').lower() == 'true'
+    RECONCILE_INTERVAL = timedelta(hours=1)  # How often the reconciliation job runs
+    RECONCILE_WINDOW = timedelta(hours=1)  # Span of events compared at once, the checkpoint moves by this much
+    RECONCILE_LAG = timedelta(hours=1)  # Only events older than this are reconciled
+
+    DEAD_LETTER_DIR = os.getenv('DEAD_LETTER_DIR', 'dead_letters')  # Pages that failed all their retries, replayed with replay_dead_letters.py
+
+    BACKFILL_CHUNK = timedelta(hours=6)  # Width of the windows a backfill is split into and tracked by
+    BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 4))  # Backfill windows processed concurrently
+    BACKFILL_PRIORITY = float(os.getenv('BACKFILL_PRIORITY', 0.25))  # Rate limiter weight of backfill requests relative to live ones
+
+    SUBGRAPH_HEAD_TTL = timedelta(seconds=15)  # How long the last indexed block of a subgraph is reused
+
+    # Pool metadata cache settings
+    POOL_CACHE_SIZE = int(os.getenv('POOL_CACHE_SIZE', 10000))  # Maximum number of pools kept in memory
+    POOL_CACHE_TTL = timedelta(minutes=10)  # Pools older than this are fetched again
+
+    # Sharded range fetch settings
+    SHARD_INITIAL_WINDOW = timedelta(hours=1)  # Width of the first sub-windows of a large range
+    SHARD_MIN_WINDOW = timedelta(minutes=1)  # Dense windows narrower than this are paged serially
+    SHARD_MAX_WINDOW = timedelta(hours=12)  # Sparse windows are merged up to this width
+
+    # HTTP transport settings
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))  # Kept-alive connections per host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))  # Seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 60))  # Seconds
+
+    # Gateway rate limiting shared by every DEX
+    RATE_LIMIT_RPS = float(os.getenv('RATE_LIMIT_RPS', 10))  # Requests per second allowed by the gateway
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 20))  # Requests sent at once after an idle period
+    RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv('RATE_LIMIT_MAX_CONCURRENCY', 16))  # Upper bound for requests in flight
+    RATE_LIMIT_TARGET_LATENCY = float(os.getenv('RATE_LIMIT_TARGET_LATENCY', 5))  # Seconds, slower responses shrink concurrency
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 60))  # Seconds, cap of the exponential retry backoff
+    # Priority weights as 'uniswap_v3:3,aerodrome:1', DEXes without a weight get 1
+    DEX_PRIORITIES = {
+        dex_id.strip(): float(weight)
+        for dex_id, weight in (item.split(':') for item in os.getenv('DEX_PRIORITIES', '').split(',') if item)
+    }
+
+    # Subgraph response cache: 'off', 'record', 'replay' or 'read_through'
+    RESPONSE_CACHE_MODE = os.getenv('RESPONSE_CACHE_MODE', 'off')
+    RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR', 'response_cache')
+    RESPONSE_CACHE_FINALITY = timedelta(hours=1)  # Windows that ended longer ago than this are final and cached
+    RESPONSE_CACHE_SEGMENT_SIZE = int(os.getenv('RESPONSE_CACHE_SEGMENT_SIZE', 256 * 1024 * 1024))  # Bytes per segment file
 
     # TheGraph API Key
     API_KEY = os.getenv('API_KEY')
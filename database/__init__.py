@@ -7,7 +7,10 @@ from .models import (
     FlashEvent,
     CollectEvent
 )
+from .partitions import PartitionRegistry
+from .pool import ConnectionPool, PoolTimeout
 from .schema import PostgresSchema
+from .token_cache import KnownTokens
 import psycopg2
 
 __all__ = [
@@ -18,5 +21,9 @@ __all__ = [
     'BurnEvent',
     'FlashEvent',
     'CollectEvent',
-    'PostgresSchema'
+    'PostgresSchema',
+    'ConnectionPool',
+    'PoolTimeout',
+    'PartitionRegistry',
+    'KnownTokens'
 ]
\ No newline at end of file
@@ -1,26 +1,88 @@
+import csv
+import io
 import logging
 import psycopg2
 import psycopg2.extras
 from psycopg2.extras import execute_values, RealDictCursor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from .models import Token
-from .schema import PostgresSchema
+from .partitions import PartitionRegistry
+from .pool import ConnectionPool
+from .schema import PARTITIONED_TABLES, TRANSACTION_UPSERT, PostgresSchema
+from .token_cache import KnownTokens
+from config.settings import Settings
 
 logger = logging.getLogger(__name__)
 
+# Tables holding events, every row starts with (id, transaction_id, timestamp)
+EVENT_TABLES = ['swaps', 'mints', 'burns']
+
+# Inserted columns of the transactions and event tables, in the order of the rows built by event_rows
+INSERT_COLUMNS = {
+    'transactions': ['id', 'timestamp', 'block_number', 'gas_used', 'gas_price'],
+    'swaps': [
+        'id', 'transaction_id', 'timestamp', 'dex_id',
+        'token0_symbol', 'token1_symbol', 'token0_id', 'token1_id',
+        'token0_name', 'token1_name',
+        'amount0', 'amount1', 'amount_usd', 'sender', 'recipient', 'origin',
+        'fee_tier', 'liquidity',
+    ],
+    'mints': [
+        'id', 'transaction_id', 'timestamp', 'dex_id',
+        'token0_symbol', 'token1_symbol', 'token0_id', 'token1_id',
+        'token0_name', 'token1_name',
+        'amount0', 'amount1', 'amount_usd', 'owner', 'origin',
+        'fee_tier', 'liquidity',
+    ],
+}
+INSERT_COLUMNS['burns'] = INSERT_COLUMNS['mints']
+
+# Conflict clause of the inserts into every table, events already stored are skipped
+ON_CONFLICT = {table: 'ON CONFLICT (timestamp, id) DO NOTHING' for table in EVENT_TABLES}
+ON_CONFLICT['transactions'] = TRANSACTION_UPSERT
+
+class _CopyNull:
+    """NULL in the COPY CSV rows, csv leaves numbers unquoted and COPY reads an unquoted empty field as NULL"""
+    def __index__(self):
+        return 0
+
+    def __str__(self):
+        return ''
+
+_COPY_NULL = _CopyNull()
+
 class Database:
-    def __init__(self, config: Dict[str, Any]):
-        """Initialize database connection"""
+    def __init__(self, config: Dict[str, Any], copy_min_rows: int = Settings.COPY_MIN_ROWS):
+        """
+        Initialize database connection pool
+
+        Args:
+            config: psycopg2 connection parameters
+            copy_min_rows: Rows of one table in a batch from which it is loaded with COPY, 0 always inserts
+        """
         self.config = config
+        self.copy_min_rows = copy_min_rows
         self.schema = PostgresSchema()
         self.ensure_database_exists()
+        self.pool = ConnectionPool(config)
+        self.partitions = PartitionRegistry()
+        self.known_tokens = KnownTokens()
         self._init_db()
+        self.provision_partitions()
         logger.info("Database initialized")
 
     def _get_connection(self):
-        """Get a database connection"""
-        return psycopg2.connect(**self.config)
+        """Check out a pooled connection for one transaction, returned to the pool when the block exits"""
+        return self.pool.connection()
+
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Report connection pool size and checkout wait times"""
+        return self.pool.get_metrics()
+
+    def close(self):
+        """Close the pooled connections"""
+        self.pool.close()
 
     def _init_db(self):
         """Initialize database schema"""
@@ -43,6 +105,7 @@ class Database:
         target_db = config.pop('dbname', None)
         config['dbname'] = 'postgres'  # Connect to default database
         
+        conn = None
         try:
             # Need to connect with autocommit for database creation
             conn = psycopg2.connect(**config)
@@ -59,206 +122,618 @@ class Database:
         except Exception as e:
             logger.error(f"Error ensuring database exists: {str(e)}", exc_info=True)
             raise
+        finally:
+            if conn is not None:
+                conn.close()
     
     def ensure_partitions(self, start_date: datetime, end_date: datetime):
-        """Ensure partitions exist for the given date range"""
+        """Ensure partitions exist for the given date range, only the ones missing from the registry are created"""
+        missing = [
+            (table, suffix, partition_start, partition_end)
+            for suffix, partition_start, partition_end in self.schema.get_partition_ranges(
+                start_date,
+                end_date + timedelta(days=1),  # Include end date
+            )
+            for table in PARTITIONED_TABLES
+            if not self.partitions.covers(table, partition_start, partition_end - 1)
+        ]
+        if not missing:
+            return
         try:
             with self._get_connection() as conn:
                 with conn.cursor() as cur:
-                    queries = self.schema.get_partition_queries(
-                        start_date,
-                        end_date + timedelta(days=1),  # Include end date
-                        timedelta(days=30)  # Monthly partitions
-                    )
-                    for query in queries:
-                        cur.execute(query)
-            logger.debug(f"Ensured partitions exist from {start_date} to {end_date}")
+                    for partition in missing:
+                        cur.execute(self.schema.get_partition_query(*partition))
+            for table, _, partition_start, partition_end in missing:
+                self.partitions.add(table, partition_start, partition_end)
+            logger.info(f"Created {len(missing)} partitions from {start_date} to {end_date}")
         except Exception as e:
             logger.error(f"Error ensuring partitions: {str(e)}", exc_info=True)
             raise
-    
+
+    def load_partitions(self):
+        """Reload the partition registry from the catalog, picking up partitions created by other processes"""
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(self.schema.get_partition_bounds_query(), (PARTITIONED_TABLES,))
+                    self.partitions.load(cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error loading partitions: {str(e)}", exc_info=True)
+            raise
+
+    def provision_partitions(self, months: int = Settings.PARTITION_AHEAD):
+        """
+        Reload the partition registry and create the partitions of the coming months
+
+        Run at startup and periodically, so inserts of live events find their partitions in the registry
+
+        Args:
+            months: Months of partitions to have ahead of the present
+        """
+        self.load_partitions()
+        now = datetime.utcnow()
+        self.ensure_partitions(now, now + timedelta(days=31 * months))
+
     # TODO: Make an separate function for inserting events, so that it can be used for other pipelines as well
     # Make a seperate file for the DB operations
     
-    def insert_transaction_batch(self, events_list: List[List]):
+    def insert_transaction_batch(self, events_list: List[List], watermark: Optional[Tuple[str, str, Tuple[int, str]]] = None):
         """
         Insert a batch of events into their respective tables
         
         Args:
             events_list: List containing lists of events [swaps, mints, burns, collects, flashs]
+            watermark: (dex_id, event_type, (timestamp, id)) of the last row of the batch, committed
+                in the same transaction as the events
+        """
+        self.insert_event_rows(self.event_rows(events_list), watermark)
+
+    def insert_event_rows(self, rows: Dict[str, List[tuple]], watermark: Optional[Tuple[str, str, Tuple[int, str]]] = None):
+        """
+        Insert rows built by event_rows, possibly in another process
+
+        Args:
+            rows: Insert-ready rows per table
+            watermark: (dex_id, event_type, (timestamp, id)) of the last row of the batch, committed
+                in the same transaction as the events
         """
         try:
-            # Extract timestamps from the batch
-            timestamps = [event.timestamp for events in events_list for event in events if events]
-            if timestamps:
-            # Determine the date range of the batch
-                start_date = datetime.utcfromtimestamp(min(timestamps))
-                end_date = datetime.utcfromtimestamp(max(timestamps))
+            # Determine the date range of the batch per table
+            bounds = {
+                table: (min(row[2] for row in rows[table]), max(row[2] for row in rows[table]))
+                for table in EVENT_TABLES if rows.get(table)
+            }
+            if bounds:
+                # Transactions share the timestamps of their events
+                bounds['transactions'] = (min(start for start, _ in bounds.values()), max(end for _, end in bounds.values()))
+            # Only batches outside the provisioned partitions, such as backfills, create partitions
+            if any(not self.partitions.covers(table, *bound) for table, bound in bounds.items()):
+                start_date = datetime.utcfromtimestamp(min(start for start, _ in bounds.values()))
+                end_date = datetime.utcfromtimestamp(max(end for _, end in bounds.values()))
                 self.ensure_partitions(start_date, end_date)  # Ensure partitions exist for the range
             # Insert events
             with self._get_connection() as conn:
                 with conn.cursor() as cur:
                     # Insert each type of event
-                    self._batch_insert_events(cur, events_list)
+                    token_ids = self._batch_insert_rows(cur, rows)
+                    if watermark:
+                        self._upsert_watermark(cur, *watermark)
+            self.known_tokens.add(token_ids)
                     
             logger.debug(f"Successfully inserted batch of events")
         except Exception as e:
             logger.error(f"Error inserting transaction batch: {str(e)}", exc_info=True)
             raise
 
-    def _batch_insert_events(self, cur, events_list: List[List]):
+    @staticmethod
+    def event_rows(events_list: List[List]) -> Dict[str, List[tuple]]:
         """
-        Insert events in batch
+        Convert events into insert-ready rows, in the column order of the insert statements
         
         Args:
-            cur: Database cursor
             events_list: List containing lists of events [swaps, mints, burns, collects, flashs]
+
+        Returns:
+            Rows per table, with the transactions of the events under 'transactions' and the
+            (id, symbol, name) of every token seen under 'token_metadata'
         """
-        logging.debug(f"Prepared {sum(len(events) for events in events_list)} transactions for insertion")
+        # Get the events from the list
+        swaps, mints, burns, collects, flashs = events_list
+
+        # Helper function to collect token metadata
+        def collect_token_metadata(events):
+            metadata = set()
+            for event in events:
+                metadata.add((event.token0_id, event.token0_symbol, event.token0_name))
+                metadata.add((event.token1_id, event.token1_symbol, event.token1_name))
+            return metadata
+
+        # Collect token metadata from all event types
+        token_metadata = set()
+        for event_list in [swaps, mints, burns]:
+            token_metadata.update(collect_token_metadata(event_list))
+
+        swap_values = [
+            (
+                swap.id,
+                swap.parent_transaction.id,
+                swap.timestamp,
+                swap.dex_id,
+                swap.token0_symbol,
+                swap.token1_symbol,
+                swap.token0_id,
+                swap.token1_id,
+                swap.token0_name,
+                swap.token1_name,
+                swap.amount0,
+                swap.amount1,
+                swap.amount_usd,
+                swap.sender,
+                swap.recipient,
+                swap.origin,
+                swap.fee_tier,
+                swap.liquidity
+                ) for swap in swaps if swap.amount0 is not None or swap.amount1 is not None
+            ]
+        mint_values = [
+            (
+                mint.id,
+                mint.parent_transaction.id,
+                mint.timestamp,
+                mint.dex_id,
+                mint.token0_symbol,
+                mint.token1_symbol,
+                mint.token0_id,
+                mint.token1_id,
+                mint.token0_name,
+                mint.token1_name,
+                mint.amount0,
+                mint.amount1,
+                mint.amount_usd,
+                mint.owner,
+                mint.origin,
+                mint.fee_tier,
+                mint.liquidity
+            ) for mint in mints if mint.amount0 is not None or mint.amount1 is not None
+        ]
+        burn_values = [
+            (
+                burn.id,
+                burn.parent_transaction.id,
+                burn.timestamp,
+                burn.dex_id,
+                burn.token0_symbol,
+                burn.token1_symbol,
+                burn.token0_id,
+                burn.token1_id,
+                burn.token0_name,
+                burn.token1_name,
+                burn.amount0,
+                burn.amount1,
+                burn.amount_usd,
+                burn.owner,
+                burn.origin,
+                burn.fee_tier,
+                burn.liquidity
+            ) for burn in burns if burn.amount0 is not None or burn.amount1 is not None
+        ]
+        # Transactions of the events kept, once per transaction
+        parents = {
+            (event.timestamp, event.parent_transaction.id): event.parent_transaction
+            for event_list in [swaps, mints, burns] for event in event_list
+        }
+        referenced = {(row[2], row[1]) for values in [swap_values, mint_values, burn_values] for row in values}
+        transaction_values = [
+            (
+                parents[key].id,
+                key[0],
+                parents[key].block_number,
+                parents[key].gas_used,
+                parents[key].gas_price
+            ) for key in sorted(referenced)
+        ]
+        # Note: Collect and Flash events are currently passed as empty lists
+        # Add implementation when needed
+        return {
+            'transactions': transaction_values,
+            'swaps': swap_values,
+            'mints': mint_values,
+            'burns': burn_values,
+            'token_metadata': list(token_metadata),
+        }
+
+    def _batch_insert_rows(self, cur, rows: Dict[str, List[tuple]]) -> List[str]:
+        """
+        Insert rows in batch
+
+        Tables with at least copy_min_rows rows in the batch are loaded with COPY through a
+        staging table, smaller ones with a multi-row INSERT. Only tokens missing from the
+        known tokens are written.
+
+        Args:
+            cur: Database cursor
+            rows: Insert-ready rows per table, as built by event_rows
+
+        Returns:
+            Ids of the tokens written, to remember once the transaction has committed
+        """
+        logging.debug(f"Prepared {sum(len(rows.get(table, [])) for table in EVENT_TABLES)} events for insertion")
         try:
-            # Get the events from the list
-            swaps, mints, burns, collects, flashs = events_list
-            logging.debug("Executing batch insert with SQL: ...")
-            
-            # Helper function to collect token metadata
-            def collect_token_metadata(events):
-                metadata = set()
-                for event in events:
-                    metadata.add((event.token0_id, event.token0_symbol, event.token0_name))
-                    metadata.add((event.token1_id, event.token1_symbol, event.token1_name))
-                return metadata
-            
-            # Collect token metadata from all event types
-            token_metadata = set()
-            for event_list in [swaps, mints, burns]:
-                token_metadata.update(collect_token_metadata(event_list))
-            
-            # Insert swaps
-            if swaps:
-                swap_values = [
-                    (
-                        swap.id,
-                        psycopg2.extras.Json(swap.parent_transaction.__dict__),
-                        swap.timestamp,
-                        swap.dex_id,
-                        swap.token0_symbol,
-                        swap.token1_symbol,
-                        swap.token0_id,
-                        swap.token1_id,
-                        swap.token0_name,
-                        swap.token1_name,
-                        swap.amount0,
-                        swap.amount1,
-                        swap.amount_usd,
-                        swap.sender,
-                        swap.recipient,
-                        swap.origin,
-                        swap.fee_tier,
-                        swap.liquidity
-                        ) for swap in swaps if swap.amount0 is not None or swap.amount1 is not None
-                    ]
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO swaps (
-                        id, parent_transaction, timestamp, dex_id,
-                        token0_symbol, token1_symbol, token0_id, token1_id,
-                        token0_name, token1_name,
-                        amount0, amount1, amount_usd, sender, recipient, origin,
-                        fee_tier, liquidity
-                    ) VALUES %s
-                    ON CONFLICT (timestamp, id) DO NOTHING;
-                    """,
-                    swap_values
-                )
-            
-            # Insert mints
-            if mints:
-                mint_values = [
-                    (
-                        mint.id,
-                        psycopg2.extras.Json(mint.parent_transaction.__dict__),
-                        mint.timestamp,
-                        mint.dex_id,
-                        mint.token0_symbol,
-                        mint.token1_symbol,
-                        mint.token0_id,
-                        mint.token1_id,
-                        mint.token0_name,
-                        mint.token1_name,
-                        mint.amount0,
-                        mint.amount1,
-                        mint.amount_usd,
-                        mint.owner,
-                        mint.origin,
-                        mint.fee_tier,
-                        mint.liquidity
-                    ) for mint in mints if mint.amount0 is not None or mint.amount1 is not None
-                ]
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO mints (
-                        id, parent_transaction, timestamp, dex_id,
-                        token0_symbol, token1_symbol, token0_id, token1_id,
-                        token0_name, token1_name,
-                        amount0, amount1, amount_usd, owner, origin,
-                        fee_tier, liquidity
-                    ) VALUES %s
-                    ON CONFLICT (timestamp, id) DO NOTHING
-                    """,
-                    mint_values
-                )
-            
-            # Insert burns
-            if burns:
-                burn_values = [
-                    (
-                        burn.id,
-                        psycopg2.extras.Json(burn.parent_transaction.__dict__),
-                        burn.timestamp,
-                        burn.dex_id,
-                        burn.token0_symbol,
-                        burn.token1_symbol,
-                        burn.token0_id,
-                        burn.token1_id,
-                        burn.token0_name,
-                        burn.token1_name,
-                        burn.amount0,
-                        burn.amount1,
-                        burn.amount_usd,
-                        burn.owner,
-                        burn.origin,
-                        burn.fee_tier,
-                        burn.liquidity
-                    ) for burn in burns if burn.amount0 is not None or burn.amount1 is not None
-                ]
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO burns (
-                        id, parent_transaction, timestamp, dex_id,
-                        token0_symbol, token1_symbol, token0_id, token1_id,
-                        token0_name, token1_name,
-                        amount0, amount1, amount_usd, owner, origin,
-                        fee_tier, liquidity
-                    ) VALUES %s
-                    ON CONFLICT (timestamp, id) DO NOTHING
-                    """,
-                    burn_values
-                )
-                
-            # Note: Collect and Flash events are currently passed as empty lists
-            # Add implementation when needed
-            
-            # Insert token metadata
-            if token_metadata:
-                self.insert_token_metadata(list(token_metadata))
+            # Transactions first, the events reference them
+            for table in PARTITIONED_TABLES:
+                if not rows.get(table):
+                    continue
+                if self.copy_min_rows and len(rows[table]) >= self.copy_min_rows:
+                    self._copy_insert_rows(cur, table, rows[table])
+                else:
+                    execute_values(
+                        cur,
+                        f"""
+                        INSERT INTO {table} ({', '.join(INSERT_COLUMNS[table])}) VALUES %s
+                        {ON_CONFLICT[table]}
+                        """,
+                        rows[table]
+                    )
+
+            # Insert token metadata of the tokens seen for the first time
+            tokens = self._unknown_tokens(rows.get('token_metadata', []))
+            if tokens:
+                self._insert_token_rows(cur, tokens)
+            return [token[0] for token in tokens]
 
         except Exception as e:
             logger.error(f"Error in batch insert: {str(e)}", exc_info=True)
             raise
 
+    def _copy_insert_rows(self, cur, table: str, rows: List[tuple]):
+        """
+        Stream rows into a staging table with COPY and merge them into the target table
+
+        The staging table is a temporary table of the pooled connection, created on its first
+        COPY and emptied when the transaction commits. Conflicts are resolved by the merge like
+        with the INSERT path.
+
+        Rows are sent in the CSV format with every string quoted, so an empty string stays
+        distinct from NULL.
+
+        Args:
+            cur: Database cursor
+            table: Transactions or event table
+            rows: Rows in the column order of INSERT_COLUMNS
+        """
+        columns = ', '.join(INSERT_COLUMNS[table])
+        staging = f"{table}_staging"
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+        writer.writerows(
+            tuple(_COPY_NULL if value is None else value for value in row) for row in rows
+        )
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute(f"""
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM {staging}
+            {ON_CONFLICT[table]}
+        """)
+        logger.debug(f"Copied {len(rows)} rows into {table}, {cur.rowcount} new or updated")
+
+    def migrate_transactions(self, table: str, start_timestamp: int, end_timestamp: int) -> Tuple[int, int]:
+        """
+        Move the parent_transaction JSONB of an event table's rows into the transactions table
+
+        Rows left by the old schema get their transaction stored once in transactions, their
+        transaction_id set and their JSONB cleared, in one transaction per call.
+
+        Args:
+            table: Event table
+            start_timestamp: Start of the rows to migrate, inclusive
+            end_timestamp: End of the rows to migrate, exclusive
+
+        Returns:
+            (transactions stored, event rows migrated)
+        """
+        if table not in EVENT_TABLES:
+            raise ValueError(f"Unknown event table: {table}")
+        insert_transactions, update_events = self.schema.get_transaction_migration_queries(table)
+        try:
+            self.ensure_partitions(
+                datetime.utcfromtimestamp(start_timestamp),
+                datetime.utcfromtimestamp(end_timestamp - 1)
+            )
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(insert_transactions, (start_timestamp, end_timestamp))
+                    transactions = cur.rowcount
+                    cur.execute(update_events, (start_timestamp, end_timestamp))
+                    return transactions, cur.rowcount
+        except Exception as e:
+            logger.error(f"Error migrating transactions of {table}: {str(e)}", exc_info=True)
+            raise
+
+    def finish_transaction_migration(self, table: str):
+        """
+        Drop the parent_transaction JSONB and its GIN index of an event table whose rows are all migrated
+
+        Raises:
+            ValueError: When rows of the table still lack their transaction_id
+        """
+        if table not in EVENT_TABLES:
+            raise ValueError(f"Unknown event table: {table}")
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT 1 FROM {table} WHERE transaction_id IS NULL LIMIT 1")
+                    if cur.fetchone():
+                        raise ValueError(f"{table} still has rows without transaction_id, migrate them first")
+                    for query in self.schema.get_transaction_migration_cleanup_queries(table):
+                        cur.execute(query)
+            logger.info(f"Dropped parent_transaction from {table}")
+        except Exception as e:
+            logger.error(f"Error finishing the transaction migration of {table}: {str(e)}", exc_info=True)
+            raise
+
+    def get_watermark(self, dex_id: str, event_type: str) -> Optional[Tuple[int, str]]:
+        """
+        Get the last (timestamp, id) committed for a DEX and event type.
+
+        Args:
+            dex_id: DEX ID
+            event_type: 'transactions' or the paged event entity, such as 'swaps'
+
+        Returns:
+            (timestamp, id) keyset cursor, None when nothing was committed yet
+        """
+        query = "SELECT cursor_timestamp, cursor_id FROM sync_state WHERE dex_id = %s AND event_type = %s"
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (dex_id, event_type))
+                    row = cur.fetchone()
+            return (row[0], row[1]) if row else None
+        except Exception as e:
+            logger.error(f"Error fetching watermark for {dex_id} {event_type}: {str(e)}", exc_info=True)
+            raise
+
+    def set_watermark(self, dex_id: str, event_type: str, cursor: Tuple[int, str]):
+        """Advance the watermark of a DEX and event type outside of an insert"""
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    self._upsert_watermark(cur, dex_id, event_type, cursor)
+            logger.debug(f"Set watermark of {dex_id} {event_type} to {cursor}")
+        except Exception as e:
+            logger.error(f"Error setting watermark for {dex_id} {event_type}: {str(e)}", exc_info=True)
+            raise
+
+    @staticmethod
+    def _upsert_watermark(cur, dex_id: str, event_type: str, cursor: Tuple[int, str]):
+        """Store a watermark, never moving it backwards. Ids compare bytewise like the subgraph orders them"""
+        cur.execute(
+            """
+            INSERT INTO sync_state (dex_id, event_type, cursor_timestamp, cursor_id)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (dex_id, event_type) DO UPDATE
+            SET cursor_timestamp = EXCLUDED.cursor_timestamp,
+                cursor_id = EXCLUDED.cursor_id,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE (sync_state.cursor_timestamp, sync_state.cursor_id COLLATE "C")
+                < (EXCLUDED.cursor_timestamp, EXCLUDED.cursor_id COLLATE "C")
+            """,
+            (dex_id, event_type, cursor[0], cursor[1])
+        )
+
+    def get_completed_chunks(self, dex_id: str, start_timestamp: int, end_timestamp: int) -> Set[Tuple[int, int]]:
+        """
+        Get the backfill windows of a DEX stored completely within a time range.
+
+        Args:
+            dex_id: DEX ID
+            start_timestamp: Start of the range
+            end_timestamp: End of the range
+
+        Returns:
+            (chunk_start, chunk_end) of every completed window
+        """
+        query = """
+            SELECT chunk_start, chunk_end FROM backfill_chunks
+            WHERE dex_id = %s AND chunk_start >= %s AND chunk_end <= %s
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (dex_id, start_timestamp, end_timestamp))
+                    return {(row[0], row[1]) for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Error fetching backfill chunks for {dex_id}: {str(e)}", exc_info=True)
+            raise
+
+    def complete_chunk(self, dex_id: str, chunk_start: int, chunk_end: int, transactions: int, events: int):
+        """Record a backfill window as stored, so a resumed backfill skips it"""
+        query = """
+            INSERT INTO backfill_chunks (dex_id, chunk_start, chunk_end, transactions, events)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (dex_id, chunk_start, chunk_end) DO UPDATE
+            SET transactions = EXCLUDED.transactions,
+                events = EXCLUDED.events,
+                completed_at = CURRENT_TIMESTAMP
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (dex_id, chunk_start, chunk_end, transactions, events))
+        except Exception as e:
+            logger.error(f"Error recording backfill chunk for {dex_id}: {str(e)}", exc_info=True)
+            raise
+
+    def enqueue_work_units(self, units: List[Tuple[str, int, int]]) -> int:
+        """
+        Add windows to the work queue, windows already queued by another ingestor are left alone.
+
+        Args:
+            units: (dex_id, window_start, window_end) of every window
+
+        Returns:
+            int: Number of windows added
+        """
+        if not units:
+            return 0
+        query = """
+            INSERT INTO work_units (dex_id, window_start, window_end)
+            VALUES %s
+            ON CONFLICT (dex_id, window_start, window_end) DO NOTHING
+            RETURNING id
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    return len(execute_values(cur, query, units, fetch=True))
+        except Exception as e:
+            logger.error(f"Error enqueuing work units: {str(e)}", exc_info=True)
+            raise
+
+    def get_work_frontier(self, dex_id: str) -> Optional[int]:
+        """Return the end of the last window queued for a DEX, None when nothing was queued yet"""
+        query = "SELECT MAX(window_end) FROM work_units WHERE dex_id = %s"
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (dex_id,))
+                    return cur.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Error fetching work frontier for {dex_id}: {str(e)}", exc_info=True)
+            raise
+
+    def claim_work_unit(self, owner: str, dex_ids: List[str], lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest pending window, or one whose lease expired, to an ingestor.
+
+        Rows locked by a concurrent claim are skipped rather than waited for, so ingestors
+        never block each other and never get the same window.
+
+        Args:
+            owner: Identifier of the claiming ingestor
+            dex_ids: DEXes the ingestor runs pipelines for
+            lease_seconds: Time the window is held without a heartbeat
+
+        Returns:
+            dict with id, dex_id, window_start, window_end and attempts, None when there is no work
+        """
+        query = """
+            UPDATE work_units
+            SET status = 'leased',
+                owner = %s,
+                lease_expires_at = NOW() + make_interval(secs => %s),
+                attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM work_units
+                WHERE dex_id = ANY(%s)
+                  AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW()))
+                ORDER BY window_start
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, dex_id, window_start, window_end, attempts
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(query, (owner, lease_seconds, list(dex_ids)))
+                    row = cur.fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error claiming work unit: {str(e)}", exc_info=True)
+            raise
+
+    def heartbeat_work_unit(self, unit_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease on a window, False when the lease was lost to another ingestor"""
+        query = """
+            UPDATE work_units
+            SET lease_expires_at = NOW() + make_interval(secs => %s)
+            WHERE id = %s AND owner = %s AND status = 'leased'
+            RETURNING id
+        """
+        return self._update_work_unit(query, (lease_seconds, unit_id, owner))
+
+    def complete_work_unit(self, unit_id: int, owner: str) -> bool:
+        """Mark a leased window as done, False when the lease was lost to another ingestor"""
+        query = """
+            UPDATE work_units
+            SET status = 'done', lease_expires_at = NULL, completed_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND owner = %s AND status = 'leased'
+            RETURNING id
+        """
+        return self._update_work_unit(query, (unit_id, owner))
+
+    def release_work_unit(self, unit_id: int, owner: str) -> bool:
+        """Hand a leased window back to the queue after a failure"""
+        query = """
+            UPDATE work_units
+            SET status = 'pending', owner = NULL, lease_expires_at = NULL
+            WHERE id = %s AND owner = %s AND status = 'leased'
+            RETURNING id
+        """
+        return self._update_work_unit(query, (unit_id, owner))
+
+    def reclaim_expired_leases(self) -> int:
+        """Return windows whose ingestor stopped sending heartbeats to the queue"""
+        query = """
+            UPDATE work_units
+            SET status = 'pending', owner = NULL, lease_expires_at = NULL
+            WHERE status = 'leased' AND lease_expires_at < NOW()
+            RETURNING id
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query)
+                    return len(cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error reclaiming expired leases: {str(e)}", exc_info=True)
+            raise
+
+    def _update_work_unit(self, query: str, params: tuple) -> bool:
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
+                    return cur.fetchone() is not None
+        except Exception as e:
+            logger.error(f"Error updating work unit: {str(e)}", exc_info=True)
+            raise
+
+    def count_events(self, event_type: str, dex_id: str, start_timestamp: int, end_timestamp: int, bucket: int = 60) -> Dict[int, int]:
+        """
+        Count the stored events of a DEX per time bucket.
+
+        Args:
+            event_type: Event table, such as 'swaps'
+            dex_id: DEX ID
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp (inclusive)
+            bucket: Width of the buckets in seconds
+
+        Returns:
+            Number of events keyed by the start timestamp of their bucket
+        """
+        if event_type not in EVENT_TABLES:
+            raise ValueError(f"Unknown event table: {event_type}")
+        query = f"""
+            SELECT timestamp / %s * %s AS bucket, COUNT(*)
+            FROM {event_type}
+            WHERE dex_id = %s AND timestamp >= %s AND timestamp <= %s
+            GROUP BY bucket
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (bucket, bucket, dex_id, start_timestamp, end_timestamp))
+                    return {row[0]: row[1] for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Error counting {event_type} of {dex_id}: {str(e)}", exc_info=True)
+            raise
+
     def insert_token_metadata(self, tokens: List[tuple]):
         """
         Insert token metadata.
@@ -267,24 +742,55 @@ class Database:
             tokens: List of tuples containing token metadata (id, symbol, name).
         
         """
-        insert_query = """
-        INSERT INTO token_metadata (id, symbol, name)
-        VALUES %s
-        ON CONFLICT (id) DO NOTHING
-        RETURNING id
-        """
+        tokens = self._unknown_tokens(tokens)
+        if not tokens:
+            return
         try:
             with self._get_connection() as conn:
                 with conn.cursor() as cur:
-                    # Execute batch insertion and fetch the count of new tokens
-                    execute_values(cur, insert_query, tokens)
-                    cur.execute("SELECT COUNT(*) FROM token_metadata WHERE id IN %s", (tuple(t[0] for t in tokens),))
-                    new_tokens = cur.fetchall()
-                    conn.commit()
-                    logger.debug(f"Inserted {new_tokens} new tokens into token_metadata.")
+                    self._insert_token_rows(cur, tokens)
+            self.known_tokens.add(token[0] for token in tokens)
         except Exception as e:
             logger.error(f"Error inserting token metadata: {str(e)}", exc_info=True)
             raise
+
+    @staticmethod
+    def _insert_token_rows(cur, tokens: List[tuple]):
+        """Insert (id, symbol, name) tuples, skipping tokens already stored"""
+        new_tokens = execute_values(
+            cur,
+            """
+            INSERT INTO token_metadata (id, symbol, name)
+            VALUES %s
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id
+            """,
+            tokens,
+            fetch=True
+        )
+        logger.debug(f"Inserted {len(new_tokens)} new tokens into token_metadata.")
+
+    def _unknown_tokens(self, tokens: List[tuple]) -> List[tuple]:
+        """Return the tokens missing from the known tokens, warming them from token_metadata on first use"""
+        if not tokens:
+            return []
+        if not self.known_tokens.warmed:
+            self.warm_token_cache()
+        return self.known_tokens.unknown(tokens)
+
+    def warm_token_cache(self):
+        """Load the most recently added token ids into the known tokens"""
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT id FROM token_metadata ORDER BY created_at DESC LIMIT %s",
+                        (self.known_tokens.max_size,)
+                    )
+                    self.known_tokens.warm(row[0] for row in reversed(cur.fetchall()))
+        except Exception as e:
+            logger.error(f"Error warming token cache: {str(e)}", exc_info=True)
+            raise
         
     def get_events_by_time(
         self,
@@ -0,0 +1,65 @@
+import bisect
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_BOUND = re.compile(r"FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+
+
+class PartitionRegistry:
+    """
+    Bounds of the existing partitions of the event tables, kept in memory.
+
+    Loaded from pg_inherits and extended with every partition this process creates, so
+    inserts only check whether their timestamps are covered and run no DDL when they are.
+    Partitions created by another process are picked up on the next load.
+    """
+
+    def __init__(self):
+        self._ranges: Dict[str, List[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, bounds: Iterable[Tuple[str, str]]):
+        """
+        Replace the registry with the partitions found in the catalog
+
+        Args:
+            bounds: (parent table, partition bound expression) pairs, default partitions are skipped
+        """
+        ranges: Dict[str, List[Tuple[int, int]]] = {}
+        for table, bound in bounds:
+            match = _BOUND.search(bound or '')
+            if match:
+                ranges.setdefault(table, []).append((int(match.group(1)), int(match.group(2))))
+        for table_ranges in ranges.values():
+            table_ranges.sort()
+        with self._lock:
+            self._ranges = ranges
+        logger.info(f"Loaded {sum(len(r) for r in ranges.values())} partitions of {len(ranges)} tables")
+
+    def add(self, table: str, start: int, end: int):
+        """Register a partition covering [start, end)"""
+        with self._lock:
+            table_ranges = self._ranges.setdefault(table, [])
+            if (start, end) not in table_ranges:
+                bisect.insort(table_ranges, (start, end))
+
+    def covers(self, table: str, start: int, end: int) -> bool:
+        """Return whether every timestamp from start to end, both inclusive, falls in a partition of the table"""
+        with self._lock:
+            table_ranges = self._ranges.get(table, [])
+            i = bisect.bisect_right(table_ranges, (start, float('inf'))) - 1
+            while start <= end:
+                if i < 0 or i >= len(table_ranges) or not table_ranges[i][0] <= start < table_ranges[i][1]:
+                    return False
+                start = table_ranges[i][1]
+                i += 1
+            return True
+
+    def ranges(self, table: str) -> List[Tuple[int, int]]:
+        """Return the [start, end) bounds of the partitions of the table, oldest first"""
+        with self._lock:
+            return list(self._ranges.get(table, []))
@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator
+import psycopg2
+import psycopg2.extensions
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'pid', 'created_at', 'returned_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pid = os.getpid()
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections.
+
+    min_size connections are opened up front and more on demand up to max_size, a
+    checkout waits up to the timeout for a connection to be returned once max_size are
+    in use. Connections idle longer than check_idle are pinged before they are handed
+    out, connections that fail the ping or are older than max_lifetime are replaced.
+    The most recently returned connection is handed out first, so connections beyond
+    min_size that are not needed stay idle and are closed once they reach max_lifetime.
+
+    A process forked with connections open, such as a preloaded API worker, starts
+    with an empty pool instead of sharing the sockets of its parent.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        min_size: int = Settings.DB_POOL_MIN,
+        max_size: int = Settings.DB_POOL_MAX,
+        max_lifetime: float = Settings.DB_POOL_MAX_LIFETIME.total_seconds(),
+        timeout: float = Settings.DB_POOL_TIMEOUT.total_seconds(),
+        check_idle: float = Settings.DB_POOL_CHECK_IDLE.total_seconds(),
+    ):
+        """
+        Initialize the pool and open min_size connections
+
+        Args:
+            config: psycopg2 connection parameters
+            min_size: Connections kept open while idle
+            max_size: Connections open at most, checkouts wait beyond it
+            max_lifetime: Seconds after which a connection is closed and replaced
+            timeout: Seconds a checkout waits for a connection before raising PoolTimeout
+            check_idle: Connections idle longer than this many seconds are pinged on checkout
+        """
+        self.config = config
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self._idle: Deque[_PooledConnection] = deque()
+        self._checked_out = 0
+        self._pid = os.getpid()
+        self._closed = False
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.opened = 0
+        self.discarded = 0
+        self._fill()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """
+        Check out a connection for one transaction
+
+        The transaction is committed when the block exits normally and rolled back when
+        it raises. The connection goes back to the pool unless it broke.
+        """
+        entry = self._checkout()
+        try:
+            with entry.conn:
+                yield entry.conn
+        except BaseException:
+            self._checkin(entry)
+            raise
+        self._checkin(entry)
+
+    def _checkout(self) -> _PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._condition:
+            self._check_fork()
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle or self._size() < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s, {self.max_size} in use")
+                waited = True
+                self._condition.wait(remaining)
+            # Hold a slot while the connection is checked or opened outside the lock
+            entry = self._idle.pop() if self._idle else None
+            self._checked_out += 1
+
+        try:
+            entry = self._validate(entry) if entry is not None else self._open()
+        except Exception:
+            with self._condition:
+                self._checked_out -= 1
+                self._condition.notify()
+            raise
+
+        wait = time.monotonic() - started
+        with self._condition:
+            self.checkouts += 1
+            self.wait_time += wait
+            self.max_wait_time = max(self.max_wait_time, wait)
+            if waited:
+                self.waits += 1
+        return entry
+
+    def _validate(self, entry: _PooledConnection) -> _PooledConnection:
+        """Return the idle connection if it is usable, a new one in its place otherwise"""
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            self._discard(entry, "reached its max lifetime")
+        elif entry.conn.closed:
+            self._discard(entry, "was closed")
+        elif now - entry.returned_at > self.check_idle and not self._ping(entry.conn):
+            self._discard(entry, "failed its health check")
+        else:
+            return entry
+        return self._open()
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _open(self) -> _PooledConnection:
+        entry = _PooledConnection(psycopg2.connect(**self.config))
+        with self._condition:
+            self.opened += 1
+        return entry
+
+    def _checkin(self, entry: _PooledConnection):
+        with self._condition:
+            if entry.pid != os.getpid() or self._pid != entry.pid:
+                return
+            self._checked_out -= 1
+            reusable = (
+                not self._closed
+                and not entry.conn.closed
+                and entry.conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                and time.monotonic() - entry.created_at <= self.max_lifetime
+            )
+            if reusable:
+                entry.returned_at = time.monotonic()
+                self._idle.append(entry)
+            expired = []
+            while len(self._idle) > self.min_size and entry.returned_at - self._idle[0].created_at > self.max_lifetime:
+                expired.append(self._idle.popleft())
+            self._condition.notify()
+        if not reusable:
+            self._discard(entry, "was returned unusable")
+        for idle in expired:
+            self._discard(idle, "reached its max lifetime while idle")
+
+    def _discard(self, entry: _PooledConnection, reason: str):
+        with self._condition:
+            self.discarded += 1
+        logger.debug(f"Closing database connection that {reason}")
+        try:
+            entry.conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _fill(self):
+        while self._size() < self.min_size:
+            self._idle.append(_PooledConnection(psycopg2.connect(**self.config)))
+            self.opened += 1
+
+    def _size(self) -> int:
+        return len(self._idle) + self._checked_out
+
+    def _check_fork(self):
+        """Forget connections inherited from a parent process, closing them would end its sessions"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._checked_out = 0
+
+    def close(self):
+        """Close the idle connections, connections in use are closed when they are returned"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        for entry in idle:
+            self._discard(entry, "was idle at shutdown")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Report pool size and checkout wait times"""
+        with self._condition:
+            return {
+                "size": self._size(),
+                "idle": len(self._idle),
+                "in_use": self._checked_out,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_time / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_time * 1000, 2),
+                "opened": self.opened,
+                "discarded": self.discarded,
+            }
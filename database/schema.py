@@ -1,6 +1,19 @@
-from typing import List
+from typing import List, Tuple
 from datetime import datetime, timedelta
 
+# Tables partitioned by timestamp range, they share their monthly partition bounds
+PARTITIONED_TABLES = ['transactions', 'swaps', 'mints', 'burns']
+
+# Conflict clause of transaction inserts. Subgraphs of several DEXes on one chain report the
+# same transaction, not all of them with gas data, so stored gas data is filled in but never lost
+TRANSACTION_UPSERT = '''
+    ON CONFLICT (timestamp, id) DO UPDATE SET
+        gas_used = COALESCE(transactions.gas_used, EXCLUDED.gas_used),
+        gas_price = COALESCE(transactions.gas_price, EXCLUDED.gas_price)
+    WHERE (transactions.gas_used IS NULL AND EXCLUDED.gas_used IS NOT NULL)
+       OR (transactions.gas_price IS NULL AND EXCLUDED.gas_price IS NOT NULL)
+'''
+
 class PostgresSchema:
     @staticmethod
     def get_schema_queries() -> List[str]:
@@ -8,11 +21,23 @@ class PostgresSchema:
             # Extensions
             "CREATE EXTENSION IF NOT EXISTS btree_gist",
             
+            # Transactions the events belong to, stored once for all their events
+            '''
+            CREATE TABLE IF NOT EXISTS transactions (
+                id TEXT NOT NULL,             -- Transaction hash
+                timestamp INTEGER NOT NULL,
+                block_number BIGINT NOT NULL,
+                gas_used TEXT,
+                gas_price TEXT,
+                PRIMARY KEY (timestamp, id)
+            ) PARTITION BY RANGE (timestamp)
+            ''',
+            
             # Swaps table with range partitioning
             '''
             CREATE TABLE IF NOT EXISTS swaps (
                 id TEXT NOT NULL,
-                parent_transaction JSONB NOT NULL,
+                transaction_id TEXT NOT NULL,       -- Transaction in the transactions table, same timestamp
                 timestamp INTEGER NOT NULL,
                 dex_id TEXT NOT NULL,
                 token0_symbol TEXT NOT NULL,
@@ -37,7 +62,7 @@ class PostgresSchema:
             '''
             CREATE TABLE IF NOT EXISTS mints (
                 id TEXT NOT NULL,
-                parent_transaction JSONB NOT NULL,
+                transaction_id TEXT NOT NULL,       -- Transaction in the transactions table, same timestamp
                 timestamp INTEGER NOT NULL,
                 dex_id TEXT NOT NULL,
                 token0_symbol TEXT NOT NULL,
@@ -61,7 +86,7 @@ class PostgresSchema:
             '''
             CREATE TABLE IF NOT EXISTS burns (
                 id TEXT NOT NULL,
-                parent_transaction JSONB NOT NULL,
+                transaction_id TEXT NOT NULL,       -- Transaction in the transactions table, same timestamp
                 timestamp INTEGER NOT NULL,
                 dex_id TEXT NOT NULL,
                 token0_symbol TEXT NOT NULL,
@@ -97,35 +122,102 @@ class PostgresSchema:
 
             '''
             ,
+
+            # Ingestion watermarks, the last (timestamp, id) committed per DEX and event type
+            '''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                dex_id TEXT NOT NULL,
+                event_type TEXT NOT NULL,     -- 'transactions' or the paged event entity
+                cursor_timestamp INTEGER NOT NULL,
+                cursor_id TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (dex_id, event_type)
+            );
+            '''
+            ,
+            
+            # Windows of historical backfills that have been stored completely
+            '''
+            CREATE TABLE IF NOT EXISTS backfill_chunks (
+                dex_id TEXT NOT NULL,
+                chunk_start INTEGER NOT NULL,
+                chunk_end INTEGER NOT NULL,
+                transactions INTEGER NOT NULL,
+                events INTEGER NOT NULL,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (dex_id, chunk_start, chunk_end)
+            );
+            '''
+            ,
+            
+            # Windows of a DEX to ingest, claimed by ingestor processes under an expiring lease
+            '''
+            CREATE TABLE IF NOT EXISTS work_units (
+                id BIGSERIAL PRIMARY KEY,
+                dex_id TEXT NOT NULL,
+                window_start INTEGER NOT NULL,
+                window_end INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',   -- 'pending', 'leased' or 'done'
+                owner TEXT,                               -- Ingestor holding the lease
+                lease_expires_at TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP,
+                UNIQUE (dex_id, window_start, window_end)
+            );
+            CREATE INDEX IF NOT EXISTS idx_work_units_claimable ON work_units (window_start) WHERE status <> 'done';
+            '''
+            ,
+            
+            # Tables created before the transactions table keep parent_transaction until they are migrated
+            # with migrate_transactions.py, new rows only set transaction_id
+            '''
+            DO $$
+            DECLARE
+                event_table TEXT;
+            BEGIN
+                FOREACH event_table IN ARRAY ARRAY['swaps', 'mints', 'burns'] LOOP
+                    EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS transaction_id TEXT', event_table);
+                    IF EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = current_schema() AND table_name = event_table
+                          AND column_name = 'parent_transaction' AND is_nullable = 'NO'
+                    ) THEN
+                        EXECUTE format('ALTER TABLE %I ALTER COLUMN parent_transaction DROP NOT NULL', event_table);
+                    END IF;
+                END LOOP;
+            END $$;
+            '''
+            ,
             
             # Create optimized indexes
             '''
             CREATE INDEX IF NOT EXISTS idx_swaps_tokens ON swaps (token0_symbol, token1_symbol);
             CREATE INDEX IF NOT EXISTS idx_swaps_dex ON swaps (dex_id);
-            CREATE INDEX IF NOT EXISTS idx_swaps_parent_tx ON swaps USING GIN (parent_transaction);
+            CREATE INDEX IF NOT EXISTS idx_swaps_transaction ON swaps (transaction_id);
             CREATE INDEX IF NOT EXISTS idx_swaps_timestamp ON swaps (timestamp DESC);
             CREATE INDEX IF NOT EXISTS idx_swaps_sender ON swaps (sender);
             CREATE INDEX IF NOT EXISTS idx_swaps_recipient ON swaps (recipient);
             
             CREATE INDEX IF NOT EXISTS idx_mints_tokens ON mints (token0_symbol, token1_symbol);
             CREATE INDEX IF NOT EXISTS idx_mints_dex ON mints (dex_id);
-            CREATE INDEX IF NOT EXISTS idx_mints_parent_tx ON mints USING GIN (parent_transaction);
+            CREATE INDEX IF NOT EXISTS idx_mints_transaction ON mints (transaction_id);
             CREATE INDEX IF NOT EXISTS idx_mints_timestamp ON mints (timestamp DESC);
             CREATE INDEX IF NOT EXISTS idx_mints_owner ON mints (owner);
             
             CREATE INDEX IF NOT EXISTS idx_burns_tokens ON burns (token0_symbol, token1_symbol);
             CREATE INDEX IF NOT EXISTS idx_burns_dex ON burns (dex_id);
-            CREATE INDEX IF NOT EXISTS idx_burns_parent_tx ON burns USING GIN (parent_transaction);
+            CREATE INDEX IF NOT EXISTS idx_burns_transaction ON burns (transaction_id);
             CREATE INDEX IF NOT EXISTS idx_burns_timestamp ON burns (timestamp DESC);
             CREATE INDEX IF NOT EXISTS idx_burns_owner ON burns (owner);
             '''
         ]
 
     @staticmethod
-    def get_partition_queries(start_date: datetime, end_date: datetime, interval: timedelta) -> List[str]:
-        """Generate partition creation queries for a date range"""
-        queries = []
-        
+    def get_partition_ranges(start_date: datetime, end_date: datetime) -> List[Tuple[str, int, int]]:
+        """Return the (YYYY_MM suffix, start, end) of the monthly partitions covering a date range"""
+        ranges = []
+
         # Round start_date down to the start of its month
         start_date = datetime(start_date.year, start_date.month, 1)
         
@@ -144,32 +236,93 @@ class PostgresSchema:
             else:
                 next_date = datetime(current_date.year, current_date.month + 1, 1)
             
-            partition_start = int(current_date.timestamp())
-            partition_end = int(next_date.timestamp())
-            
             # Create partition names with YYYY_MM format
-            partition_suffix = current_date.strftime('%Y_%m')
-            
-            # Create partitions for each table
-            for table in ['swaps', 'mints', 'burns']:
-                partition_name = f"{table}_p{partition_suffix}"
-                query = f'''
-                DO $$ 
-                BEGIN 
-                    IF NOT EXISTS (
-                        SELECT 1
-                        FROM pg_class c
-                        JOIN pg_namespace n ON n.oid = c.relnamespace
-                        WHERE c.relname = '{partition_name}'
-                    ) THEN
-                        CREATE TABLE {partition_name}
-                        PARTITION OF {table}
-                        FOR VALUES FROM ({partition_start}) TO ({partition_end});
-                    END IF;
-                END $$;
-                '''
-                queries.append(query)
-            
+            ranges.append((current_date.strftime('%Y_%m'), int(current_date.timestamp()), int(next_date.timestamp())))
             current_date = next_date
-        
-        return queries
\ No newline at end of file
+
+        return ranges
+
+    @staticmethod
+    def get_partition_query(table: str, suffix: str, partition_start: int, partition_end: int) -> str:
+        """Generate the creation query of one partition, a no-op when it exists"""
+        partition_name = f"{table}_p{suffix}"
+        return f'''
+        DO $$ 
+        BEGIN 
+            IF NOT EXISTS (
+                SELECT 1
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE c.relname = '{partition_name}'
+            ) THEN
+                CREATE TABLE {partition_name}
+                PARTITION OF {table}
+                FOR VALUES FROM ({partition_start}) TO ({partition_end});
+            END IF;
+        END $$;
+        '''
+
+    @staticmethod
+    def get_partition_queries(start_date: datetime, end_date: datetime, interval: timedelta) -> List[str]:
+        """Generate partition creation queries for a date range"""
+        return [
+            PostgresSchema.get_partition_query(table, suffix, partition_start, partition_end)
+            for suffix, partition_start, partition_end in PostgresSchema.get_partition_ranges(start_date, end_date)
+            for table in PARTITIONED_TABLES
+        ]
+
+    @staticmethod
+    def get_partition_bounds_query() -> str:
+        """Query the (parent table, partition bound expression) of every partition of the given tables"""
+        return '''
+        SELECT parent.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = ANY(%s) AND pg_table_is_visible(parent.oid)
+        '''
+
+    @staticmethod
+    def get_transaction_migration_queries(table: str) -> List[str]:
+        """
+        Generate the queries moving the parent_transaction JSONB of an event table's rows into transactions
+
+        Both take the (start, end) timestamps of the rows to migrate. Migrated rows have their
+        transaction_id set and their JSONB cleared, so the migration resumes where it stopped.
+        Of the copies of a transaction, one with gas data is preferred.
+        """
+        return [
+            f'''
+            INSERT INTO transactions (id, timestamp, block_number, gas_used, gas_price)
+            SELECT DISTINCT ON (timestamp, parent_transaction->>'id')
+                parent_transaction->>'id',
+                timestamp,
+                (parent_transaction->>'block_number')::BIGINT,
+                parent_transaction->>'gas_used',
+                parent_transaction->>'gas_price'
+            FROM {table}
+            WHERE timestamp >= %s AND timestamp < %s
+              AND transaction_id IS NULL AND parent_transaction IS NOT NULL
+            ORDER BY
+                timestamp,
+                parent_transaction->>'id',
+                parent_transaction->>'gas_used' IS NULL,
+                parent_transaction->>'gas_price' IS NULL
+            {TRANSACTION_UPSERT}
+            ''',
+            f'''
+            UPDATE {table}
+            SET transaction_id = parent_transaction->>'id', parent_transaction = NULL
+            WHERE timestamp >= %s AND timestamp < %s
+              AND transaction_id IS NULL AND parent_transaction IS NOT NULL
+            ''',
+        ]
+
+    @staticmethod
+    def get_transaction_migration_cleanup_queries(table: str) -> List[str]:
+        """Generate the queries dropping the parent_transaction JSONB of a fully migrated event table"""
+        return [
+            f"DROP INDEX IF EXISTS idx_{table}_parent_tx",
+            f"ALTER TABLE {table} DROP COLUMN IF EXISTS parent_transaction",
+            f"ALTER TABLE {table} ALTER COLUMN transaction_id SET NOT NULL",
+        ]
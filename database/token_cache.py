@@ -0,0 +1,64 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, List
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class KnownTokens:
+    """
+    LRU set of the token ids stored in token_metadata.
+
+    Inserts only write the tokens missing from here. Ids are added once the transaction
+    that wrote them has committed, so a rolled back insert is retried with the next batch.
+    An id evicted from the set is written again with ON CONFLICT DO NOTHING, which is
+    harmless.
+    """
+
+    def __init__(self, max_size: int = Settings.TOKEN_CACHE_SIZE):
+        """
+        Initialize the set
+
+        Args:
+            max_size: Maximum number of ids kept, least recently seen ids are evicted first
+        """
+        self.max_size = max_size
+        self.warmed = False
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def unknown(self, tokens: Iterable[tuple]) -> List[tuple]:
+        """Return the (id, symbol, name) tuples whose id is not known, sorted by id"""
+        missing = {}
+        with self._lock:
+            for token in tokens:
+                if token[0] in self._ids:
+                    self._ids.move_to_end(token[0])
+                    self.hits += 1
+                elif token[0] not in missing:
+                    missing[token[0]] = token
+                    self.misses += 1
+        # A fixed order keeps concurrent inserts of the same tokens from deadlocking
+        return [missing[token_id] for token_id in sorted(missing)]
+
+    def add(self, token_ids: Iterable[str]):
+        """Remember ids that are committed to token_metadata"""
+        with self._lock:
+            for token_id in token_ids:
+                self._ids[token_id] = None
+                self._ids.move_to_end(token_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def warm(self, token_ids: Iterable[str]):
+        """Fill the set with ids read from token_metadata"""
+        self.add(token_ids)
+        self.warmed = True
+        logger.info(f"Warmed the token cache with {len(self)} known tokens")
+
+    def __len__(self) -> int:
+        return len(self._ids)
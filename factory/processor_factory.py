@@ -22,6 +22,14 @@ class ProcessorFactory:
         logger.info(f"Created processor instance for DEX ID: {dex_id}")
         return processor_class()
     
+    @classmethod
+    def get_processor_class(cls, dex_id: str) -> type[BaseProcessor]:
+        processor_class = cls._processors.get(dex_id)
+        if not processor_class:
+            logger.error(f"No processor found for DEX: {dex_id}")
+            raise ValueError(f"No processor found for DEX: {dex_id}")
+        return processor_class
+
     @classmethod
     def register_processor(cls, dex_id: str, processor_class: type[BaseProcessor]):
         logger.info(f"Registering new processor for DEX ID: {dex_id}")
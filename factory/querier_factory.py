@@ -1,9 +1,10 @@
 import logging
-from typing import Dict
+from typing import Dict, Optional
 
-from query import BaseQuerier, UniswapV3Querier, UniswapV2Querier, AerodromeQuerier, QuickswapV3Querier
+from query import BaseQuerier, UniswapV3Querier, UniswapV2Querier, AerodromeQuerier, QuickswapV3Querier, PoolCache
 
 from config.settings import Settings
+from .processor_factory import ProcessorFactory
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ class QuerierFactory:
     }
     
     @classmethod
-    def get_querier(cls, dex_id: str) -> BaseQuerier:
+    def get_querier(cls, dex_id: str, pool_cache: Optional[PoolCache] = None) -> BaseQuerier:
         logger.debug(f"Attempting to get querier for DEX ID: {dex_id}")
         querier_info = cls._queriers.get(dex_id)
         
@@ -37,8 +38,17 @@ class QuerierFactory:
             raise ValueError(f"No querier found for DEX: {dex_id}")
             
         querier_class, url = querier_info
+        # Only select the fields the matching processor reads
+        processor_class = ProcessorFactory.get_processor_class(dex_id)
         logger.info(f"Created querier instance for DEX ID: {dex_id}")
-        return querier_class(url)
+        return querier_class(
+            url,
+            processor_class.get_transaction_fields(),
+            processor_class.get_pool_fields(),
+            pool_cache,
+            processor_class.get_event_fields(),
+            dex_id=dex_id
+        )
     
         
     @classmethod
@@ -0,0 +1,45 @@
+import argparse
+import logging
+from database import Database
+from database.database import EVENT_TABLES
+from config.settings import Settings
+
+logging.basicConfig(
+    filename='maintenance.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Move the parent_transaction JSONB of stored events into the transactions table, one partition at a time")
+    parser.add_argument("--table", action="append", choices=EVENT_TABLES, help="Event table to migrate, all of them by default")
+    parser.add_argument("--finish", action="store_true", help="Drop parent_transaction and its GIN index once every row is migrated")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db = Database(Settings.POSTGRES_CONFIG)
+    try:
+        for table in args.table or EVENT_TABLES:
+            transactions, events = 0, 0
+            # Partition by partition, an interrupted migration resumes with the rows left
+            for start, end in db.partitions.ranges(table):
+                stored, migrated = db.migrate_transactions(table, start, end)
+                transactions += stored
+                events += migrated
+                if migrated:
+                    logger.info(f"Migrated {migrated} {table} between {start} and {end}, {stored} transactions stored")
+            print(f"{table}: {events} rows migrated, {transactions} transactions stored")
+            if args.finish:
+                db.finish_transaction_migration(table)
+                print(f"{table}: dropped parent_transaction")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
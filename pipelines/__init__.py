@@ -4,6 +4,15 @@ from .aerodrome_pipeline import AerodromePipeline
 from .uniswap_v2_pipeline import UniswapV2Pipeline
 from .quickswap_v3_pipeline import QuickswapV3Pipeline
 from .graph_pipeline import GraphPipeline
+from .backfill import Backfill
+from .dead_letters import DeadLetter, DeadLetterStore, get_dead_letter_store
+from .ingestion import ingest
+from .process_pool import close_process_pool, get_process_pool, process_page
+from .reconciler import Reconciler
+from .scheduler import DexSchedule, Scheduler
+from .sharding import Shard, ShardPlanner
+from .stages import Stage, StageRunner, StageStats
+from .work_queue import WorkQueueWorker
 
 __all__ = [
     'BasePipeline',
@@ -11,6 +20,23 @@ __all__ = [
     'UniswapV2Pipeline',
     'AerodromePipeline',
     'QuickswapV3Pipeline',
-    'GraphPipeline'
+    'GraphPipeline',
+    'Backfill',
+    'DeadLetter',
+    'DeadLetterStore',
+    'get_dead_letter_store',
+    'ingest',
+    'close_process_pool',
+    'get_process_pool',
+    'process_page',
+    'Reconciler',
+    'DexSchedule',
+    'Scheduler',
+    'Shard',
+    'ShardPlanner',
+    'Stage',
+    'StageRunner',
+    'StageStats',
+    'WorkQueueWorker'
 ]
 
@@ -1,6 +1,6 @@
 from .base_pipeline import BasePipeline
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -10,7 +10,7 @@ class AerodromePipeline(BasePipeline):
         super().__init__(db, querier, processor)
         logger.info(f"Initialized AerodromePipeline")
         
-    def fetch_data(self, start_timestamp, end_timestamp, skip : int) -> List[Dict[str, Any]]:
+    def fetch_data(self, start_timestamp, end_timestamp, cursor: Optional[Tuple[int, str]] = None) -> List[Dict[str, Any]]:
         """Fetch data from Aerodrome."""
             
         # Convert datetime to UNIX timestamps if needed
@@ -19,8 +19,8 @@ class AerodromePipeline(BasePipeline):
         if isinstance(end_timestamp, datetime):
             end_timestamp = int(end_timestamp.timestamp())
             
-        logger.debug(f"Fetching Aerodrome data: {start_timestamp} to {end_timestamp}, skip={skip}")
-        return self.querier.get_transactions(start_timestamp, end_timestamp, skip=skip)
+        logger.debug(f"Fetching Aerodrome data: {start_timestamp} to {end_timestamp}, cursor={cursor}")
+        return self.querier.get_transactions(start_timestamp, end_timestamp, cursor=cursor)
     
     def fetch_tokens(self, skip : int) -> List[Dict[str, Any]]:
         """Fetch tokens from Aerodrome."""
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Settings
+from query.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class Backfill:
+    """
+    Load the history of a DEX over a long time range.
+
+    The range is split into fixed windows aligned on multiples of the window width, so a
+    rerun over an overlapping range finds the same windows. Several windows are processed
+    concurrently, each one is recorded in backfill_chunks once stored completely and
+    skipped when the backfill is resumed.
+
+    The backfill leaves the live watermark alone and sends its requests through its own
+    rate limiter queue with a lower weight, so live ingestion running in the same process
+    keeps most of the request budget.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        start_time,
+        end_time,
+        workers: int = Settings.BACKFILL_WORKERS,
+        chunk_width: int = int(Settings.BACKFILL_CHUNK.total_seconds()),
+        priority: float = Settings.BACKFILL_PRIORITY,
+    ):
+        """
+        Initialize the backfill
+
+        Args:
+            pipeline: Pipeline of the DEX, dedicated to the backfill
+            start_time: Start of the range, datetime or timestamp
+            end_time: End of the range (inclusive), datetime or timestamp
+            workers: Number of windows processed concurrently
+            chunk_width: Width of the windows in seconds
+            priority: Rate limiter weight of the backfill requests, live requests weigh 1
+        """
+        self.pipeline = pipeline
+        self.dex_id = pipeline.processor.dex_id
+        self.start_timestamp = self._to_timestamp(start_time)
+        self.end_timestamp = self._to_timestamp(end_time)
+        self.workers = workers
+        self.chunk_width = chunk_width
+        self.pipeline.track_watermark = False
+        self.pipeline.querier.limiter_key = f"{self.dex_id}:backfill"
+        get_rate_limiter().set_weight(self.pipeline.querier.limiter_key, priority)
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.chunks_skipped = 0
+        self.chunks_failed = 0
+        self.transactions = 0
+        self.events = 0
+        self._started_at: Optional[float] = None
+
+    @staticmethod
+    def _to_timestamp(value) -> int:
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        return int(value)
+
+    def plan_chunks(self) -> List[Tuple[int, int]]:
+        """Return the (start, end) windows covering the range, both inclusive"""
+        chunks = []
+        chunk_start = self.start_timestamp
+        while chunk_start <= self.end_timestamp:
+            aligned_end = (chunk_start // self.chunk_width + 1) * self.chunk_width - 1
+            chunk_end = min(aligned_end, self.end_timestamp)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + 1
+        return chunks
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Process every window that has not been completed yet
+
+        Windows that fail are logged and left pending for the next run.
+
+        Returns:
+            dict: Progress counters, see get_progress
+        """
+        chunks = self.plan_chunks()
+        completed = await asyncio.to_thread(
+            self.pipeline.db.get_completed_chunks, self.dex_id, self.start_timestamp, self.end_timestamp
+        )
+        pending = [chunk for chunk in chunks if chunk not in completed]
+        self.chunks_total = len(chunks)
+        self.chunks_skipped = len(chunks) - len(pending)
+        logger.info(
+            f"Backfilling {self.dex_id} from {self.start_timestamp} to {self.end_timestamp}: "
+            f"{len(pending)} of {len(chunks)} windows pending, {self.workers} workers"
+        )
+
+        queue = asyncio.Queue()
+        for chunk in pending:
+            queue.put_nowait(chunk)
+        self._started_at = time.monotonic()
+        await asyncio.gather(*(self._worker(queue) for _ in range(min(self.workers, len(pending)))))
+
+        progress = self.get_progress()
+        logger.info(f"Backfill of {self.dex_id} finished: {progress}")
+        return progress
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not queue.empty():
+            chunk_start, chunk_end = queue.get_nowait()
+            try:
+                await self._run_chunk(chunk_start, chunk_end)
+            except Exception as e:
+                self.chunks_failed += 1
+                logger.error(f"Backfill window {chunk_start}-{chunk_end} of {self.dex_id} failed: {e}", exc_info=True)
+
+    async def _run_chunk(self, chunk_start: int, chunk_end: int):
+        """Process one window and record it once it has been stored completely"""
+        if Settings.FETCH_MODE == 'events':
+            stats = await self.pipeline.process_time_range_events(chunk_start, chunk_end)
+        else:
+            stats = await self.pipeline.process_time_range_async(chunk_start, chunk_end)
+        self.transactions += stats["transactions_processed"]
+        self.events += stats["events_processed"]
+        if stats["synced_until"] < chunk_end:
+            # The window reaches past the indexing head, the rest is picked up on the next run
+            logger.info(f"Backfill window {chunk_start}-{chunk_end} of {self.dex_id} only indexed up to {stats['synced_until']}")
+            return
+        await asyncio.to_thread(
+            self.pipeline.db.complete_chunk,
+            self.dex_id, chunk_start, chunk_end, stats["transactions_processed"], stats["events_processed"]
+        )
+        self.chunks_done += 1
+        self._log_progress()
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Report how far the backfill got
+
+        Returns:
+            dict: windows done (including ones completed by earlier runs), failed and total,
+                rows stored by this run, rows per second and the estimated seconds remaining
+        """
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        remaining = self.chunks_total - self.chunks_skipped - self.chunks_done
+        eta = elapsed / self.chunks_done * remaining if self.chunks_done else None
+        return {
+            "chunks_done": self.chunks_skipped + self.chunks_done,
+            "chunks_failed": self.chunks_failed,
+            "chunks_total": self.chunks_total,
+            "transactions": self.transactions,
+            "events": self.events,
+            "rows_per_sec": round(self.transactions / elapsed, 1) if elapsed else 0.0,
+            "eta_seconds": round(eta) if eta is not None else None,
+        }
+
+    def _log_progress(self):
+        progress = self.get_progress()
+        eta = timedelta(seconds=progress["eta_seconds"]) if progress["eta_seconds"] is not None else "unknown"
+        logger.info(
+            f"Backfill {self.dex_id}: {progress['chunks_done']}/{progress['chunks_total']} windows, "
+            f"{progress['transactions']} transactions at {progress['rows_per_sec']}/s, ETA {eta}"
+        )
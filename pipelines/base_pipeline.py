@@ -1,13 +1,28 @@
 from abc import ABC, abstractmethod
+import asyncio
 import logging
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from factory.querier_factory import QuerierFactory
 from factory.processor_factory import ProcessorFactory
-from database.database import Database
+from database.database import Database, EVENT_TABLES
+from config.settings import Settings
+from query.rate_limiter import backoff_delay
+from query.streaming import PageTracker, loads
+from .dead_letters import DeadLetter, FETCH, INSERT, PROCESS, get_dead_letter_store
+from .process_pool import get_process_pool, process_page
+from .sharding import ShardPlanner
+from .stages import Stage, StageRunner
 import time
 
 logger = logging.getLogger(__name__)
 
+# Watermark key of transaction pages, event pages use their entity name
+TRANSACTIONS = 'transactions'
+
+# Letters of the pages that fail while a dead letter is replayed, collected instead of stored
+_replay_letters: ContextVar = ContextVar('replay_letters', default=None)
+
 class BasePipeline(ABC):
     def __init__(self, db, querier, processor, batch_size=1000):
         """
@@ -23,11 +38,16 @@ class BasePipeline(ABC):
         self.querier = querier
         self.processor = processor
         self.batch_size = batch_size
+        self.stage_runner = StageRunner()
+        self.stage_stats = {}
+        # Backfills write ranges behind the live watermark and track their progress on their own
+        self.track_watermark = True
+        self.dead_letters = get_dead_letter_store()
         logger.info(f"Initialized {self.__class__.__name__}")
 
     @abstractmethod
-    def fetch_data(self, start_timestamp, end_timestamp, skip):
-        """Abstract method for fetching data from the DEX."""
+    def fetch_data(self, start_timestamp, end_timestamp, cursor=None):
+        """Abstract method for fetching a page of data from the DEX, starting after the (timestamp, id) cursor."""
         pass
 
     @abstractmethod
@@ -35,80 +55,222 @@ class BasePipeline(ABC):
         """Abstract method for fetching tokens from the DEX."""
         pass
 
-    def process_batch(self, start_timestamp, end_timestamp, skip, max_retries=3, retry_delay=5):
+    def process_batch(self, start_timestamp, end_timestamp, cursor=None, max_retries=3, retry_delay=1):
         """
         Process a single batch of transactions.
+
+        Fetching and inserting are retried on their own, so a failed insert does not fetch
+        the page again. A page that still fails is dead-lettered and the batch moves on past
+        it. After a failed fetch there is no cursor to move on from, the rest of the window
+        is dead-lettered instead.
         
         Args:
             start_timestamp: Start timestamp
             end_timestamp: End timestamp
-            skip: Offset for pagination
+            cursor: (timestamp, id) of the last transaction already processed, None for the first batch
             max_retries: Maximum number of retries
-            retry_delay: Delay between retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
             
         Returns:
-            tuple[bool, int, int, int]: has_more, transactions_processed, events_processed, next_skip
+            tuple[bool, int, int, tuple]: has_more, transactions_processed, events_processed, next_cursor
         """
+        if Settings.STREAM_RESPONSES:
+            return self._process_streamed_batch(start_timestamp, end_timestamp, cursor, max_retries, retry_delay)
+
+        # Fetch data
+        try:
+            raw_data = self._with_retries(
+                FETCH, lambda: self.fetch_data(start_timestamp, end_timestamp, cursor), max_retries, retry_delay
+            )
+        except Exception as e:
+            self._dead_letter(FETCH, e, start_timestamp, end_timestamp, cursor=cursor)
+            return False, 0, 0, cursor
+        transactions = raw_data.get("data", {}).get("transactions", [])
+        
+        if not transactions:
+            logger.info(f"No transactions found after cursor={cursor}")
+            return False, 0, 0, cursor
+
+        # Determine if more transactions remain
+        has_more = len(transactions) >= self.batch_size
+        next_cursor = self.querier.get_cursor(transactions)
+
+        # Process transactions, the same page would fail the same way again
+        try:
+            processed_events = self.processor.process_bulk_responses(raw_data)
+        except Exception as e:
+            self._dead_letter(PROCESS, e, start_timestamp, end_timestamp, cursor=cursor, raw_data=raw_data)
+            return has_more, len(transactions), 0, next_cursor
+        total_events = sum(len(events) for events in processed_events)
+
+        # Store processed events in the database, advancing the watermark with them
+        try:
+            self._with_retries(
+                INSERT,
+                lambda: self.db.insert_transaction_batch(processed_events, self._watermark(None, next_cursor)),
+                max_retries,
+                retry_delay,
+            )
+        except Exception as e:
+            self._dead_letter(INSERT, e, start_timestamp, end_timestamp, cursor=cursor, raw_data=raw_data)
+            return has_more, len(transactions), 0, next_cursor
+
+        logger.debug(
+            f"Processed batch: {len(transactions)} transactions, {total_events} events, Cursor: {cursor}"
+        )
+        return has_more, len(transactions), total_events, next_cursor
+
+    def _process_streamed_batch(self, start_timestamp, end_timestamp, cursor, max_retries=3, retry_delay=1):
+        """Process a batch while its response is decoded, without holding the whole page in memory"""
+        def stream():
+            page = PageTracker(self.querier.stream_transactions(
+                self._to_timestamp(start_timestamp), self._to_timestamp(end_timestamp), cursor
+            ))
+            return page, self.processor.process_transactions(page)
+
+        # Decoding and processing happen while the page is received, a failure in either fetches it again
+        try:
+            page, processed_events = self._with_retries(FETCH, stream, max_retries, retry_delay)
+        except Exception as e:
+            self._dead_letter(FETCH, e, start_timestamp, end_timestamp, cursor=cursor)
+            return False, 0, 0, cursor
+        if not page.count:
+            logger.info(f"No transactions found after cursor={cursor}")
+            return False, 0, 0, cursor
+
+        total_events = sum(len(events) for events in processed_events)
+        try:
+            self._with_retries(
+                INSERT,
+                lambda: self.db.insert_transaction_batch(processed_events, self._watermark(None, page.cursor)),
+                max_retries,
+                retry_delay,
+            )
+        except Exception as e:
+            # The raw page was not kept, replaying the letter fetches it again
+            self._dead_letter(INSERT, e, start_timestamp, end_timestamp, cursor=cursor)
+            return page.count >= self.batch_size, page.count, 0, page.cursor
+
+        logger.debug(
+            f"Processed streamed batch: {page.count} transactions, {total_events} events, Cursor: {cursor}"
+        )
+        return page.count >= self.batch_size, page.count, total_events, page.cursor
+
+    @staticmethod
+    def _with_retries(stage, call, max_retries, retry_delay):
+        """Run one stage of a batch, retrying transient failures with a jittered exponential backoff"""
         retry_count = 0
-        while retry_count < max_retries:
+        while True:
             try:
-                # Fetch data
-                raw_data = self.fetch_data(start_timestamp, end_timestamp, skip)
-                transactions = raw_data.get("data", {}).get("transactions", [])
-                
-                if not transactions:
-                    logger.info(f"No transactions found for skip={skip}")
-                    return False, 0, 0, skip
-
-                # Process transactions
-                processed_events = self.processor.process_bulk_responses(raw_data)
-                total_events = sum(len(events) for events in processed_events)
-
-                # Store processed events in the database
-                self.db.insert_transaction_batch(processed_events)
-
-                # Determine if more transactions remain
-                has_more = len(transactions) >= self.batch_size
-                next_skip = skip + len(transactions)
-
-                logger.debug(
-                    f"Processed batch: {len(transactions)} transactions, {total_events} events, Skip: {skip}"
-                )
-                return has_more, len(transactions), total_events, next_skip
-
+                return call()
             except Exception as e:
                 retry_count += 1
+                if retry_count >= max_retries:
+                    logger.error(f"Failed to {stage} batch after {max_retries} attempts. Error: {e}")
+                    raise
+                delay = backoff_delay(retry_count, retry_delay)
                 logger.warning(
-                    f"Retry {retry_count}/{max_retries} after error: {e}. Waiting {retry_delay} seconds..."
+                    f"{stage.capitalize()} retry {retry_count}/{max_retries} after error: {e}. Waiting {delay:.1f} seconds..."
                 )
+                time.sleep(delay)
+
+    @staticmethod
+    async def _with_retries_async(stage, call, max_retries, retry_delay):
+        """Await one stage of a batch, retrying transient failures with the same backoff as _with_retries"""
+        retry_count = 0
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                retry_count += 1
                 if retry_count >= max_retries:
-                    logger.error(f"Failed to process batch after {max_retries} attempts. Skip: {skip}, Error: {e}")
+                    logger.error(f"Failed to {stage} batch after {max_retries} attempts. Error: {e}")
                     raise
-                time.sleep(retry_delay)
+                delay = backoff_delay(retry_count, retry_delay)
+                logger.warning(
+                    f"{stage.capitalize()} retry {retry_count}/{max_retries} after error: {e}. Waiting {delay:.1f} seconds..."
+                )
+                await asyncio.sleep(delay)
+
+    def _dead_letter(self, stage, error, start_timestamp, end_timestamp, event_type=None, cursor=None, raw_data=None):
+        """Keep a page that failed all its retries for a later replay"""
+        letter = DeadLetter(
+            dex_id=self.processor.dex_id,
+            stage=stage,
+            error=str(error),
+            start_timestamp=self._to_timestamp(start_timestamp),
+            end_timestamp=self._to_timestamp(end_timestamp),
+            event_type=event_type,
+            cursor=cursor,
+            payload=raw_data,
+        )
+        replayed = _replay_letters.get()
+        if replayed is not None:
+            # The letter being replayed is kept instead
+            logger.warning(f"{stage.capitalize()} of a replayed {letter.dex_id} page failed again: {letter.error}")
+            replayed.append(letter)
+            return
+        self.dead_letters.put(letter)
 
-    def process_time_range(self, start_time, end_time):
+    async def replay_dead_letter_async(self, letter):
+        """
+        Store the page of a dead letter, from its payload or by fetching its window again
+
+        Pages of the refetched window that fail again are not dead-lettered on their own,
+        the replay raises so the letter is kept with its attempts counted.
+
+        Returns:
+            int: Number of events stored
+
+        Raises:
+            RuntimeError: When a page of the refetched window failed again
+        """
+        if letter.payload is not None:
+            # Pages dead-lettered as raw bodies do not carry their pools
+            await self.querier.resolve_pools_async(letter.payload)
+            processed_events = await asyncio.to_thread(self._process_page, letter.payload, letter.event_type)
+            # The watermark has moved past the page since
+            return await self.insert_events_async(processed_events)
+        failed = []
+        token = _replay_letters.set(failed)
+        try:
+            stats = await self.process_time_range_async(
+                letter.start_timestamp, letter.end_timestamp, event_type=letter.event_type, cursor=letter.cursor
+            )
+        finally:
+            _replay_letters.reset(token)
+        if failed:
+            raise RuntimeError(f"{len(failed)} pages failed again, first in {failed[0].stage}: {failed[0].error}")
+        return stats["events_processed"]
+
+    def process_time_range(self, start_time, end_time, cursor=None):
         """
         Process data for a specific time range.
         
         Args:
             start_time: Start timestamp
             end_time: End timestamp
+            cursor: (timestamp, id) already committed in the first second, to resume from a watermark
             
         Returns:
             dict: Statistics about the processed data
         """
         total_transactions, total_events = 0, 0
-        skip = 0
+        start_timestamp = self._to_timestamp(start_time)
+        end_timestamp = self.clamp_to_head(self._to_timestamp(end_time))
+        if end_timestamp < start_timestamp:
+            logger.info(f"Subgraph has not indexed past {end_timestamp}, nothing to fetch from {start_timestamp}")
+            return {"transactions_processed": 0, "events_processed": 0, "synced_until": end_timestamp}
 
-        logger.debug(f"Processing data from {start_time} to {end_time}")
+        logger.debug(f"Processing data from {start_time} to {end_timestamp}")
 
         while True:
-            has_more, batch_tx, batch_events, next_skip = self.process_batch(
-                start_time, end_time, skip
+            has_more, batch_tx, batch_events, next_cursor = self.process_batch(
+                start_timestamp, end_timestamp, cursor
             )
             total_transactions += batch_tx
             total_events += batch_events
-            skip = next_skip
+            cursor = next_cursor
 
             if not has_more:
                 break
@@ -119,8 +281,625 @@ class BasePipeline(ABC):
         return {
             "transactions_processed": total_transactions,
             "events_processed": total_events,
+            "synced_until": end_timestamp,
         }
 
+    def clamp_to_head(self, end_timestamp):
+        """Clamp the end of a window to the timestamp of the last block the subgraph has indexed"""
+        try:
+            head = self.querier.get_indexing_head()
+        except Exception as e:
+            logger.warning(f"Could not get indexing head, keeping window end {end_timestamp}: {e}")
+            return end_timestamp
+        return self._clamp(end_timestamp, head)
+
+    async def clamp_to_head_async(self, end_timestamp):
+        """Clamp the end of a window to the indexing head without blocking the event loop"""
+        try:
+            head = await self.querier.get_indexing_head_async()
+        except Exception as e:
+            logger.warning(f"Could not get indexing head, keeping window end {end_timestamp}: {e}")
+            return end_timestamp
+        return self._clamp(end_timestamp, head)
+
+    @staticmethod
+    def _clamp(end_timestamp, head):
+        if head is None or head[1] is None:
+            return end_timestamp
+        # Blocks sharing the head's timestamp may still be indexed, stop at the last complete second
+        return min(end_timestamp, head[1] - 1)
+
+    def _watermark(self, event_type, cursor):
+        """Watermark committed with a page, keyed by DEX and paged entity, None when not tracked"""
+        if not self.track_watermark:
+            return None
+        return self.processor.dex_id, event_type or TRANSACTIONS, cursor
+
+    @staticmethod
+    def _to_timestamp(value):
+        """Convert a datetime to a UNIX timestamp, pass integers through"""
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        return value
+
+    @staticmethod
+    def _page_rows(raw_data, event_type=None):
+        """Return the rows of a page, transactions or top level events of event_type"""
+        return raw_data.get("data", {}).get(event_type or "transactions", [])
+
+    async def fetch_data_async(self, start_timestamp, end_timestamp, cursor=None, event_type=None, max_retries=3, retry_delay=1):
+        """
+        Fetch a page of transactions on the event loop, retrying transient failures.
+
+        Args:
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last row already fetched, None for the first page
+            event_type: Page top level events of this type ('swaps', 'mints', 'burns') instead of transactions
+            max_retries: Maximum number of retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
+
+        Returns:
+            Dict containing the query response data
+        """
+        async def fetch():
+            if event_type:
+                return await self.querier.get_events_async(event_type, start_timestamp, end_timestamp, cursor=cursor)
+            return await self.querier.get_transactions_async(start_timestamp, end_timestamp, cursor=cursor)
+
+        return await self._with_retries_async(FETCH, fetch, max_retries, retry_delay)
+
+    async def fetch_pages_async(self, pages, max_retries=3, retry_delay=1):
+        """
+        Fetch several pages in a single batched request, retrying transient failures.
+
+        Args:
+            pages: (event_type, start_timestamp, end_timestamp, cursor) of each page
+            max_retries: Maximum number of retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
+
+        Returns:
+            List of query responses, one per page
+        """
+        if len(pages) == 1:
+            event_type, start_timestamp, end_timestamp, cursor = pages[0]
+            return [await self.fetch_data_async(start_timestamp, end_timestamp, cursor, event_type, max_retries, retry_delay)]
+
+        return await self._with_retries_async(
+            FETCH, lambda: self.querier.get_pages_async(pages), max_retries, retry_delay
+        )
+
+    async def _store_page_async(self, raw_data, event_type, start_timestamp, end_timestamp, cursor, body=None):
+        """
+        Process and insert a page, return the number of events stored, None when it was dead-lettered
+
+        A page fetched with its raw body is processed in a worker process, on a thread otherwise.
+        """
+        try:
+            if body is not None:
+                event_rows = await self._process_in_pool(body, event_type, self.querier.get_pools(raw_data))
+            else:
+                processed_events = await asyncio.to_thread(self._process_page, raw_data, event_type)
+        except Exception as e:
+            self._dead_letter(PROCESS, e, start_timestamp, end_timestamp, event_type, cursor, raw_data)
+            return None
+        try:
+            if body is not None:
+                return await self.insert_rows_async(event_rows)
+            return await self.insert_events_async(processed_events)
+        except Exception as e:
+            self._dead_letter(INSERT, e, start_timestamp, end_timestamp, event_type, cursor, raw_data)
+            return None
+
+    async def insert_events_async(self, processed_events, watermark=None, max_retries=3, retry_delay=1):
+        """
+        Insert processed events, retrying transient failures.
+
+        Args:
+            processed_events: List of events per type [swaps, mints, burns, collects, flashs]
+            watermark: (dex_id, event_type, cursor) committed with the events
+            max_retries: Maximum number of retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
+
+        Returns:
+            int: Number of events stored
+        """
+        await self._insert_with_retries(self.db.insert_transaction_batch, processed_events, watermark, max_retries, retry_delay)
+        return sum(len(events) for events in processed_events)
+
+    async def insert_rows_async(self, rows, watermark=None, max_retries=3, retry_delay=1):
+        """
+        Insert rows built by a processing worker, retrying transient failures.
+
+        Args:
+            rows: Insert-ready rows per table, as built by Database.event_rows
+            watermark: (dex_id, event_type, cursor) committed with the events
+            max_retries: Maximum number of retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
+
+        Returns:
+            int: Number of events stored
+        """
+        await self._insert_with_retries(self.db.insert_event_rows, rows, watermark, max_retries, retry_delay)
+        return sum(len(rows.get(table, [])) for table in EVENT_TABLES)
+
+    async def _insert_with_retries(self, insert, batch, watermark, max_retries, retry_delay):
+        # psycopg2 is blocking, keep it off the event loop
+        await self._with_retries_async(
+            INSERT, lambda: asyncio.to_thread(insert, batch, watermark), max_retries, retry_delay
+        )
+
+    async def process_time_range_async(self, start_time, end_time, event_type=None, first_page=None, cursor=None):
+        """
+        Process data for a specific time range on the event loop.
+
+        Fetching, processing and inserting run as concurrent stages connected by bounded
+        queues, so the next page is fetched while earlier ones are processed and stored.
+
+        Args:
+            start_time: Start timestamp
+            end_time: End timestamp
+            event_type: Page top level events of this type instead of transactions
+            first_page: Already fetched response of the first page, the range is then processed on
+                threads, neither in worker processes nor streamed
+            cursor: (timestamp, id) already committed in the first second, to resume from a watermark
+
+        Returns:
+            dict: Statistics about the processed data
+        """
+        start_timestamp = self._to_timestamp(start_time)
+        end_timestamp = self._to_timestamp(end_time)
+        if first_page is None:
+            # Windows past the indexing head would come back empty or partial
+            end_timestamp = await self.clamp_to_head_async(end_timestamp)
+            if end_timestamp < start_timestamp:
+                logger.info(f"Subgraph has not indexed past {end_timestamp}, nothing to fetch from {start_timestamp}")
+                return {"transactions_processed": 0, "events_processed": 0, "synced_until": end_timestamp}
+            if Settings.PROCESS_WORKERS > 0:
+                return await self._process_time_range_pooled(start_timestamp, end_timestamp, event_type, cursor)
+            if Settings.STREAM_RESPONSES and event_type is None:
+                return await self._process_time_range_streamed(start_timestamp, end_timestamp, cursor)
+
+        totals = {"transactions_processed": 0, "events_processed": 0}
+
+        async def fetch(page_cursor):
+            try:
+                return await self.fetch_data_async(start_timestamp, end_timestamp, page_cursor, event_type=event_type)
+            except Exception as e:
+                self._dead_letter(FETCH, e, start_timestamp, end_timestamp, event_type, page_cursor)
+                return None
+
+        async def pages():
+            # Keyset pages are requested one after the other, each one needs the previous cursor
+            page_cursor = cursor
+            raw_data = first_page
+            if raw_data is None:
+                raw_data = await fetch(page_cursor)
+            while raw_data is not None:
+                rows = self._page_rows(raw_data, event_type)
+                if not rows:
+                    return
+                request_cursor, page_cursor = page_cursor, self.querier.get_cursor(rows)
+                yield raw_data, len(rows), page_cursor, request_cursor
+                if len(rows) < self.batch_size:
+                    return
+                raw_data = await fetch(page_cursor)
+
+        async def process(page):
+            raw_data, rows, page_cursor, request_cursor = page
+            try:
+                processed_events = await asyncio.to_thread(self._process_page, raw_data, event_type)
+            except Exception as e:
+                self._dead_letter(PROCESS, e, start_timestamp, end_timestamp, event_type, request_cursor, raw_data)
+                processed_events = None
+            return processed_events, rows, page_cursor, request_cursor, raw_data
+
+        async def write(batch):
+            processed_events, rows, page_cursor, request_cursor, raw_data = batch
+            totals["transactions_processed"] += rows
+            if processed_events is None:
+                return
+            try:
+                # Batches are written in order, so the watermark only moves past committed rows
+                totals["events_processed"] += await self.insert_events_async(
+                    processed_events, self._watermark(event_type, page_cursor)
+                )
+            except Exception as e:
+                self._dead_letter(INSERT, e, start_timestamp, end_timestamp, event_type, request_cursor, raw_data)
+
+        logger.debug(f"Processing data from {start_time} to {end_timestamp}")
+        await self.stage_runner.run(
+            "fetch",
+            pages(),
+            [Stage("process", process, count=lambda page: page[1]), Stage("write", write, count=lambda batch: batch[1])],
+            source_count=lambda page: page[1],
+            stats=self.stage_stats,
+        )
+
+        logger.info(
+            f"Completed processing: {totals['transactions_processed']} transactions, {totals['events_processed']} events"
+        )
+        return {**totals, "synced_until": end_timestamp}
+
+    async def _process_in_pool(self, body, event_type, pools):
+        """Turn a raw page into insert-ready rows in a worker process, with the pools it references"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_process_pool(), process_page, self.processor.dex_id, event_type, body, pools, self.querier.POOL_ENTITY
+        )
+
+    def _process_page(self, raw_data, event_type=None):
+        """Turn a fetched page into insert-ready events per type"""
+        if event_type:
+            return self.processor.process_event_responses(event_type, raw_data)
+        return self.processor.process_bulk_responses(raw_data)
+
+    async def stream_page_async(self, start_timestamp, end_timestamp, cursor=None, max_retries=3, retry_delay=1):
+        """
+        Fetch and process a page of transactions while its response is being received.
+
+        Args:
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last transaction already fetched, None for the first page
+            max_retries: Maximum number of retries
+            retry_delay: Base delay of the jittered exponential backoff between retries
+
+        Returns:
+            tuple[list, int, tuple]: processed events per type, transactions in the page, cursor of the last one
+        """
+        async def stream():
+            processed_events = [[], [], [], [], []]
+            rows, next_cursor = 0, cursor
+            async for chunk in self.querier.stream_transactions_async(start_timestamp, end_timestamp, cursor=cursor):
+                for index, events in enumerate(self.processor.process_transactions(chunk)):
+                    processed_events[index].extend(events)
+                rows += len(chunk)
+                next_cursor = self.querier.get_cursor(chunk)
+            return processed_events, rows, next_cursor
+
+        # Decoding and processing happen while the page is received, a failure in either fetches it again
+        return await self._with_retries_async(FETCH, stream, max_retries, retry_delay)
+
+    async def _process_time_range_streamed(self, start_time, end_time, cursor=None):
+        """
+        Process a time range page by page, decoding and processing every page as it is received.
+
+        Pages go through a write stage behind a bounded queue, so the next page is
+        streamed while earlier ones are being inserted.
+        """
+        start_timestamp = self._to_timestamp(start_time)
+        end_timestamp = self._to_timestamp(end_time)
+        totals = {"transactions_processed": 0, "events_processed": 0}
+
+        async def pages():
+            page_cursor = cursor
+            while True:
+                request_cursor = page_cursor
+                try:
+                    processed_events, rows, page_cursor = await self.stream_page_async(start_timestamp, end_timestamp, page_cursor)
+                except Exception as e:
+                    self._dead_letter(FETCH, e, start_timestamp, end_timestamp, cursor=request_cursor)
+                    return
+                if rows:
+                    yield processed_events, rows, page_cursor, request_cursor
+                if rows < self.batch_size:
+                    return
+
+        async def write(batch):
+            processed_events, rows, page_cursor, request_cursor = batch
+            totals["transactions_processed"] += rows
+            try:
+                totals["events_processed"] += await self.insert_events_async(
+                    processed_events, self._watermark(None, page_cursor)
+                )
+            except Exception as e:
+                # The raw page was not kept, replaying the letter fetches it again
+                self._dead_letter(INSERT, e, start_timestamp, end_timestamp, cursor=request_cursor)
+
+        logger.debug(f"Streaming data from {start_time} to {end_time}")
+        await self.stage_runner.run(
+            "fetch",
+            pages(),
+            [Stage("write", write, count=lambda batch: batch[1])],
+            source_count=lambda batch: batch[1],
+            stats=self.stage_stats,
+        )
+
+        logger.info(
+            f"Completed processing: {totals['transactions_processed']} transactions, {totals['events_processed']} events"
+        )
+        return {**totals, "synced_until": end_timestamp}
+
+    async def fetch_page_bytes_async(self, start_timestamp, end_timestamp, cursor=None, event_type=None, max_retries=3, retry_delay=1):
+        """
+        Fetch a page as its raw body, retrying transient failures.
+
+        Returns:
+            tuple[bytes, dict]: raw body and decoded response of the page
+        """
+        return await self._with_retries_async(
+            FETCH,
+            lambda: self.querier.get_page_bytes_async(event_type, start_timestamp, end_timestamp, cursor=cursor),
+            max_retries,
+            retry_delay,
+        )
+
+    async def _process_time_range_pooled(self, start_time, end_time, event_type=None, cursor=None):
+        """
+        Process a time range with pages processed in worker processes.
+
+        Raw page bodies are handed to the process pool together with the pools they
+        reference, the workers return insert-ready rows. Processing is CPU bound, so
+        this keeps it from contending for the GIL with fetching and inserting.
+        """
+        start_timestamp = self._to_timestamp(start_time)
+        end_timestamp = self._to_timestamp(end_time)
+        totals = {"transactions_processed": 0, "events_processed": 0}
+
+        async def pages():
+            page_cursor = cursor
+            while True:
+                try:
+                    body, raw_data = await self.fetch_page_bytes_async(start_timestamp, end_timestamp, page_cursor, event_type=event_type)
+                except Exception as e:
+                    self._dead_letter(FETCH, e, start_timestamp, end_timestamp, event_type, page_cursor)
+                    return
+                rows = self._page_rows(raw_data, event_type)
+                if not rows:
+                    return
+                request_cursor, page_cursor = page_cursor, self.querier.get_cursor(rows)
+                yield body, len(rows), page_cursor, request_cursor, self.querier.get_pools(raw_data)
+                if len(rows) < self.batch_size:
+                    return
+
+        async def process(page):
+            body, rows, page_cursor, request_cursor, pools = page
+            try:
+                event_rows = await self._process_in_pool(body, event_type, pools)
+            except Exception as e:
+                self._dead_letter(PROCESS, e, start_timestamp, end_timestamp, event_type, request_cursor, loads(body))
+                event_rows = None
+            return event_rows, rows, page_cursor, request_cursor, body
+
+        async def write(batch):
+            event_rows, rows, page_cursor, request_cursor, body = batch
+            totals["transactions_processed"] += rows
+            if event_rows is None:
+                return
+            try:
+                totals["events_processed"] += await self.insert_rows_async(
+                    event_rows, self._watermark(event_type, page_cursor)
+                )
+            except Exception as e:
+                self._dead_letter(INSERT, e, start_timestamp, end_timestamp, event_type, request_cursor, loads(body))
+
+        logger.debug(f"Processing data from {start_time} to {end_time} in {Settings.PROCESS_WORKERS} worker processes")
+        await self.stage_runner.run(
+            "fetch",
+            pages(),
+            [Stage("process", process, count=lambda page: page[1]), Stage("write", write, count=lambda batch: batch[1])],
+            source_count=lambda page: page[1],
+            stats=self.stage_stats,
+        )
+
+        logger.info(
+            f"Completed processing: {totals['transactions_processed']} transactions, {totals['events_processed']} events"
+        )
+        return {**totals, "synced_until": end_timestamp}
+
+    async def process_time_range_sharded(self, start_time, end_time, max_shards=None, event_type=None, cursor=None):
+        """
+        Process a large time range as concurrently fetched sub-windows.
+
+        Windows complete out of order, so the watermark is only advanced once the whole
+        range has been fetched, and only up to the first window that is dead-lettered.
+        Pages of several windows share one request, unless pages are processed in worker
+        processes, which need each page as its own raw body.
+
+        Args:
+            start_time: Start timestamp
+            end_time: End timestamp
+            max_shards: Maximum number of windows in flight, defaults to Settings.MAX_CONCURRENT_QUERIES
+            event_type: Page top level events of this type instead of transactions
+            cursor: (timestamp, id) already committed in the first second, to resume from a watermark
+
+        Returns:
+            dict: Statistics about the processed data
+        """
+        start_timestamp = self._to_timestamp(start_time)
+        end_timestamp = await self.clamp_to_head_async(self._to_timestamp(end_time))
+        max_shards = max_shards or Settings.MAX_CONCURRENT_QUERIES
+        planner = ShardPlanner(
+            start_timestamp,
+            end_timestamp,
+            page_size=self.batch_size,
+            initial_width=int(Settings.SHARD_INITIAL_WINDOW.total_seconds()),
+            min_width=int(Settings.SHARD_MIN_WINDOW.total_seconds()),
+            max_width=int(Settings.SHARD_MAX_WINDOW.total_seconds()),
+            cursor=cursor,
+        )
+        total_transactions, total_events = 0, 0
+        pooled = Settings.PROCESS_WORKERS > 0
+        shards_per_request = 1 if pooled else Settings.QUERY_BATCH_SIZE
+
+        async def fetch_shards(shards):
+            if pooled:
+                shard = shards[0]
+                body, raw_data = await self.fetch_page_bytes_async(shard.start, shard.end, shard.cursor, event_type=event_type)
+                return [(raw_data, body)]
+            # Pages of several windows share one request
+            pages = await self.fetch_pages_async(
+                [(event_type, shard.start, shard.end, shard.cursor) for shard in shards]
+            )
+            return [(raw_data, None) for raw_data in pages]
+
+        async def run_shards(shards):
+            try:
+                pages = await fetch_shards(shards)
+            except Exception as e:
+                # The windows are given up on, their letters cover them from their cursor to their end
+                for shard in shards:
+                    self._dead_letter(FETCH, e, shard.start, shard.end, event_type, shard.cursor)
+                return [(shard, 0, 0, None, True) for shard in shards]
+            results = []
+            for shard, (raw_data, body) in zip(shards, pages):
+                transactions = self._page_rows(raw_data, event_type)
+                events = 0
+                if transactions:
+                    events = await self._store_page_async(raw_data, event_type, shard.start, shard.end, shard.cursor, body)
+                results.append((shard, len(transactions), events or 0, self.querier.get_cursor(transactions), events is None))
+            return results
+
+        logger.debug(f"Processing data from {start_time} to {end_time} in shards of up to {max_shards}")
+
+        running = set()
+        try:
+            while True:
+                while len(running) < max_shards:
+                    shards = []
+                    while len(shards) < shards_per_request:
+                        shard = planner.next_shard()
+                        if shard is None:
+                            break
+                        shards.append(shard)
+                    if not shards:
+                        break
+                    running.add(asyncio.create_task(run_shards(shards)))
+                if not running:
+                    break
+
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for shard, batch_tx, batch_events, page_cursor, failed in task.result():
+                        planner.record_page(shard, batch_tx, page_cursor, failed)
+                        total_transactions += batch_tx
+                        total_events += batch_events
+        finally:
+            for task in running:
+                task.cancel()
+
+        # Rows past a dead-lettered window are stored, but the next run starts before it
+        if planner.watermark and self.track_watermark:
+            await asyncio.to_thread(self.db.set_watermark, *self._watermark(event_type, planner.watermark))
+
+        logger.info(
+            f"Completed processing: {total_transactions} transactions, {total_events} events "
+            f"across {planner.shards_planned} windows"
+        )
+        return {
+            "transactions_processed": total_transactions,
+            "events_processed": total_events,
+            "synced_until": end_timestamp,
+        }
+
+    async def process_time_range_events(self, start_time, end_time, sharded=False, cursors=None):
+        """
+        Process a time range by paging each event entity directly instead of transactions.
+
+        Every event type has its own cursor and is fetched concurrently with the others, so
+        events of large transactions are not cut off by the nested list limit. The first pages
+        of all event types share one request, unless pages are processed in worker processes,
+        which need each page as its own raw body. Streamed responses only apply to transaction
+        pages.
+
+        Args:
+            start_time: Start timestamp
+            end_time: End timestamp
+            sharded: Split each event type's range into concurrently fetched sub-windows
+            cursors: Watermark of each event type, event types with one start from it instead of start_time
+
+        Returns:
+            dict: Statistics about the processed data
+        """
+        event_types = self.querier.get_event_types()
+        cursors = cursors or {}
+        starts = {
+            event_type: cursors[event_type][0] if cursors.get(event_type) else self._to_timestamp(start_time)
+            for event_type in event_types
+        }
+        end_timestamp = await self.clamp_to_head_async(self._to_timestamp(end_time))
+        if end_timestamp < min(starts.values()):
+            logger.info(f"Subgraph has not indexed past {end_timestamp}, nothing to fetch")
+            return {"transactions_processed": 0, "events_processed": 0, "synced_until": end_timestamp}
+        if sharded:
+            results = await asyncio.gather(*(
+                self.process_time_range_sharded(starts[event_type], end_timestamp, event_type=event_type, cursor=cursors.get(event_type))
+                for event_type in event_types
+            ))
+        elif Settings.PROCESS_WORKERS > 0:
+            # Pages processed in worker processes are fetched as raw bodies, one request each
+            results = await asyncio.gather(*(
+                self.process_time_range_async(starts[event_type], end_timestamp, event_type=event_type, cursor=cursors.get(event_type))
+                for event_type in event_types
+            ))
+        else:
+            results = await self._process_first_pages_batched(event_types, starts, end_timestamp, cursors)
+        return {
+            "transactions_processed": sum(result["transactions_processed"] for result in results),
+            "events_processed": sum(result["events_processed"] for result in results),
+            "synced_until": end_timestamp,
+        }
+
+    async def _process_first_pages_batched(self, event_types, starts, end_timestamp, cursors):
+        """Fetch the first pages of all event types in one request, full ones keep paging on their own"""
+        pages = [(event_type, starts[event_type], end_timestamp, cursors.get(event_type)) for event_type in event_types]
+        try:
+            first_pages = await self.fetch_pages_async(pages)
+        except Exception as e:
+            for event_type, start_timestamp, _, cursor in pages:
+                self._dead_letter(FETCH, e, start_timestamp, end_timestamp, event_type, cursor)
+            return [{"transactions_processed": 0, "events_processed": 0} for _ in event_types]
+        return await asyncio.gather(*(
+            self.process_time_range_async(
+                starts[event_type], end_timestamp, event_type=event_type, first_page=first_page, cursor=cursors.get(event_type)
+            )
+            for event_type, first_page in zip(event_types, first_pages)
+        ))
+
+    async def process_since_watermark_async(self, end_time, default_start, sharded=None):
+        """
+        Process everything committed after the stored watermarks up to end_time.
+
+        Args:
+            end_time: End of the range
+            default_start: Start of the range for entities that have no watermark yet
+            sharded: Fetch as concurrent sub-windows, by default when the range is wider
+                than Settings.SHARD_INITIAL_WINDOW
+
+        Returns:
+            dict: Statistics about the processed data
+        """
+        end_timestamp = self._to_timestamp(end_time)
+        default_timestamp = self._to_timestamp(default_start)
+        cursors = await asyncio.to_thread(self.get_watermarks)
+        start_timestamp = min(cursor[0] if cursor else default_timestamp for cursor in cursors.values())
+        if sharded is None:
+            sharded = end_timestamp - start_timestamp > Settings.SHARD_INITIAL_WINDOW.total_seconds()
+        logger.debug(f"Resuming {self.processor.dex_id} from {cursors} up to {end_timestamp}")
+
+        if Settings.FETCH_MODE == 'events':
+            return await self.process_time_range_events(default_timestamp, end_timestamp, sharded=sharded, cursors=cursors)
+        if sharded:
+            return await self.process_time_range_sharded(start_timestamp, end_timestamp, cursor=cursors[None])
+        return await self.process_time_range_async(start_timestamp, end_timestamp, cursor=cursors[None])
+
+    def get_watermarks(self):
+        """
+        Return the stored watermark of every paged entity, keyed by event type, None for transactions
+
+        Entities without a watermark yet map to None.
+        """
+        event_types = self.querier.get_event_types() if Settings.FETCH_MODE == 'events' else [None]
+        return {
+            event_type: self.db.get_watermark(self.processor.dex_id, event_type or TRANSACTIONS)
+            for event_type in event_types
+        }
+
+    def get_stage_metrics(self):
+        """Report the throughput counters of every stage, accumulated across runs"""
+        return {name: stats.as_dict() for name, stats in self.stage_stats.items()}
+
     def process_tokens(self):
         """Process tokens from the DEX."""
         total_tokens = 0
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+FETCH = 'fetch'
+PROCESS = 'process'
+INSERT = 'insert'
+
+
+@dataclass
+class DeadLetter:
+    dex_id: str
+    stage: str                                   # Stage that gave up: 'fetch', 'process' or 'insert'
+    error: str
+    start_timestamp: int                         # Window of the page
+    end_timestamp: int
+    event_type: Optional[str] = None             # Paged event entity, None for transactions
+    cursor: Optional[Tuple[int, str]] = None     # Cursor the page was requested after
+    payload: Optional[Dict[str, Any]] = None     # Fetched page, None when it has to be fetched again
+    attempts: int = 0                            # Replays that failed
+    created_at: float = field(default_factory=time.time)
+    id: str = ''
+
+
+class DeadLetterStore:
+    """
+    Directory of pages that could not be stored after their retries.
+
+    Every letter is a JSON file holding the window and cursor of the page and, when it
+    was fetched, the page itself, so replaying it does not query the subgraph again.
+    Files are written to a temporary name and renamed, a crash never leaves a partial
+    letter behind.
+    """
+
+    def __init__(self, directory: str = Settings.DEAD_LETTER_DIR):
+        """
+        Initialize the store
+
+        Args:
+            directory: Directory holding the letters
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def put(self, letter: DeadLetter) -> str:
+        """Store a letter, return its id"""
+        if not letter.id:
+            letter.id = f"{int(letter.created_at * 1000)}-{letter.dex_id}-{uuid.uuid4().hex[:8]}"
+        path = self._path(letter.id)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(asdict(letter), f)
+            os.replace(path + '.tmp', path)
+        logger.warning(f"Dead-lettered {letter.stage} of {letter.dex_id} page after {letter.cursor}: {letter.error}")
+        return letter.id
+
+    def list(self, dex_id: Optional[str] = None) -> List[DeadLetter]:
+        """Return the stored letters, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        letters = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable dead letter {name}: {e}")
+                continue
+            if data.get('cursor'):
+                data['cursor'] = tuple(data['cursor'])
+            letter = DeadLetter(**data)
+            if dex_id is None or letter.dex_id == dex_id:
+                letters.append(letter)
+        return letters
+
+    def remove(self, letter_id: str):
+        """Delete a letter once it has been replayed"""
+        with self._lock:
+            try:
+                os.remove(self._path(letter_id))
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.list())
+
+    def _path(self, letter_id: str) -> str:
+        return os.path.join(self.directory, f"{letter_id}.json")
+
+
+_dead_letter_store: Optional[DeadLetterStore] = None
+_dead_letter_store_lock = threading.Lock()
+
+
+def get_dead_letter_store() -> DeadLetterStore:
+    """Return the process-wide dead-letter store, creating it on first use"""
+    global _dead_letter_store
+    if _dead_letter_store is None:
+        with _dead_letter_store_lock:
+            if _dead_letter_store is None:
+                _dead_letter_store = DeadLetterStore()
+    return _dead_letter_store
@@ -1,5 +1,5 @@
 from .base_pipeline import BasePipeline
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import logging
 
@@ -13,7 +13,7 @@ class GraphPipeline(BasePipeline):
         self.dexId = dexId
         logger.info(f"Initialized GraphPipeline for {dexId}")
         
-    def fetch_data(self, start_timestamp, end_timestamp, skip : int) -> List[Dict[str, Any]]:
+    def fetch_data(self, start_timestamp, end_timestamp, cursor: Optional[Tuple[int, str]] = None) -> List[Dict[str, Any]]:
         """Fetch data from QuickswapV3."""
             
         # Convert datetime to UNIX timestamps if needed
@@ -22,8 +22,8 @@ class GraphPipeline(BasePipeline):
         if isinstance(end_timestamp, datetime):
             end_timestamp = int(end_timestamp.timestamp())
             
-        logger.debug(f"Fetching QuickswapV3 data: {start_timestamp} to {end_timestamp}, skip={skip}")
-        return self.querier.get_transactions(start_timestamp, end_timestamp, skip=skip)
+        logger.debug(f"Fetching QuickswapV3 data: {start_timestamp} to {end_timestamp}, cursor={cursor}")
+        return self.querier.get_transactions(start_timestamp, end_timestamp, cursor=cursor)
     
     def fetch_tokens(self, skip : int) -> List[Dict[str, Any]]:
         """Fetch tokens from Aerodrome."""
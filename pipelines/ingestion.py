@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from config.settings import Settings
+from query.rate_limiter import get_rate_limiter
+from query.transport import get_async_transport
+from .scheduler import Scheduler
+from .work_queue import WorkQueueWorker
+
+logger = logging.getLogger(__name__)
+
+
+async def run_pipeline(pipeline, default_start, end_time):
+    """
+    Run the pipeline from its stored watermarks up to end_time asynchronously
+
+    DEXes without a watermark yet start at default_start, wide ranges are fetched as
+    concurrent sub-windows.
+    """
+    try:
+        logger.info(f"Starting pipeline for {pipeline.dexId} up to {end_time}")
+        stats = await pipeline.process_since_watermark_async(end_time, default_start)
+        logger.info(
+            f"Pipeline completed: {stats['transactions_processed']} transactions, "
+            f"{stats['events_processed']} events."
+        )
+        return stats
+    except Exception as e:
+        logger.error(f"Error in pipeline {pipeline.__class__.__name__}: {e}", exc_info=True)
+
+async def initial_query(pipelines):
+    """
+    Catch up every pipeline from its watermark, or from the previous day on a fresh database
+    """
+    start_time = datetime.now() - timedelta(days=1)
+    end_time = datetime.now()
+    logger.info(f"Starting initial query up to {end_time}, fresh DEXes from {start_time.date()}")
+
+    tasks = []
+    for pipeline in pipelines.values():
+        tasks.append(run_pipeline(pipeline, start_time, end_time))
+
+    # Run all initial queries concurrently
+    await asyncio.gather(*tasks)
+    logger.info("Initial query completed.")
+
+async def query_loop(pipelines):
+    """
+    Keep following every DEX on its own schedule
+    """
+    scheduler = Scheduler(pipelines, interval=int(Settings.QUERY_INTERVAL))
+    await asyncio.gather(scheduler.run(), report_metrics(pipelines, scheduler=scheduler))
+
+async def report_metrics(pipelines, scheduler=None, worker=None):
+    """
+    Log transport, rate limiter, connection pool, stage and scheduler or work queue metrics at regular intervals
+    """
+    db = next(iter(pipelines.values())).db
+    interval = int(Settings.QUERY_INTERVAL)
+    while True:
+        await asyncio.sleep(interval)
+        metrics = get_async_transport().get_metrics()
+        logger.info(
+            f"HTTP transport: {metrics['requests']} requests, {metrics['connections_opened']} connections opened, "
+            f"{metrics['connections_reused']} reused"
+        )
+        limits = get_rate_limiter().get_metrics()
+        logger.info(
+            f"Rate limiter: {limits['rate']} requests/s, concurrency {limits['concurrency']}, "
+            f"{limits['throttled']} throttled, {limits['errors']} failed of {limits['requests']} requests"
+        )
+        pool = db.get_pool_metrics()
+        logger.info(
+            f"Database pool: {pool['in_use']} of {pool['size']} connections in use, {pool['waits']} of "
+            f"{pool['checkouts']} checkouts waited, {pool['avg_wait_ms']} ms on average, {pool['max_wait_ms']} ms at most"
+        )
+        for dex_id, pipeline in pipelines.items():
+            logger.info(f"Stages of {dex_id}: {pipeline.get_stage_metrics()}")
+        if scheduler is not None:
+            for dex_id, schedule in scheduler.get_metrics().items():
+                logger.info(f"Schedule of {dex_id}: {schedule}")
+        if worker is not None:
+            logger.info(f"Work queue {worker.owner}: {worker.get_metrics()}")
+
+async def ingest(pipelines):
+    """
+    Run the initial catch-up before the live loop, so both never page the same range
+
+    With WORK_QUEUE set the windows are shared with the other ingestors through the database instead
+    """
+    if Settings.WORK_QUEUE:
+        worker = WorkQueueWorker(pipelines)
+        await asyncio.gather(worker.run(), report_metrics(pipelines, worker=worker))
+        return
+    await initial_query(pipelines)
+    await query_loop(pipelines)
@@ -0,0 +1,74 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Processors of the worker process, keyed by DEX, built once and reused between pages
+_processors: Dict[str, Any] = {}
+
+
+def process_page(dex_id: str, event_type: Optional[str], body: bytes, pools: List[Dict[str, Any]], pool_entity: str) -> Dict[str, List[tuple]]:
+    """
+    Decode and process a raw page in a worker process.
+
+    Only the raw body and the pools it references are sent to the worker, and only
+    the insert-ready rows are sent back, so no model objects cross the process boundary.
+
+    Args:
+        dex_id: DEX whose processor handles the page
+        event_type: Type of the top level events in the page, None for a transactions page
+        body: Raw response body of the page
+        pools: Pools referenced by the page, attached to its events before processing
+        pool_entity: Name of the pool field of the events
+
+    Returns:
+        Rows per table, as built by Database.event_rows
+    """
+    # Imported here, the parent process does not need them to submit pages
+    from database.database import Database
+    from factory.processor_factory import ProcessorFactory
+    from query.pool_cache import attach_pools
+    from query.streaming import loads
+
+    processor = _processors.get(dex_id)
+    if processor is None:
+        processor = _processors[dex_id] = ProcessorFactory.get_processor(dex_id)
+    raw_data = loads(body)
+    attach_pools(raw_data, {pool['id']: pool for pool in pools}, pool_entity)
+    if event_type:
+        events = processor.process_event_responses(event_type, raw_data)
+    else:
+        events = processor.process_bulk_responses(raw_data)
+    return Database.event_rows(events)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process-wide pool of processing workers, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                # Spawned workers do not inherit the event loop, sockets or locks of the parent
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=Settings.PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                logger.info(f"Started process pool with {Settings.PROCESS_WORKERS} workers")
+    return _process_pool
+
+
+def close_process_pool():
+    """Shut the processing workers down"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
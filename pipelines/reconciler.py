@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from config.settings import Settings
+from database.database import EVENT_TABLES
+from query.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# sync_state key of the reconciliation checkpoint of a DEX
+RECONCILED = 'reconciled'
+
+
+class Reconciler:
+    """
+    Find and refetch the minutes of a DEX whose stored events fall short of the subgraph.
+
+    Windows are checked oldest first from the last checkpoint. For every event type the
+    stored events are counted per minute and compared with the subgraph, which is asked
+    for event ids only. Runs of minutes with missing events are refetched by paging that
+    event type directly, the rest of the window is left alone. The checkpoint moves past
+    a window once its gaps have been refetched.
+
+    Only windows older than the reconcile lag are checked, live ingestion may still be
+    writing more recent ones. Events the processors drop, such as swaps without amounts,
+    look missing as well, their minutes are refetched once when their window is checked.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        window: int = int(Settings.RECONCILE_WINDOW.total_seconds()),
+        lag: float = Settings.RECONCILE_LAG.total_seconds(),
+        priority: float = Settings.BACKFILL_PRIORITY,
+        bucket: int = 60,
+    ):
+        """
+        Initialize the reconciler
+
+        Args:
+            pipeline: Pipeline of the DEX, dedicated to reconciliation
+            window: Seconds of events compared at once
+            lag: Only windows that ended at least this many seconds ago are checked
+            priority: Rate limiter weight of the reconciliation requests, live requests weigh 1
+            bucket: Width in seconds of the buckets counts are compared in
+        """
+        self.pipeline = pipeline
+        self.db = pipeline.db
+        self.querier = pipeline.querier
+        self.dex_id = pipeline.processor.dex_id
+        self.window = window
+        self.lag = lag
+        self.bucket = bucket
+        # Refetched minutes lie behind the live watermark
+        self.pipeline.track_watermark = False
+        self.querier.limiter_key = f"{self.dex_id}:reconcile"
+        get_rate_limiter().set_weight(self.querier.limiter_key, priority)
+
+    async def run_once(self, default_start: Optional[int] = None) -> Dict[str, int]:
+        """
+        Check every window from the checkpoint up to the reconcile lag
+
+        Args:
+            default_start: Start of the first window when there is no checkpoint yet, defaults to one day ago
+
+        Returns:
+            dict: Windows checked, gaps found, minutes and events refetched
+        """
+        event_types = [event_type for event_type in self.querier.get_event_types() if event_type in EVENT_TABLES]
+        totals = {"windows": 0, "gaps": 0, "minutes": 0, "events_refetched": 0}
+        if not event_types:
+            logger.warning(f"{self.dex_id} cannot page events directly, nothing to reconcile")
+            return totals
+
+        checkpoint = await asyncio.to_thread(self.db.get_watermark, self.dex_id, RECONCILED)
+        start = checkpoint[0] + 1 if checkpoint else default_start or int(time.time()) - 86400
+        until = int(time.time() - self.lag)
+        while start + self.window - 1 <= until:
+            end = start + self.window - 1
+            for event_type in event_types:
+                gaps = await self.find_gaps(event_type, start, end)
+                for gap_start, gap_end in gaps:
+                    stats = await self.pipeline.process_time_range_async(gap_start, gap_end, event_type=event_type)
+                    totals["events_refetched"] += stats["events_processed"]
+                    totals["minutes"] += (gap_end - gap_start) // self.bucket + 1
+                totals["gaps"] += len(gaps)
+            await asyncio.to_thread(self.db.set_watermark, self.dex_id, RECONCILED, (end, ''))
+            totals["windows"] += 1
+            start = end + 1
+
+        if totals["windows"]:
+            logger.info(f"Reconciled {self.dex_id} up to {start - 1}: {totals}")
+        return totals
+
+    async def find_gaps(self, event_type: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Compare stored and subgraph event counts of a window
+
+        Returns:
+            (start, end) of every run of consecutive buckets missing events, both inclusive
+        """
+        remote = await self.querier.count_events_async(event_type, start, end, self.bucket)
+        local = await asyncio.to_thread(self.db.count_events, event_type, self.dex_id, start, end, self.bucket)
+        missing = sorted(bucket for bucket, count in remote.items() if local.get(bucket, 0) < count)
+
+        gaps: List[Tuple[int, int]] = []
+        for bucket in missing:
+            bucket_end = min(bucket + self.bucket - 1, end)
+            if gaps and gaps[-1][1] + 1 >= bucket:
+                gaps[-1] = (gaps[-1][0], bucket_end)
+            else:
+                gaps.append((max(bucket, start), bucket_end))
+        if gaps:
+            logger.info(f"{self.dex_id} is missing {event_type} in {len(missing)} minutes between {start} and {end}")
+        return gaps
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Optional
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DexSchedule:
+    dex_id: str
+    interval: float                      # Seconds between the starts of two runs
+    deadline: float = 0.0                # Monotonic time by which the current run should be done
+    running: bool = False
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0                     # Runs not started because the previous one was still going
+    missed_deadlines: int = 0
+    last_duration: float = 0.0
+    synced_until: Optional[int] = None   # Timestamp up to which the DEX has been stored
+    lags: Deque[float] = field(default_factory=lambda: deque(maxlen=Settings.SCHEDULER_LAG_SAMPLES))
+
+    @property
+    def lag(self) -> Optional[float]:
+        """Seconds between now and the newest data stored"""
+        return time.time() - self.synced_until if self.synced_until is not None else None
+
+    def lag_percentile(self, percentile: float) -> Optional[float]:
+        """Lag observed at the end of runs, at the given percentile of the recent runs"""
+        if not self.lags:
+            return None
+        ordered = sorted(self.lags)
+        return ordered[min(math.ceil(percentile / 100 * len(ordered)) - 1, len(ordered) - 1)]
+
+    def as_dict(self) -> Dict[str, Any]:
+        lag, p99 = self.lag, self.lag_percentile(99)
+        return {
+            "interval": round(self.interval, 1),
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "missed_deadlines": self.missed_deadlines,
+            "last_duration": round(self.last_duration, 2),
+            "lag": round(lag, 1) if lag is not None else None,
+            "lag_p99": round(p99, 1) if p99 is not None else None,
+        }
+
+
+class Scheduler:
+    """
+    Run every DEX pipeline on its own cadence.
+
+    Each DEX has its own loop, so a slow subgraph only delays its own data. A run is
+    expected to finish within its interval, its deadline. Runs that would start while
+    the previous run of the same DEX is still going are skipped, the next run picks up
+    everything since the watermark anyway.
+
+    Intervals adapt to activity: a run that brings in more than the target number of
+    transactions shortens the interval of its DEX, a quiet run lengthens it, within
+    Settings.SCHEDULER_MIN_INTERVAL and Settings.SCHEDULER_MAX_INTERVAL.
+    """
+
+    def __init__(
+        self,
+        pipelines: Dict[str, Any],
+        interval: Optional[float] = None,
+        min_interval: float = Settings.SCHEDULER_MIN_INTERVAL.total_seconds(),
+        max_interval: float = Settings.SCHEDULER_MAX_INTERVAL.total_seconds(),
+        target_rows: int = Settings.SCHEDULER_TARGET_ROWS,
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            pipelines: Pipelines keyed by DEX ID
+            interval: Initial seconds between runs of a DEX, defaults to Settings.QUERY_INTERVAL
+            min_interval: Lower bound of the adapted intervals
+            max_interval: Upper bound of the adapted intervals
+            target_rows: Transactions a run should bring in, intervals adapt towards it
+        """
+        interval = interval if interval is not None else float(Settings.QUERY_INTERVAL)
+        self.pipelines = pipelines
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_rows = target_rows
+        self.schedules = {
+            dex_id: DexSchedule(dex_id, min(max(interval, min_interval), max_interval))
+            for dex_id in pipelines
+        }
+
+    async def run(self):
+        """Run every DEX on its own schedule, forever"""
+        await asyncio.gather(*(self._run_dex(dex_id) for dex_id in self.pipelines))
+
+    async def _run_dex(self, dex_id: str):
+        schedule = self.schedules[dex_id]
+        next_start = time.monotonic()
+        while True:
+            await asyncio.sleep(max(next_start - time.monotonic(), 0))
+            started = time.monotonic()
+            schedule.deadline = started + schedule.interval
+            await self.run_once(dex_id)
+
+            next_start = started + schedule.interval
+            now = time.monotonic()
+            if now > next_start:
+                # Starts that fell within the run are dropped, the next one starts right away
+                skipped = int((now - next_start) // schedule.interval) + 1
+                schedule.skipped += skipped
+                next_start = now
+                logger.debug(f"Skipped {skipped} runs of {dex_id} overlapping the previous one")
+
+    async def run_once(self, dex_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Run the pipeline of a DEX from its watermark up to now and adapt its interval
+
+        Returns:
+            dict: Statistics of the run, None when it failed
+        """
+        schedule = self.schedules[dex_id]
+        pipeline = self.pipelines[dex_id]
+        end_time = datetime.now()
+        default_start = end_time - timedelta(seconds=int(schedule.interval * 1.5))
+        schedule.running = True
+        started = time.monotonic()
+        try:
+            stats = await pipeline.process_since_watermark_async(end_time, default_start)
+        except Exception as e:
+            schedule.failures += 1
+            logger.error(f"Error in pipeline {pipeline.__class__.__name__} of {dex_id}: {e}", exc_info=True)
+            return None
+        finally:
+            schedule.running = False
+            schedule.last_duration = time.monotonic() - started
+            schedule.runs += 1
+            if time.monotonic() > schedule.deadline:
+                schedule.missed_deadlines += 1
+                logger.warning(f"Run of {dex_id} took {schedule.last_duration:.1f}s, past its {schedule.interval:.0f}s interval")
+
+        schedule.synced_until = stats["synced_until"]
+        schedule.lags.append(schedule.lag)
+        self._adapt(schedule, stats["transactions_processed"])
+        logger.info(
+            f"{dex_id}: {stats['transactions_processed']} transactions, {stats['events_processed']} events "
+            f"in {schedule.last_duration:.1f}s, lag {schedule.lag:.0f}s, next run in {schedule.interval:.0f}s"
+        )
+        return stats
+
+    def _adapt(self, schedule: DexSchedule, rows: int):
+        """Move the interval halfway towards the one that would have brought in target_rows"""
+        ideal = schedule.interval * self.target_rows / max(rows, 1)
+        interval = (schedule.interval + ideal) / 2
+        schedule.interval = min(max(interval, self.min_interval), self.max_interval)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Report interval, run counters and lag of every DEX"""
+        return {dex_id: schedule.as_dict() for dex_id, schedule in self.schedules.items()}
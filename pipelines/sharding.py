@@ -0,0 +1,131 @@
+import heapq
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Shard:
+    start: int                              # First second covered by the shard
+    end: int                                # Last second covered by the shard (inclusive)
+    cursor: Optional[Tuple[int, str]] = None  # (timestamp, id) of the last transaction already fetched
+
+    @property
+    def width(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        """Keyset position the shard starts after, an empty id precedes every row of its first second"""
+        return self.cursor or (self.start, "")
+
+
+class ShardPlanner:
+    """
+    Split a time range into sub-windows that can be fetched concurrently.
+
+    Windows are handed out from the front of the range with an adaptive width. When the
+    first page of a window comes back full the rest of the window is split in two, and
+    following windows are made narrower. When pages come back sparse following windows
+    are made wider, merging what would otherwise have been several neighbouring windows.
+
+    Windows complete out of order. The planner tracks the windows still open and the ones
+    that failed, the watermark only covers the contiguous prefix of the range stored before
+    the first of them.
+    """
+
+    def __init__(self, start: int, end: int, page_size: int, initial_width: int, min_width: int, max_width: int, cursor: Optional[Tuple[int, str]] = None):
+        """
+        Initialize the planner
+
+        Args:
+            start: Start timestamp of the range
+            end: End timestamp of the range (inclusive)
+            page_size: Number of transactions returned by a full page
+            initial_width: Width in seconds of the first windows
+            min_width: Windows narrower than this are paged serially instead of split
+            max_width: Upper bound for the width of merged windows
+            cursor: (timestamp, id) already fetched in the first window, to resume from a watermark
+        """
+        self.next_start = start
+        self.end = end
+        self.page_size = page_size
+        self.width = initial_width
+        self.min_width = min_width
+        self.max_width = max_width
+        self.pending = deque()
+        self.first_cursor = cursor
+        self.shards_planned = 0
+        # Start positions of the windows handed out or pending and not recorded yet
+        self._open = Counter()
+        self._failed: Optional[Tuple[int, str]] = None
+        self._committed: List[Tuple[int, str]] = []
+        self._watermark: Optional[Tuple[int, str]] = None
+
+    def next_shard(self) -> Optional[Shard]:
+        """Return the next window to fetch, None once the whole range has been handed out"""
+        if self.pending:
+            return self.pending.popleft()
+        if self.next_start > self.end:
+            return None
+        shard = Shard(self.next_start, min(self.next_start + self.width - 1, self.end), self.first_cursor)
+        self.first_cursor = None
+        self.next_start = shard.end + 1
+        self.shards_planned += 1
+        self._open[shard.key] += 1
+        return shard
+
+    def record_page(self, shard: Shard, rows: int, cursor: Optional[Tuple[int, str]], failed: bool = False):
+        """
+        Feed back the size of a fetched page and schedule the remainder of its window.
+
+        Args:
+            shard: Window the page was fetched for
+            rows: Number of transactions in the page
+            cursor: (timestamp, id) of the last transaction in the page
+            failed: The page was dead-lettered instead of stored, the watermark stops before it
+        """
+        self._open[shard.key] -= 1
+        if not self._open[shard.key]:
+            del self._open[shard.key]
+        if failed:
+            self._failed = min(self._failed or shard.key, shard.key)
+        elif cursor is not None:
+            heapq.heappush(self._committed, cursor)
+        self._schedule_rest(shard, rows, cursor)
+        self._advance_watermark()
+
+    @property
+    def watermark(self) -> Optional[Tuple[int, str]]:
+        """Cursor of the last row before which every window has been stored, None when no row has been"""
+        return self._watermark
+
+    def _advance_watermark(self):
+        frontier = min(list(self._open) + ([self._failed] if self._failed else []), default=None)
+        while self._committed and (frontier is None or self._committed[0] <= frontier):
+            self._watermark = heapq.heappop(self._committed)
+
+    def _schedule(self, shard: Shard):
+        self._open[shard.key] += 1
+        self.pending.append(shard)
+
+    def _schedule_rest(self, shard: Shard, rows: int, cursor: Optional[Tuple[int, str]]):
+        if rows < self.page_size:
+            # Window is exhausted, widen the next ones if it was sparse
+            if rows < self.page_size // 4:
+                self.width = min(self.width * 2, self.max_width)
+            return
+
+        self.width = max(self.width // 2, self.min_width)
+        remaining = Shard(cursor[0], shard.end, cursor)
+        if remaining.width < 2 * self.min_width:
+            self._schedule(remaining)
+            return
+
+        middle = remaining.start + remaining.width // 2
+        self._schedule(Shard(remaining.start, middle - 1, cursor))
+        self._schedule(Shard(middle, remaining.end))
+        self.shards_planned += 1
+        logger.debug(f"Split dense window {remaining.start}-{remaining.end} at {middle}")
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0          # Items handed to the next stage
+    rows: int = 0           # Rows carried by those items
+    busy: float = 0.0       # Seconds spent producing or handling items
+    blocked: float = 0.0    # Seconds waiting for room in the next queue (backpressure)
+    starved: float = 0.0    # Seconds waiting for the previous stage
+
+    @property
+    def throughput(self) -> float:
+        """Rows per second of busy time"""
+        return self.rows / self.busy if self.busy else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "rows": self.rows,
+            "rows_per_sec": round(self.throughput, 1),
+            "busy": round(self.busy, 2),
+            "blocked": round(self.blocked, 2),
+            "starved": round(self.starved, 2),
+        }
+
+
+@dataclass
+class Stage:
+    name: str
+    handle: Callable[[Any], Awaitable[Any]]      # Turns an item into the item of the next stage
+    count: Callable[[Any], int] = lambda item: 1  # Rows carried by an item, for the throughput counters
+
+
+class StageRunner:
+    """
+    Run a source and a chain of stages concurrently, connected by bounded queues.
+
+    A stage that falls behind fills its input queue, which blocks the stage before it
+    until there is room again, so a slow database throttles fetching instead of piling
+    up pages in memory. Each stage handles one item at a time, keeping items in order.
+    When any stage fails the other stages are cancelled and the error is raised.
+    """
+
+    def __init__(self, queue_size: int = Settings.PIPELINE_QUEUE_SIZE):
+        """
+        Initialize the runner
+
+        Args:
+            queue_size: Maximum number of items waiting between two stages
+        """
+        self.queue_size = queue_size
+
+    async def run(
+        self,
+        source_name: str,
+        source: AsyncIterator[Any],
+        stages: List[Stage],
+        source_count: Callable[[Any], int] = lambda item: 1,
+        stats: Optional[Dict[str, StageStats]] = None,
+    ) -> Dict[str, StageStats]:
+        """
+        Drain the source through the stages
+
+        Args:
+            source_name: Name of the source stage in the counters
+            source: Async iterator producing the items of the first stage
+            stages: Stages in order, the last stage's results are discarded
+            source_count: Rows carried by a source item
+            stats: Counters to add to, keyed by stage name, created when missing
+
+        Returns:
+            Counters of every stage keyed by stage name
+        """
+        stats = stats if stats is not None else {}
+        for name in [source_name] + [stage.name for stage in stages]:
+            stats.setdefault(name, StageStats(name))
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+
+        tasks = [asyncio.create_task(self._produce(source, queues[0], source_count, stats[source_name]))]
+        for i, stage in enumerate(stages):
+            output = queues[i + 1] if i + 1 < len(queues) else None
+            tasks.append(asyncio.create_task(self._work(stage, queues[i], output, stats[stage.name])))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return stats
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item: Any, stats: StageStats):
+        started = time.monotonic()
+        await queue.put(item)
+        stats.blocked += time.monotonic() - started
+
+    async def _produce(self, source: AsyncIterator[Any], output: asyncio.Queue, count, stats: StageStats):
+        started = time.monotonic()
+        async for item in source:
+            stats.busy += time.monotonic() - started
+            stats.items += 1
+            stats.rows += count(item)
+            await self._put(output, item, stats)
+            started = time.monotonic()
+        stats.busy += time.monotonic() - started
+        await self._put(output, _DONE, stats)
+
+    async def _work(self, stage: Stage, input: asyncio.Queue, output: Optional[asyncio.Queue], stats: StageStats):
+        while True:
+            started = time.monotonic()
+            item = await input.get()
+            stats.starved += time.monotonic() - started
+            if item is _DONE:
+                if output is not None:
+                    await self._put(output, _DONE, stats)
+                return
+            started = time.monotonic()
+            result = await stage.handle(item)
+            stats.busy += time.monotonic() - started
+            stats.items += 1
+            stats.rows += stage.count(item)
+            if output is not None:
+                await self._put(output, result, stats)
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkQueueWorker:
+    """
+    Ingest windows claimed from the work_units table, so several ingestors can share the work.
+
+    Every ingestor queues the windows of its DEXes up to the present. Windows are aligned
+    on multiples of the window width, so ingestors queue identical windows and the unique
+    constraint keeps one of each. Windows are then claimed under a lease that is extended
+    by heartbeats while the window is processed. A window whose ingestor dies is claimed
+    again once its lease has expired, a window whose lease was lost is abandoned.
+
+    Progress is tracked by the queue instead of the watermarks, windows complete out of order.
+    """
+
+    def __init__(
+        self,
+        pipelines: Dict[str, Any],
+        concurrency: int = Settings.WORK_CONCURRENCY,
+        window: int = int(Settings.WORK_WINDOW.total_seconds()),
+        lease: float = Settings.WORK_LEASE.total_seconds(),
+        settle: float = Settings.WORK_SETTLE.total_seconds(),
+        poll_interval: float = Settings.WORK_POLL_INTERVAL.total_seconds(),
+        owner: Optional[str] = None,
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            pipelines: Pipelines keyed by DEX ID, this ingestor only claims windows of these DEXes
+            concurrency: Windows processed at once by this ingestor
+            window: Width of the windows in seconds
+            lease: Seconds a window stays claimed without a heartbeat
+            settle: Seconds a window has to be over before it is queued, so the subgraph has indexed it
+            poll_interval: Seconds to wait before looking for work again when the queue is empty
+            owner: Identifier of this ingestor in the queue, unique per process by default
+        """
+        self.pipelines = pipelines
+        self.db = next(iter(pipelines.values())).db
+        self.concurrency = concurrency
+        self.window = window
+        self.lease = lease
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        for pipeline in pipelines.values():
+            pipeline.track_watermark = False
+        self.claimed = 0
+        self.completed = 0
+        self.released = 0
+        self.lost = 0
+        self.transactions = 0
+
+    async def run(self, default_start: Optional[int] = None):
+        """
+        Queue and process windows, forever
+
+        Args:
+            default_start: Start of the first window of a DEX nothing was queued for yet,
+                defaults to its watermark or one day ago
+        """
+        logger.info(f"Starting work queue ingestor {self.owner} with {self.concurrency} workers")
+        await asyncio.gather(
+            self._plan_loop(default_start),
+            *(self._work_loop() for _ in range(self.concurrency)),
+        )
+
+    async def _plan_loop(self, default_start: Optional[int]):
+        while True:
+            try:
+                reclaimed = await asyncio.to_thread(self.db.reclaim_expired_leases)
+                if reclaimed:
+                    logger.warning(f"Reclaimed {reclaimed} windows whose ingestor stopped sending heartbeats")
+            except Exception as e:
+                logger.error(f"Error reclaiming expired leases: {e}", exc_info=True)
+            for dex_id in self.pipelines:
+                try:
+                    await self.plan(dex_id, default_start)
+                except Exception as e:
+                    logger.error(f"Error queuing windows of {dex_id}: {e}", exc_info=True)
+            await asyncio.sleep(self.window)
+
+    async def plan(self, dex_id: str, default_start: Optional[int] = None) -> int:
+        """
+        Queue the windows of a DEX that are over since the last one queued
+
+        Returns:
+            int: Number of windows added by this ingestor
+        """
+        frontier = await asyncio.to_thread(self.db.get_work_frontier, dex_id)
+        if frontier is not None:
+            start = frontier + 1
+        else:
+            # Start from the entity that is furthest behind, like a resumed pipeline does
+            watermarks = await asyncio.to_thread(self.pipelines[dex_id].get_watermarks)
+            default_start = default_start or int(time.time()) - 86400
+            start = min(watermark[0] if watermark else default_start for watermark in watermarks.values())
+        units = self.plan_windows(dex_id, start, int(time.time() - self.settle))
+        added = await asyncio.to_thread(self.db.enqueue_work_units, units)
+        if added:
+            logger.info(f"Queued {added} windows of {dex_id} from {start}")
+        return added
+
+    def plan_windows(self, dex_id: str, start: int, until: int) -> List[Tuple[str, int, int]]:
+        """Return the aligned windows from start that are over by until, the first one may be partial"""
+        units = []
+        window_start = start
+        while True:
+            window_end = (window_start // self.window + 1) * self.window - 1
+            if window_end > until:
+                return units
+            units.append((dex_id, window_start, window_end))
+            window_start = window_end + 1
+
+    async def _work_loop(self):
+        dex_ids = list(self.pipelines)
+        while True:
+            try:
+                unit = await asyncio.to_thread(self.db.claim_work_unit, self.owner, dex_ids, self.lease)
+            except Exception as e:
+                logger.error(f"Error claiming work: {e}", exc_info=True)
+                unit = None
+            if unit is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.claimed += 1
+            try:
+                await self.process_unit(unit)
+            except Exception as e:
+                # The lease runs out and the window is claimed again
+                logger.error(f"Error processing window {unit['id']} of {unit['dex_id']}: {e}", exc_info=True)
+
+    async def process_unit(self, unit: Dict[str, Any]):
+        """Process a claimed window while a heartbeat keeps its lease, then mark it done"""
+        pipeline = self.pipelines[unit['dex_id']]
+        work = asyncio.create_task(self._process_window(pipeline, unit['window_start'], unit['window_end']))
+        heartbeat = asyncio.create_task(self._heartbeat(unit, work))
+        try:
+            stats = await work
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                # The lease went to another ingestor, which processes the window now
+                self.lost += 1
+                logger.warning(f"Abandoned window {unit['id']} of {unit['dex_id']} after losing its lease")
+                return
+            raise
+        except Exception as e:
+            self.released += 1
+            logger.error(f"Window {unit['id']} of {unit['dex_id']} failed, handing it back: {e}", exc_info=True)
+            await asyncio.to_thread(self.db.release_work_unit, unit['id'], self.owner)
+            return
+        finally:
+            heartbeat.cancel()
+
+        self.transactions += stats["transactions_processed"]
+        if stats["synced_until"] < unit['window_end']:
+            # Not indexed yet, the lease runs out and the window is claimed again later
+            logger.info(f"Window {unit['id']} of {unit['dex_id']} only indexed up to {stats['synced_until']}")
+            return
+        if await asyncio.to_thread(self.db.complete_work_unit, unit['id'], self.owner):
+            self.completed += 1
+        else:
+            self.lost += 1
+            logger.warning(f"Window {unit['id']} of {unit['dex_id']} was completed after its lease expired")
+
+    @staticmethod
+    async def _process_window(pipeline, start: int, end: int) -> Dict[str, Any]:
+        if Settings.FETCH_MODE == 'events':
+            return await pipeline.process_time_range_events(start, end)
+        return await pipeline.process_time_range_async(start, end)
+
+    async def _heartbeat(self, unit: Dict[str, Any], work: asyncio.Task):
+        """Extend the lease a few times per lease period, cancel the work once the lease is lost"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                held = await asyncio.to_thread(self.db.heartbeat_work_unit, unit['id'], self.owner, self.lease)
+            except Exception as e:
+                # Keep trying, the lease is only lost once it has expired
+                logger.warning(f"Heartbeat of window {unit['id']} failed: {e}")
+                continue
+            if not held:
+                work.cancel()
+                return
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Report windows claimed, completed, handed back and lost by this ingestor"""
+        return {
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "released": self.released,
+            "lost": self.lost,
+            "transactions": self.transactions,
+        }
@@ -1,11 +1,20 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List
 from database.models import BaseTransaction
 
 logger = logging.getLogger(__name__)
 
+# Order of the event lists returned by the processors
+EVENT_TYPES = ['swaps', 'mints', 'burns', 'collects', 'flashs']
+
 class BaseProcessor(ABC):
+    # Subgraph fields read by the processor, the transactions query is generated from these
+    TRANSACTION_FIELDS: List[str] = []
+    EVENT_FIELDS: Dict[str, List[str]] = {}
+    # Pool fields read by the processor, events only reference their pool by id
+    POOL_FIELDS: List[str] = []
+
     def __init__(self, dex_id: str):
         self.dex_id = dex_id
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
@@ -20,4 +29,87 @@ class BaseProcessor(ABC):
     def process_bulk_responses(self, bulk_response: Dict[str, Any]) -> List[Dict]:
         """Process the API response and return transaction and events"""
         pass
-    
+
+    def process_transactions(self, transactions: Iterable[Dict[str, Any]]) -> List[list]:
+        """
+        Process transactions one at a time, as they are decoded from a streamed response.
+
+        Returns:
+            List of events per type [swaps, mints, burns, collects, flashs]
+        """
+        results = [[], [], [], [], []]
+        try:
+            for transaction_data in transactions:
+                events = self.process_response(transaction_data)
+                for index, event_type in enumerate(EVENT_TYPES):
+                    results[index].extend(events[event_type])
+        except Exception as e:
+            self.logger.error(f"Error processing transactions on {self.dex_id}: {str(e)}", exc_info=True)
+            raise e
+        return results
+
+    def process_event_responses(self, event_type: str, response_data: Dict[str, Any]) -> List[list]:
+        """
+        Process a page of top level events of one type.
+
+        Each event is wrapped in its own transaction, rebuilt from the event's transaction
+        reference, and run through process_response like a nested event would be.
+
+        Returns:
+            List of events per type [swaps, mints, burns, collects, flashs]
+        """
+        results = [[], [], [], [], []]
+        index = EVENT_TYPES.index(event_type)
+        events = response_data['data'][event_type]
+        self.logger.debug(f"Processing {len(events)} {event_type} on {self.dex_id}")
+        try:
+            for event in events:
+                transaction_data = dict(event['transaction'])
+                transaction_data.setdefault('timestamp', event['timestamp'])
+                transaction_data[event_type] = [event]
+                results[index].extend(self.process_response(transaction_data)[event_type])
+        except Exception as e:
+            self.logger.error(f"Error processing {event_type} on {self.dex_id}: {str(e)}", exc_info=True)
+            raise e
+        return results
+
+    @classmethod
+    def get_transaction_fields(cls) -> List[str]:
+        """Return the dotted field paths to select on each transaction, including its events"""
+        fields = list(cls.TRANSACTION_FIELDS)
+        for event_type, event_fields in cls.EVENT_FIELDS.items():
+            fields.extend(f"{event_type}.{field}" for field in event_fields)
+        return fields
+
+    @classmethod
+    def get_event_fields(cls) -> Dict[str, List[str]]:
+        """
+        Return the dotted field paths to select on each top level event entity.
+
+        Events carry a reference to their transaction, the transaction fields are selected through it.
+        """
+        transaction_fields = [f"transaction.{field}" for field in cls.TRANSACTION_FIELDS]
+        return {
+            event_type: list(dict.fromkeys(['id', 'timestamp'] + event_fields + transaction_fields))
+            for event_type, event_fields in cls.EVENT_FIELDS.items()
+        }
+
+    @classmethod
+    def get_pool_fields(cls) -> List[str]:
+        """Return the dotted field paths to select on each pool"""
+        return list(cls.POOL_FIELDS)
+
+    def _get_pool(self, pool_ref: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Resolve the pool referenced by an event.
+
+        Events are fetched with the pool id only, the querier attaches the pools to the page
+        when it is fetched, so the pool never has to be looked up again here.
+
+        Raises:
+            KeyError: When the pool was not attached, the page then fails processing as a whole
+        """
+        if 'token0' in pool_ref:
+            # Event embeds the full pool
+            return pool_ref
+        raise KeyError(f"Pool {pool_ref['id']} was not attached to its page")
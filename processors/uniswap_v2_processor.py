@@ -6,6 +6,21 @@ import logging
 logger = logging.getLogger(__name__)
 
 class UniswapV2Processor(BaseProcessor):
+    # Subgraph fields read by this processor, the transactions query is generated from these
+    TRANSACTION_FIELDS = ['id', 'blockNumber', 'timestamp']
+    EVENT_FIELDS = {
+        'swaps': [
+            'id', 'timestamp', 'amount0In', 'amount1In', 'amount0Out', 'amount1Out', 'amountUSD', 'sender', 'to', 'pair.id',
+        ],
+        'mints': [
+            'id', 'timestamp', 'amount0', 'amount1', 'amountUSD', 'to', 'sender', 'liquidity', 'pair.id',
+        ],
+        'burns': [
+            'id', 'timestamp', 'amount0', 'amount1', 'amountUSD', 'to', 'sender', 'liquidity', 'pair.id',
+        ],
+    }
+    POOL_FIELDS = ['token0.id', 'token0.symbol', 'token0.name', 'token1.id', 'token1.symbol', 'token1.name']
+
     def __init__(self):
         super().__init__('uniswap_v2')
         self.logger.info("Initialized UniswapV2Processor...")
@@ -55,22 +70,24 @@ class UniswapV2Processor(BaseProcessor):
             self.logger.debug(f"Processed {len(results[0])} swaps, {len(results[1])} mints, {len(results[2])} burns, {len(results[3])} collects, {len(results[4])} flashs for a total of {len(results[0]) + len(results[1]) + len(results[2]) + len(results[3]) + len(results[4])} events.")
         except Exception as e:
             self.logger.error(f"Error processing bulk response on {self.dex_id}: {e}", exc_info=True)
+            raise e
         return results
     
     def _process_swaps(self, swaps: List[Dict], transaction: BaseTransaction) -> List[SwapEvent]:
         try:
             swap_transactions = []
             for swap in swaps:
+                pool = self._get_pool(swap['pair'])
                 swap_transaction = SwapEvent(
                     parent_transaction=transaction,
                     timestamp=int(swap['timestamp']),
                     id=swap['id'],
-                    token0_symbol=swap['pair']['token0']['symbol'],
-                    token1_symbol=swap['pair']['token1']['symbol'],
-                    token0_id=swap['pair']['token0']['id'],
-                    token1_id=swap['pair']['token1']['id'],
-                    token0_name=swap['pair']['token0']['name'],
-                    token1_name=swap['pair']['token1']['name'],
+                    token0_symbol=pool['token0']['symbol'],
+                    token1_symbol=pool['token1']['symbol'],
+                    token0_id=pool['token0']['id'],
+                    token1_id=pool['token1']['id'],
+                    token0_name=pool['token0']['name'],
+                    token1_name=pool['token1']['name'],
                     amount0=swap['amount0In'] if float(swap['amount0In']) > 0 else float(swap['amount0Out']),
                     amount1=swap['amount1In'] if float(swap['amount1In']) > 0 else float(swap['amount1Out']),
                     amount_usd=swap['amountUSD'],
@@ -91,16 +108,17 @@ class UniswapV2Processor(BaseProcessor):
         try:
             mint_transactions = []
             for mint in mints:
+                pool = self._get_pool(mint['pair'])
                 mint_transaction = MintEvent(
                     parent_transaction=transaction,
                     timestamp=int(mint['timestamp']),
                     id=mint['id'],
-                    token0_symbol=mint['pair']['token0']['symbol'],
-                    token1_symbol=mint['pair']['token1']['symbol'],
-                    token0_id=mint['pair']['token0']['id'],
-                    token1_id=mint['pair']['token1']['id'],
-                    token0_name=mint['pair']['token0']['name'],
-                    token1_name=mint['pair']['token1']['name'],
+                    token0_symbol=pool['token0']['symbol'],
+                    token1_symbol=pool['token1']['symbol'],
+                    token0_id=pool['token0']['id'],
+                    token1_id=pool['token1']['id'],
+                    token0_name=pool['token0']['name'],
+                    token1_name=pool['token1']['name'],
                     amount0=mint['amount0'],
                     amount1=mint['amount1'],
                     amount_usd=mint['amountUSD'],
@@ -122,16 +140,17 @@ class UniswapV2Processor(BaseProcessor):
         try:
             burn_transactions = []
             for burn in burns:
+                pool = self._get_pool(burn['pair'])
                 burn_transaction = BurnEvent(
                     parent_transaction=transaction,
                     timestamp=int(burn['timestamp']),
                     id=burn['id'],
-                    token0_symbol=burn['pair']['token0']['symbol'],
-                    token1_symbol=burn['pair']['token1']['symbol'],
-                    token0_id=burn['pair']['token0']['id'],
-                    token1_id=burn['pair']['token1']['id'],
-                    token0_name=burn['pair']['token0']['name'],
-                    token1_name=burn['pair']['token1']['name'],
+                    token0_symbol=pool['token0']['symbol'],
+                    token1_symbol=pool['token1']['symbol'],
+                    token0_id=pool['token0']['id'],
+                    token1_id=pool['token1']['id'],
+                    token0_name=pool['token0']['name'],
+                    token1_name=pool['token1']['name'],
                     amount0=burn['amount0'],
                     amount1=burn['amount1'],
                     amount_usd=burn['amountUSD'],
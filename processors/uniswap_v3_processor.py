@@ -7,6 +7,21 @@ logger = logging.getLogger(__name__)
 
 
 class UniswapV3Processor(BaseProcessor):
+    # Subgraph fields read by this processor, the transactions query is generated from these
+    TRANSACTION_FIELDS = ['id', 'blockNumber', 'timestamp', 'gasUsed', 'gasPrice']
+    EVENT_FIELDS = {
+        'swaps': [
+            'id', 'amount0', 'amount1', 'amountUSD', 'sender', 'recipient', 'origin', 'pool.id',
+        ],
+        'mints': [
+            'id', 'amount0', 'amount1', 'amountUSD', 'owner', 'origin', 'pool.id',
+        ],
+        'burns': [
+            'id', 'amount0', 'amount1', 'amountUSD', 'owner', 'origin', 'pool.id',
+        ],
+    }
+    POOL_FIELDS = ['token0.id', 'token0.symbol', 'token0.name', 'token1.id', 'token1.symbol', 'token1.name', 'feeTier', 'liquidity']
+
     def __init__(self):
         super().__init__('uniswap_v3')
         self.logger.info("Initialized UniswapV3Processor...")
@@ -73,24 +88,25 @@ class UniswapV3Processor(BaseProcessor):
             # Get info from the swap transaction
             swap_transactions = []
             for swap in swaps_data:
+                pool = self._get_pool(swap['pool'])
                 swap_transaction = SwapEvent(
                     parent_transaction = transaction,
                     timestamp = transaction.timestamp,
                     id = swap['id'],
-                    token0_symbol = swap['pool']['token0']['symbol'],
-                    token1_symbol = swap['pool']['token1']['symbol'],
-                    token0_name = swap['pool']['token0']['name'],
-                    token1_name = swap['pool']['token1']['name'],
-                    token0_id = swap['pool']['token0']['id'],
-                    token1_id = swap['pool']['token1']['id'],
+                    token0_symbol = pool['token0']['symbol'],
+                    token1_symbol = pool['token1']['symbol'],
+                    token0_name = pool['token0']['name'],
+                    token1_name = pool['token1']['name'],
+                    token0_id = pool['token0']['id'],
+                    token1_id = pool['token1']['id'],
                     amount0 = swap['amount0'],
                     amount1 = swap['amount1'],
                     amount_usd = swap['amountUSD'],
                     sender = swap['sender'],
                     recipient = swap['recipient'],
                     origin = swap['origin'],
-                    fee_tier = swap['pool']['feeTier'],
-                    liquidity = swap['pool']['liquidity'],
+                    fee_tier = pool['feeTier'],
+                    liquidity = pool['liquidity'],
                     dex_id = self.dex_id
                 )
                 swap_transactions.append(swap_transaction)
@@ -113,23 +129,24 @@ class UniswapV3Processor(BaseProcessor):
         try:
             mint_transactions = []
             for mint in mints_data:
+                pool = self._get_pool(mint['pool'])
                 mint_transaction = MintEvent(
                     parent_transaction = transaction,
                     timestamp = transaction.timestamp,
                     id = mint['id'],
-                    token0_symbol = mint['pool']['token0']['symbol'],
-                    token1_symbol = mint['pool']['token1']['symbol'],
-                    token0_name = mint['pool']['token0']['name'],
-                    token1_name = mint['pool']['token1']['name'],
-                    token0_id = mint['pool']['token0']['id'],
-                    token1_id = mint['pool']['token1']['id'],
+                    token0_symbol = pool['token0']['symbol'],
+                    token1_symbol = pool['token1']['symbol'],
+                    token0_name = pool['token0']['name'],
+                    token1_name = pool['token1']['name'],
+                    token0_id = pool['token0']['id'],
+                    token1_id = pool['token1']['id'],
                     amount0 = mint['amount0'],
                     amount1 = mint['amount1'],
                     amount_usd = mint['amountUSD'],
                     owner = mint['owner'],
                     origin = mint['origin'],
-                    fee_tier = mint['pool']['feeTier'],
-                    liquidity = mint['pool']['liquidity'],
+                    fee_tier = pool['feeTier'],
+                    liquidity = pool['liquidity'],
                     dex_id = self.dex_id
                 )
                 mint_transactions.append(mint_transaction)
@@ -152,23 +169,24 @@ class UniswapV3Processor(BaseProcessor):
         try:
             burn_transactions = []
             for burn in burns_data:
+                pool = self._get_pool(burn['pool'])
                 burn_transaction = BurnEvent(
                     parent_transaction = transaction,
                     timestamp = transaction.timestamp,
                     id = burn['id'],
-                    token0_symbol = burn['pool']['token0']['symbol'],
-                    token1_symbol = burn['pool']['token1']['symbol'],
-                    token0_id = burn['pool']['token0']['id'],
-                    token1_id = burn['pool']['token1']['id'],
-                    token0_name = burn['pool']['token0']['name'],
-                    token1_name = burn['pool']['token1']['name'],
+                    token0_symbol = pool['token0']['symbol'],
+                    token1_symbol = pool['token1']['symbol'],
+                    token0_id = pool['token0']['id'],
+                    token1_id = pool['token1']['id'],
+                    token0_name = pool['token0']['name'],
+                    token1_name = pool['token1']['name'],
                     amount0 = burn['amount0'],
                     amount1 = burn['amount1'],
                     amount_usd = burn['amountUSD'],
                     owner = burn['owner'],
                     origin = burn['origin'],
-                    fee_tier = burn['pool']['feeTier'],
-                    liquidity = burn['pool']['liquidity'],
+                    fee_tier = pool['feeTier'],
+                    liquidity = pool['liquidity'],
                     dex_id = self.dex_id
                 )
                 burn_transactions.append(burn_transaction)
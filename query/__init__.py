@@ -3,11 +3,31 @@ from .uniswap_v3_querier import UniswapV3Querier
 from .uniswap_v2_querier import UniswapV2Querier
 from .aerodrome_querier import AerodromeQuerier
 from .quickswap_v3_querier import QuickswapV3Querier
+from .batcher import QueryBatch
+from .pool_cache import PoolCache
+from .streaming import iter_rows, iter_rows_async, PageTracker
+from .rate_limiter import RateLimiter, get_rate_limiter, backoff_delay
+from .response_cache import ResponseCache, get_response_cache
+from .transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 __all__ = [
     'BaseQuerier',
     'UniswapV3Querier',
     'UniswapV2Querier',
     'AerodromeQuerier',
-    'QuickswapV3Querier'
+    'QuickswapV3Querier',
+    'QueryBatch',
+    'PoolCache',
+    'iter_rows',
+    'iter_rows_async',
+    'PageTracker',
+    'RateLimiter',
+    'get_rate_limiter',
+    'backoff_delay',
+    'ResponseCache',
+    'get_response_cache',
+    'HTTPTransport',
+    'AsyncHTTPTransport',
+    'get_transport',
+    'get_async_transport'
 ]
\ No newline at end of file
@@ -1,33 +1,642 @@
 import logging
+import time
 from abc import ABC, abstractmethod
+import aiohttp
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Set, Tuple
+from .batcher import QueryBatch
+from .pool_cache import PoolCache, attach_pools, pool_refs
+from .response_cache import REPLAY, ResponseCache, get_response_cache
+from .streaming import AsyncTeeReader, TeeReader, iter_rows, iter_rows_async, loads
+from config.settings import Settings
+from .queries import build_events_query, build_pools_query, get_meta_query
+from .transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 class BaseQuerier(ABC):
-    def __init__(self, url: str):
+    # Name of the pool entity in the subgraph schema
+    POOL_ENTITY = 'pool'
+
+    def __init__(
+        self,
+        url: str,
+        fields: List[str],
+        pool_fields: List[str],
+        pool_cache: Optional[PoolCache] = None,
+        event_fields: Optional[Dict[str, List[str]]] = None,
+        transport: Optional[HTTPTransport] = None,
+        async_transport: Optional[AsyncHTTPTransport] = None,
+        dex_id: Optional[str] = None,
+        response_cache: Optional[ResponseCache] = None
+    ):
         self.url = url
+        self.dex_id = dex_id
+        # Rate limiter queue of the requests, a backfill uses its own to yield to live ingestion
+        self.limiter_key = dex_id
+        self.fields = fields
+        self.pool_cache = pool_cache or PoolCache()
+        self._pools_query = build_pools_query(self.POOL_ENTITY, pool_fields)
+        self._event_queries = {
+            event_type: build_events_query(event_type, fields)
+            for event_type, fields in (event_fields or {}).items()
+        }
+        self._event_id_queries = {
+            event_type: build_events_query(event_type, ['id', 'timestamp'])
+            for event_type in self._event_queries
+        }
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or get_async_transport()
+        self.response_cache = response_cache or get_response_cache()
+        self.head_ttl = Settings.SUBGRAPH_HEAD_TTL.total_seconds()
+        self._head: Optional[Tuple[int, Optional[int]]] = None
+        self._head_fetched_at = 0.0
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         self.logger.debug(f"Initialized {self.__class__.__name__}")
 
-    @abstractmethod
-    def get_transactions(self, start_timestamp: int, end_timestamp: int, skip: int = 0) -> Dict[str, Any]:
-        """Abstract method to get transactions within a time period"""
-        pass
-    
+    def get_transactions(self, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Get a page of transactions within the specified time period
+
+        Pools referenced by the page are attached to its events before returning.
+
+        Args:
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last transaction already fetched, None for the first page
+
+        Returns:
+            Dict containing the query response data
+        """
+        variables = self._cursor_variables(start_timestamp, end_timestamp, cursor)
+        try:
+            response = self._send_page_query(self._transactions_query(), variables)
+            self.resolve_pools(response)
+            self.logger.debug(
+                f"Retrieved {len(response.get('data', {}).get('transactions', []))} "
+                f"transactions between {start_timestamp} and {end_timestamp}"
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Error getting transactions: {str(e)}", exc_info=True)
+            raise
+
+    def get_indexing_head(self) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Get the last block indexed by the subgraph, cached for Settings.SUBGRAPH_HEAD_TTL
+
+        Returns:
+            (block number, block timestamp) of the head, the timestamp is None when the
+            indexer does not report it. None when it is unknown, and always in replay mode
+            so a replayed window does not depend on the live subgraph
+        """
+        if self.response_cache.mode == REPLAY:
+            return None
+        if self._head is not None and time.monotonic() - self._head_fetched_at < self.head_ttl:
+            return self._head
+        try:
+            return self._set_head(self._send_query(get_meta_query(), {}))
+        except Exception as e:
+            self.logger.error(f"Error getting indexing head: {str(e)}", exc_info=True)
+            raise
+
+    async def get_indexing_head_async(self) -> Optional[Tuple[int, Optional[int]]]:
+        """Get the last block indexed by the subgraph without blocking the event loop"""
+        if self.response_cache.mode == REPLAY:
+            return None
+        if self._head is not None and time.monotonic() - self._head_fetched_at < self.head_ttl:
+            return self._head
+        try:
+            return self._set_head(await self._send_query_async(get_meta_query(), {}))
+        except Exception as e:
+            self.logger.error(f"Error getting indexing head: {str(e)}", exc_info=True)
+            raise
+
+    def _set_head(self, response: Dict[str, Any]) -> Optional[Tuple[int, Optional[int]]]:
+        """Cache the head reported by a _meta response"""
+        block = ((response.get('data') or {}).get('_meta') or {}).get('block')
+        if not block:
+            return None
+        timestamp = block.get('timestamp')
+        self._head = (int(block['number']), int(timestamp) if timestamp is not None else None)
+        self._head_fetched_at = time.monotonic()
+        self.logger.debug(f"Subgraph indexed up to block {self._head[0]} at {self._head[1]}")
+        return self._head
+
+    def get_event_types(self) -> List[str]:
+        """Return the event entities that can be paged directly"""
+        return list(self._event_queries)
+
+    def get_events(self, event_type: str, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Get a page of top level events of one type within the specified time period
+
+        Args:
+            event_type: Plural event entity name, such as 'swaps'
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last event already fetched, None for the first page
+
+        Returns:
+            Dict containing the query response data
+        """
+        variables = self._cursor_variables(start_timestamp, end_timestamp, cursor)
+        try:
+            response = self._send_page_query(self._event_queries[event_type], variables)
+            self.resolve_pools(response)
+            self.logger.debug(
+                f"Retrieved {len(response.get('data', {}).get(event_type, []))} "
+                f"{event_type} between {start_timestamp} and {end_timestamp}"
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Error getting {event_type}: {str(e)}", exc_info=True)
+            raise
+
+    async def get_events_async(self, event_type: str, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """Get a page of top level events of one type without blocking the event loop"""
+        variables = self._cursor_variables(start_timestamp, end_timestamp, cursor)
+        try:
+            response = await self._send_page_query_async(self._event_queries[event_type], variables)
+            await self.resolve_pools_async(response)
+            self.logger.debug(
+                f"Retrieved {len(response.get('data', {}).get(event_type, []))} "
+                f"{event_type} between {start_timestamp} and {end_timestamp}"
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Error getting {event_type}: {str(e)}", exc_info=True)
+            raise
+
+    async def count_events_async(self, event_type: str, start_timestamp: int, end_timestamp: int, bucket: int = 60) -> Dict[int, int]:
+        """
+        Count the events of one type per time bucket, paging their ids only
+
+        Args:
+            event_type: Plural event entity name, such as 'swaps'
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp (inclusive)
+            bucket: Width of the buckets in seconds
+
+        Returns:
+            Number of events keyed by the start timestamp of their bucket
+        """
+        counts: Dict[int, int] = {}
+        cursor = None
+        try:
+            while True:
+                response = await self._send_query_async(
+                    self._event_id_queries[event_type], self._cursor_variables(start_timestamp, end_timestamp, cursor)
+                )
+                if response.get('errors'):
+                    raise ValueError(f"GraphQL errors in response: {response['errors']}")
+                rows = response['data'][event_type]
+                for row in rows:
+                    key = int(row['timestamp']) // bucket * bucket
+                    counts[key] = counts.get(key, 0) + 1
+                # Pages hold up to 1000 rows
+                if len(rows) < 1000:
+                    return counts
+                cursor = self.get_cursor(rows)
+        except Exception as e:
+            self.logger.error(f"Error counting {event_type}: {str(e)}", exc_info=True)
+            raise
+
     @abstractmethod
     def get_tokens(self) -> Dict[str, Any]:
         """Abstract method to get tokens from the specified DEX subgraph"""
         pass
-    
+
+    @abstractmethod
+    def _transactions_query(self) -> str:
+        """Abstract method returning the transactions page query of the DEX subgraph, projected on self.fields"""
+        pass
+
+    async def get_transactions_async(self, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Get a page of transactions within the specified time period without blocking the event loop
+
+        Args:
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last transaction already fetched, None for the first page
+
+        Returns:
+            Dict containing the query response data
+        """
+        variables = self._cursor_variables(start_timestamp, end_timestamp, cursor)
+        try:
+            response = await self._send_page_query_async(self._transactions_query(), variables)
+            await self.resolve_pools_async(response)
+            self.logger.debug(
+                f"Retrieved {len(response.get('data', {}).get('transactions', []))} "
+                f"transactions between {start_timestamp} and {end_timestamp}"
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Error getting transactions: {str(e)}", exc_info=True)
+            raise
+
+    def stream_transactions(self, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None, chunk_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Yield a page of transactions while the response body is still being decoded
+
+        Rows are released in chunks once their pools are cached, chunks referencing
+        unknown pools are held back and resolved after the body has been read.
+
+        Args:
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last transaction already fetched, None for the first page
+            chunk_size: Number of rows checked against the pool cache at a time
+        """
+        query, variables = self._page_query(None, start_timestamp, end_timestamp, cursor)
+        key = self._cache_key(query, variables)
+        deferred = []
+        recorded = self.response_cache.open(key) if key and self.response_cache.reads else None
+        if recorded is not None:
+            with recorded:
+                for chunk in self._chunk_rows(iter_rows(recorded, 'transactions'), chunk_size):
+                    yield from self._release_chunk(chunk, deferred)
+        else:
+            with self.transport.post(self.url, json={"query": query, "variables": variables}, dex_id=self.limiter_key, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                body = TeeReader(response.raw) if key and self.response_cache.writes else response.raw
+                for chunk in self._chunk_rows(iter_rows(body, 'transactions'), chunk_size):
+                    yield from self._release_chunk(chunk, deferred)
+            if isinstance(body, TeeReader):
+                self.response_cache.put(key, body.getvalue())
+        if deferred:
+            self.resolve_pools({'data': {'transactions': deferred}})
+            yield from deferred
+
+    async def stream_transactions_async(self, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None, chunk_size: int = 100) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield chunks of a page of transactions while the response body is still being received
+
+        Chunks referencing unknown pools are resolved once the request has released its
+        concurrency slot, so resolving pools can never wait on the stream it belongs to.
+        """
+        query, variables = self._page_query(None, start_timestamp, end_timestamp, cursor)
+        key = self._cache_key(query, variables)
+        deferred = []
+        recorded = self.response_cache.open(key) if key and self.response_cache.reads else None
+        if recorded is not None:
+            with recorded:
+                for chunk in self._chunk_rows(iter_rows(recorded, 'transactions'), chunk_size):
+                    released = list(self._release_chunk(chunk, deferred))
+                    if released:
+                        yield released
+        else:
+            async with self.async_transport.stream(self.url, json={"query": query, "variables": variables}, dex_id=self.limiter_key) as response:
+                body = AsyncTeeReader(response.content) if key and self.response_cache.writes else response.content
+                chunk = []
+                async for row in iter_rows_async(body, 'transactions'):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        released = list(self._release_chunk(chunk, deferred))
+                        if released:
+                            yield released
+                        chunk = []
+                released = list(self._release_chunk(chunk, deferred))
+                if released:
+                    yield released
+            if isinstance(body, AsyncTeeReader):
+                self.response_cache.put(key, body.getvalue())
+        if deferred:
+            await self.resolve_pools_async({'data': {'transactions': deferred}})
+            yield deferred
+
+    @staticmethod
+    def _chunk_rows(rows: Iterator[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Group decoded rows into chunks of chunk_size"""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        yield chunk
+
+    def _release_chunk(self, chunk: List[Dict[str, Any]], deferred: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the chunk with its pools attached if all of them are cached, hold it back otherwise"""
+        # Keep page order once a chunk has been held back
+        if not deferred:
+            response = {'data': {'transactions': chunk}}
+            pools, missing = self._cached_pools(response)
+            if not missing:
+                attach_pools(response, pools, self.POOL_ENTITY)
+                yield from chunk
+                return
+        deferred.extend(chunk)
+
+    def _page_query(self, event_type: Optional[str], start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return the query and variables of a transactions page, or of an events page when event_type is set"""
+        query = self._event_queries[event_type] if event_type else self._transactions_query()
+        return query, self._cursor_variables(start_timestamp, end_timestamp, cursor)
+
+    def get_pages(self, pages: List[Tuple[Optional[str], int, int, Optional[Tuple[int, str]]]]) -> List[Dict[str, Any]]:
+        """
+        Get several pages in a single request, batched with GraphQL aliases
+
+        Args:
+            pages: (event_type, start_timestamp, end_timestamp, cursor) of each page, event_type None for transactions
+
+        Returns:
+            List of query responses, one per page and in the same order
+        """
+        queries = [self._page_query(*page) for page in pages]
+        responses = self._replay_pages(queries)
+        missing = [i for i, response in enumerate(responses) if response is None]
+        try:
+            if missing:
+                batch = QueryBatch()
+                for i in missing:
+                    batch.add(*queries[i])
+                response = self._send_query(*batch.build())
+                if response.get('errors'):
+                    # A failed alias would otherwise look like an empty page
+                    raise ValueError(f"GraphQL errors in batched request: {response['errors']}")
+                self._record_pages(queries, responses, missing, batch.split(response))
+            self.resolve_pools(self._merge_pages(responses))
+            self.logger.debug(f"Retrieved {len(pages)} pages, {len(missing)} in one request")
+            return responses
+        except Exception as e:
+            self.logger.error(f"Error getting batched pages: {str(e)}", exc_info=True)
+            raise
+
+    async def get_pages_async(self, pages: List[Tuple[Optional[str], int, int, Optional[Tuple[int, str]]]]) -> List[Dict[str, Any]]:
+        """Get several pages in a single request without blocking the event loop"""
+        queries = [self._page_query(*page) for page in pages]
+        responses = self._replay_pages(queries)
+        missing = [i for i, response in enumerate(responses) if response is None]
+        try:
+            if missing:
+                batch = QueryBatch()
+                for i in missing:
+                    batch.add(*queries[i])
+                response = await self._send_query_async(*batch.build())
+                if response.get('errors'):
+                    # A failed alias would otherwise look like an empty page
+                    raise ValueError(f"GraphQL errors in batched request: {response['errors']}")
+                self._record_pages(queries, responses, missing, batch.split(response))
+            await self.resolve_pools_async(self._merge_pages(responses))
+            self.logger.debug(f"Retrieved {len(pages)} pages, {len(missing)} in one request")
+            return responses
+        except Exception as e:
+            self.logger.error(f"Error getting batched pages: {str(e)}", exc_info=True)
+            raise
+
+    async def get_page_bytes_async(self, event_type: Optional[str], start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Get a page as the raw response body, to be processed in another process
+
+        Args:
+            event_type: Plural event entity name, None for transactions
+            start_timestamp: Start timestamp
+            end_timestamp: End timestamp
+            cursor: (timestamp, id) of the last row already fetched, None for the first page
+
+        Returns:
+            Tuple of the raw body and the decoded response, whose pools have been resolved
+        """
+        query, variables = self._page_query(event_type, start_timestamp, end_timestamp, cursor)
+        key = self._cache_key(query, variables)
+        try:
+            body = None
+            if key and self.response_cache.reads:
+                stream = self.response_cache.open(key)
+                if stream is not None:
+                    with stream:
+                        body = stream.read()
+            if body is None:
+                body = await self.async_transport.post_raw(
+                    self.url,
+                    json={"query": query, "variables": variables},
+                    dex_id=self.limiter_key
+                )
+            response = loads(body)
+            if response.get('errors'):
+                raise ValueError(f"GraphQL errors in response: {response['errors']}")
+            if key and self.response_cache.writes:
+                self.response_cache.put(key, body)
+            await self.resolve_pools_async(response)
+            return body, response
+        except Exception as e:
+            self.logger.error(f"Error getting raw page: {str(e)}", exc_info=True)
+            raise
+
+    def get_pools(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return the pools attached to a resolved page, to ship them along with its raw body"""
+        pools = {}
+        for event in pool_refs(response, self.POOL_ENTITY):
+            pool = event[self.POOL_ENTITY]
+            if 'token0' in pool:
+                pools[pool['id']] = pool
+        return list(pools.values())
+
+    def _replay_pages(self, queries: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """Return the stored response of every page query, None for the ones that have to be fetched"""
+        responses = []
+        for query, variables in queries:
+            key = self._cache_key(query, variables)
+            responses.append(self.response_cache.get(key) if key and self.response_cache.reads else None)
+        return responses
+
+    def _record_pages(self, queries, responses, missing, fetched):
+        """Fill in the fetched responses and store the ones of final windows"""
+        for i, response in zip(missing, fetched):
+            responses[i] = response
+            key = self._cache_key(*queries[i])
+            if key and self.response_cache.writes:
+                self.response_cache.put_response(key, response)
+
+    @staticmethod
+    def _merge_pages(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine the rows of several pages into one response to resolve their pools at once"""
+        return {'data': {
+            f"{i}_{entity}": rows
+            for i, response in enumerate(responses)
+            for entity, rows in (response.get('data') or {}).items()
+        }}
+
+    def _referenced_pools(self, response: Dict[str, Any]) -> Set[str]:
+        """Collect the ids of the pools referenced by a transactions or events page and not attached yet"""
+        return {
+            event[self.POOL_ENTITY]['id'] for event in pool_refs(response, self.POOL_ENTITY)
+            if 'token0' not in event[self.POOL_ENTITY]
+        }
+
+    def resolve_pools(self, response: Dict[str, Any]):
+        """
+        Attach the pools referenced by a page to its events, fetching the ones missing from the cache
+
+        The page carries its pools from then on, however long it waits to be processed.
+
+        Raises:
+            ValueError: When the pools query returns GraphQL errors
+        """
+        pools, missing = self._cached_pools(response)
+        for i in range(0, len(missing), 1000):
+            pools_response = self._send_query(self._pools_query, {"ids": missing[i:i + 1000]})
+            pools.update(self._record_pools(self._pools_from(pools_response)))
+        self._attach_pools(response, pools, missing)
+
+    async def resolve_pools_async(self, response: Dict[str, Any]):
+        """Attach the pools referenced by a page to its events without blocking the event loop"""
+        pools, missing = self._cached_pools(response)
+        for i in range(0, len(missing), 1000):
+            pools_response = await self._send_query_async(self._pools_query, {"ids": missing[i:i + 1000]})
+            pools.update(self._record_pools(self._pools_from(pools_response)))
+        self._attach_pools(response, pools, missing)
+
+    def _cached_pools(self, response: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Return the referenced pools found in the pool and response caches by id, and the ids to fetch"""
+        referenced = self._referenced_pools(response)
+        stale = set(self.pool_cache.missing(referenced))
+        pools = {}
+        for pool_id in referenced - stale:
+            pool = self.pool_cache.get(pool_id)
+            if pool is None:
+                # Evicted since it was checked
+                stale.add(pool_id)
+            else:
+                pools[pool_id] = pool
+        stored, missing = self._replay_pools(sorted(stale))
+        pools.update(stored)
+        return pools, missing
+
+    def _pools_from(self, pools_response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if pools_response.get('errors'):
+            raise ValueError(f"GraphQL errors in pools response: {pools_response['errors']}")
+        return pools_response.get('data', {}).get(f"{self.POOL_ENTITY}s", [])
+
+    def _attach_pools(self, response: Dict[str, Any], pools: Dict[str, Dict[str, Any]], fetched: List[str]):
+        unresolved = attach_pools(response, pools, self.POOL_ENTITY)
+        if unresolved:
+            self.logger.warning(f"{len(unresolved)} pools referenced by the page do not exist, such as {unresolved[0]}")
+        if fetched:
+            self.logger.debug(f"Resolved {len(fetched)} pools, {len(self.pool_cache)} pools cached")
+
+    def _replay_pools(self, missing: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Load stored pools when the response cache is read
+
+        Only read_through falls back to fetching, a pool missing in replay mode raises LookupError.
+
+        Returns:
+            The stored pools by id, and the ids still to fetch
+        """
+        if not self.response_cache.reads:
+            return {}, missing
+        stored, unknown = {}, []
+        for pool_id in missing:
+            pool = self.response_cache.get(self._pool_key(pool_id))
+            if pool is None:
+                unknown.append(pool_id)
+            else:
+                stored[pool_id] = pool
+        self.pool_cache.put_many(list(stored.values()))
+        return stored, unknown
+
+    def _record_pools(self, pools: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Cache fetched pools, and store them one by one when the response cache is written so any batch finds them"""
+        self.pool_cache.put_many(pools)
+        if self.response_cache.writes:
+            for pool in pools:
+                self.response_cache.put_response(self._pool_key(pool['id']), pool)
+        return {pool['id']: pool for pool in pools}
+
+    def _pool_key(self, pool_id: str) -> str:
+        return self.response_cache.key(self._cache_namespace(), self._pools_query, {"id": pool_id})
+
+    def _cache_namespace(self) -> str:
+        return self.dex_id or self.__class__.__name__
+
+    def _cache_key(self, query: str, variables: Dict[str, Any]) -> Optional[str]:
+        """Return the response cache key of a window query, None when the window bypasses the cache"""
+        if not self.response_cache.covers(variables['endTimestamp']):
+            return None
+        return self.response_cache.key(self._cache_namespace(), query, variables)
+
+    def _send_page_query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a window query, serving and storing its response through the response cache
+
+        Raises:
+            ValueError: When the response carries GraphQL errors
+        """
+        key = self._cache_key(query, variables)
+        if key and self.response_cache.reads:
+            response = self.response_cache.get(key)
+            if response is not None:
+                return response
+        response = self._send_query(query, variables)
+        if response.get('errors'):
+            # An empty page would otherwise end the window as if it were complete
+            raise ValueError(f"GraphQL errors in response: {response['errors']}")
+        if key and self.response_cache.writes:
+            self.response_cache.put_response(key, response)
+        return response
+
+    async def _send_page_query_async(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a window query on the event loop through the response cache"""
+        key = self._cache_key(query, variables)
+        if key and self.response_cache.reads:
+            response = self.response_cache.get(key)
+            if response is not None:
+                return response
+        response = await self._send_query_async(query, variables)
+        if response.get('errors'):
+            # An empty page would otherwise end the window as if it were complete
+            raise ValueError(f"GraphQL errors in response: {response['errors']}")
+        if key and self.response_cache.writes:
+            self.response_cache.put_response(key, response)
+        return response
+
+    @staticmethod
+    def get_cursor(transactions: List[Dict[str, Any]]) -> Optional[Tuple[int, str]]:
+        """Return the (timestamp, id) keyset cursor of the last transaction in a page"""
+        if not transactions:
+            return None
+        last = transactions[-1]
+        return int(last['timestamp']), last['id']
+
+    def _cursor_variables(self, start_timestamp: int, end_timestamp: int, cursor: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Build the keyset pagination variables for a transactions page.
+
+        Without a cursor the page starts at start_timestamp, an empty id matches every
+        transaction in that first second.
+        """
+        cursor_timestamp, cursor_id = cursor if cursor else (start_timestamp, "")
+        return {
+            "cursorTimestamp": cursor_timestamp,
+            "cursorId": cursor_id,
+            "endTimestamp": end_timestamp
+        }
+
     def _send_query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
         """Send GraphQL query and return response"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 self.url,
-                json={"query": query, "variables": variables}
+                json={"query": query, "variables": variables},
+                dex_id=self.limiter_key
             )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error sending GraphQL query: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+    async def _send_query_async(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Send GraphQL query on the event loop and return response"""
+        try:
+            return await self.async_transport.post_json(
+                self.url,
+                json={"query": query, "variables": variables},
+                dex_id=self.limiter_key
+            )
+        except aiohttp.ClientError as e:
+            self.logger.error(f"Error sending GraphQL query: {str(e)}", exc_info=True)
+            raise
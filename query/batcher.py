@@ -0,0 +1,123 @@
+import re
+from typing import Dict, Any, List, Tuple
+
+_VARIABLE = re.compile(r'\$(\w+)')
+_NAME = re.compile(r'[_A-Za-z]\w*')
+
+
+class QueryBatch:
+    """
+    Combine several GraphQL queries into a single request.
+
+    Every query's root fields are aliased and its variables renamed with a per-query
+    prefix, so the queries can share one operation. The response is split back into
+    one response per query, shaped as if the query had been sent on its own.
+    """
+
+    def __init__(self):
+        self._definitions: List[str] = []
+        self._bodies: List[str] = []
+        self._variables: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def add(self, query: str, variables: Dict[str, Any]) -> int:
+        """
+        Add a query to the batch
+
+        Args:
+            query: GraphQL query document with a single operation
+            variables: Variables of the query
+
+        Returns:
+            int: Index of the query's response in split()
+        """
+        index = len(self._bodies)
+        prefix = f"b{index}_"
+        definitions, body = self._parse_operation(query)
+        self._definitions.append(_VARIABLE.sub(lambda m: f"${prefix}{m.group(1)}", definitions))
+        self._bodies.append(self._alias_root_fields(_VARIABLE.sub(lambda m: f"${prefix}{m.group(1)}", body), prefix))
+        self._variables.update({f"{prefix}{name}": value for name, value in variables.items()})
+        return index
+
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """Return the combined query and its variables"""
+        definitions = ", ".join(d for d in self._definitions if d)
+        header = f"query Batch({definitions})" if definitions else "query Batch"
+        return f"{header} {{\n" + "\n".join(self._bodies) + "\n}", self._variables
+
+    def split(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Split a combined response back into one response per query.
+
+        Errors with a path are routed to the query owning the aliased field, errors
+        without one are reported to every query.
+        """
+        data = response.get('data') or {}
+        responses = [{'data': {}} for _ in self._bodies]
+        for alias, value in data.items():
+            index, field = self._unalias(alias)
+            responses[index]['data'][field] = value
+        for error in response.get('errors') or []:
+            path = error.get('path') or []
+            targets = [self._unalias(path[0])[0]] if path else range(len(responses))
+            for index in targets:
+                responses[index].setdefault('errors', []).append(error)
+        return responses
+
+    @staticmethod
+    def _unalias(alias: str) -> Tuple[int, str]:
+        prefix, field = alias.split('_', 1)
+        return int(prefix[1:]), field
+
+    @staticmethod
+    def _parse_operation(query: str) -> Tuple[str, str]:
+        """Return the variable definitions and the selection body of an operation"""
+        body_start = query.index('{')
+        header = query[:body_start]
+        definitions = ''
+        if '(' in header:
+            definitions = header[header.index('(') + 1:header.rindex(')')].strip()
+        body_end = query.rindex('}')
+        return definitions, query[body_start + 1:body_end]
+
+    @staticmethod
+    def _alias_root_fields(body: str, prefix: str) -> str:
+        """Prefix the alias of every root field, adding one when the field has none"""
+        out = []
+        depth = 0
+        i = 0
+        while i < len(body):
+            char = body[i]
+            if char in '{(':
+                depth += 1
+            elif char in '})':
+                depth -= 1
+            elif char == '#':
+                # Skip comments up to the end of the line
+                end = body.find('\n', i)
+                end = len(body) if end == -1 else end
+                out.append(body[i:end])
+                i = end
+                continue
+            elif depth == 0:
+                match = _NAME.match(body, i)
+                if match:
+                    name = match.group(0)
+                    rest = body[match.end():].lstrip()
+                    if rest.startswith(':'):
+                        # Field is already aliased, keep its alias unique
+                        out.append(f"{prefix}{name}")
+                        after_colon = body.index(':', match.end()) + 1
+                        out.append(body[match.end():after_colon])
+                        field = _NAME.search(body, after_colon)
+                        out.append(body[after_colon:field.end()])
+                        i = field.end()
+                    else:
+                        out.append(f"{prefix}{name}: {name}")
+                        i = match.end()
+                    continue
+            out.append(char)
+            i += 1
+        return ''.join(out)
@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+class PoolCache:
+    """
+    LRU cache of pool metadata kept by a querier.
+
+    Event queries only select the pool id, the querier resolves ids missing from the
+    cache in one batched lookup and pins the pools to the page with attach_pools, so
+    processing never depends on what is still cached by then.
+    """
+
+    def __init__(self, max_size: int = Settings.POOL_CACHE_SIZE, ttl: float = Settings.POOL_CACHE_TTL.total_seconds()):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of pools kept, least recently used pools are evicted first
+            ttl: Seconds after which a pool is fetched again to refresh its liquidity
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._pools: OrderedDict[str, tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached pool, stale entries are still served until they are refreshed"""
+        with self._lock:
+            entry = self._pools.get(pool_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._pools.move_to_end(pool_id)
+            self.hits += 1
+            return entry[1]
+
+    def missing(self, pool_ids: Iterable[str]) -> List[str]:
+        """Return the ids that are not cached or whose entry is older than the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                pool_id for pool_id in pool_ids
+                if pool_id not in self._pools or now - self._pools[pool_id][0] > self.ttl
+            ]
+
+    def put_many(self, pools: List[Dict[str, Any]]):
+        """Add or refresh pools, evicting the least recently used ones past max_size"""
+        now = time.monotonic()
+        with self._lock:
+            for pool in pools:
+                self._pools[pool['id']] = (now, pool)
+                self._pools.move_to_end(pool['id'])
+            while len(self._pools) > self.max_size:
+                self._pools.popitem(last=False)
+        logger.debug(f"Cached {len(pools)} pools, {len(self._pools)} pools in cache")
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+
+def pool_refs(response: Dict[str, Any], pool_entity: str) -> Iterator[Dict[str, Any]]:
+    """Yield the events of a transactions or events page that reference a pool"""
+    for rows in (response.get('data') or {}).values():
+        for row in rows or []:
+            # Top level events reference their pool, transactions nest lists of events
+            events = [row] + [event for value in row.values() if isinstance(value, list) for event in value]
+            for event in events:
+                if event.get(pool_entity):
+                    yield event
+
+
+def attach_pools(response: Dict[str, Any], pools: Dict[str, Dict[str, Any]], pool_entity: str) -> List[str]:
+    """
+    Replace the pool references of a page's events with the pools themselves
+
+    Args:
+        response: Decoded page, changed in place
+        pools: Pools by id
+        pool_entity: Name of the pool field of the events
+
+    Returns:
+        Ids of the referenced pools missing from pools
+    """
+    unresolved = set()
+    for event in pool_refs(response, pool_entity):
+        ref = event[pool_entity]
+        if 'token0' in ref:
+            continue
+        pool = pools.get(ref['id'])
+        if pool is None:
+            unresolved.add(ref['id'])
+        else:
+            event[pool_entity] = pool
+    return sorted(unresolved)
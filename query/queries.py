@@ -1,204 +1,125 @@
-# Uniswap V3 Queries #
-def get_uniswap_v3_query():
-    """
-    Query to fetch transactions within a time period.
+from typing import Dict, List
+
+# Query Builders #
+def build_selection(fields: List[str], indent: int = 12) -> str:
     """
+    Render dotted field paths as a GraphQL selection set.
+
+    Args:
+        fields: Field paths such as 'swaps.pool.token0.symbol'
+        indent: Number of spaces before top level fields
+
+    Returns:
+        str: Selection set body with nested fields grouped under their parent
+    """
+    tree: Dict[str, dict] = {}
+    for field in fields:
+        node = tree
+        for part in field.split('.'):
+            node = node.setdefault(part, {})
+
+    def render(node: Dict[str, dict], depth: int) -> List[str]:
+        pad = ' ' * (indent + 4 * depth)
+        lines = []
+        for name, children in node.items():
+            if children:
+                lines.append(f"{pad}{name} {{")
+                lines.extend(render(children, depth + 1))
+                lines.append(f"{pad}}}")
+            else:
+                lines.append(f"{pad}{name}")
+        return lines
+
+    return "\n".join(render(tree, 0))
+
+def get_meta_query() -> str:
+    """Query the last block indexed by the subgraph"""
     return """
-        query GetTransactions($startTimestamp: Int!, $endTimestamp: Int!, $skip: Int!) {
+    query GetMeta {
+        _meta {
+            block {
+                number
+                timestamp
+            }
+        }
+    }
+    """
+
+def build_transactions_query(operation_name: str, fields: List[str]) -> str:
+    """
+    Query to fetch transactions within a time period, paged by a (timestamp, id) cursor.
+
+    Args:
+        operation_name: GraphQL operation name
+        fields: Dotted field paths to select on each transaction
+    """
+    return f"""
+    query {operation_name}($cursorTimestamp: Int!, $cursorId: ID!, $endTimestamp: Int!) {{
         transactions(
             first: 1000
-            skip: $skip
-            where: { timestamp_gte: $startTimestamp, timestamp_lte: $endTimestamp }
+            where: {{
+                or: [
+                    {{ timestamp: $cursorTimestamp, id_gt: $cursorId }}
+                    {{ timestamp_gt: $cursorTimestamp, timestamp_lte: $endTimestamp }}
+                ]
+            }}
             orderBy: timestamp
             orderDirection: asc
-        ) {
-            id
-            blockNumber
-            timestamp
-            gasUsed
-            gasPrice
-            
-            # Swap events
-            swaps {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-            }
-            sender
-            recipient
-            origin
-            amount0
-            amount1
-            amountUSD
-            sqrtPriceX96
-            tick
-            logIndex
-            }
-            
-            # Mint events
-            mints {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-            }
-            token0
-            token1
-            owner
-            sender
-            origin
-            amount
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            
-            # Burn events
-            burns {
-            id
-            transaction {
-                id
-            }
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-            }
-            token0
-            token1
-            owner
-            origin
-            amount
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            
-            # Flash events
-            flashed {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-            }
-            sender
-            recipient
-            amount0
-            amount1
-            amountUSD
-            amount0Paid
-            amount1Paid
-            logIndex
-            }
-            
-            # Collect events
-            collects {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-            }
-            owner
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-        }
-        }
+        ) {{
+{build_selection(fields)}
+        }}
+    }}
+    """
+
+def build_events_query(entity: str, fields: List[str]) -> str:
+    """
+    Query to fetch top level events of one type within a time period, paged by a (timestamp, id) cursor.
+
+    Args:
+        entity: Plural event entity name, such as 'swaps'
+        fields: Dotted field paths to select on each event
+    """
+    return f"""
+    query Get{entity.capitalize()}($cursorTimestamp: Int!, $cursorId: ID!, $endTimestamp: Int!) {{
+        {entity}(
+            first: 1000
+            where: {{
+                or: [
+                    {{ timestamp: $cursorTimestamp, id_gt: $cursorId }}
+                    {{ timestamp_gt: $cursorTimestamp, timestamp_lte: $endTimestamp }}
+                ]
+            }}
+            orderBy: timestamp
+            orderDirection: asc
+        ) {{
+{build_selection(fields)}
+        }}
+    }}
+    """
+
+def build_pools_query(entity: str, fields: List[str]) -> str:
+    """
+    Query to fetch the metadata of a batch of pools by id.
+
+    Args:
+        entity: Pool entity name of the subgraph, 'pool' or 'pair'
+        fields: Dotted field paths to select on each pool
+    """
+    return f"""
+    query GetPools($ids: [ID!]!) {{
+        {entity}s(first: 1000, where: {{ id_in: $ids }}) {{
+{build_selection(['id'] + fields)}
+        }}
+    }}
     """
+
+# Uniswap V3 Queries #
+def get_uniswap_v3_query(fields: List[str]):
+    """
+    Query to fetch transactions within a time period, selecting only the given fields.
+    """
+    return build_transactions_query("GetTransactions", fields)
+
 def get_uniswap_v3_tokens_query():
     """Fetch all tokens from the specified DEX subgraph."""
     return """
@@ -210,126 +131,14 @@ def get_uniswap_v3_tokens_query():
         }
     }
     """
-    
+
 # Uniswap V2 Queries #
-def get_uniswap_v2_query():
+def get_uniswap_v2_query(fields: List[str]):
     """
-    Query to fetch transactions within a time period from Uniswap V2.
+    Query to fetch transactions within a time period from Uniswap V2, selecting only the given fields.
     """
-    return """
-    query GetSwapsBurnsMints($startTimestamp: Int!, $endTimestamp: Int!, $skip: Int!) {
-        transactions(
-            first: 1000
-            skip: $skip
-            where: { timestamp_gte: $startTimestamp, timestamp_lte: $endTimestamp }
-            orderBy: timestamp
-            orderDirection: asc
-        ) {
-            id
-            blockNumber
-            timestamp
+    return build_transactions_query("GetSwapsBurnsMints", fields)
 
-            # Swap events
-            swaps {
-            id
-            transaction {
-                id
-            }
-            timestamp
-            pair {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            sender
-            from
-            amount0In
-            amount1In
-            amount0Out
-            amount1Out
-            to
-            logIndex
-            amountUSD
-            }
-
-            # Mint events
-            mints {
-            id
-            transaction {
-                id
-            }
-            timestamp
-            pair {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            sender
-            to
-            liquidity
-            amount0
-            amount1
-            logIndex
-            amountUSD
-            feeTo
-            feeLiquidity
-            }
-
-            # Burn events
-            burns {
-            id
-            transaction {
-                id
-            }
-            timestamp
-            pair {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                    }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            liquidity
-            sender
-            amount0
-            amount1
-            to
-            logIndex
-            amountUSD
-            feeTo
-            feeLiquidity
-            }
-        }
-    }
-    """
 def get_uniswap_v2_tokens_query():
     """Fetch all tokens from the specified DEX subgraph."""
     return """
@@ -341,143 +150,14 @@ def get_uniswap_v2_tokens_query():
         }
     }
     """
+
 # Aerodrome Queries #
-def get_aerodrome_query():
+def get_aerodrome_query(fields: List[str]):
     """
-    Query to fetch transactions within a time period from Aerodrome.
+    Query to fetch transactions within a time period from Aerodrome, selecting only the given fields.
     """
-    return """
-    query GetAerodromeTransactions($startTimestamp: Int!, $endTimestamp: Int!, $skip: Int!) {
-        transactions(
-            first: 1000
-            skip: $skip
-            where: { timestamp_gte: $startTimestamp, timestamp_lte: $endTimestamp }
-            orderBy: timestamp
-            orderDirection: asc
-        ) {
-            id
-            blockNumber
-            timestamp
-            gasUsed
-            gasPrice
-            mints {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-            }
-            owner
-            sender
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            burns {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-            }
-            owner
-            origin
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            swaps {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                feeTier
-                liquidity
-            }
-            sender
-            recipient
-            amount0
-            amount1
-            amountUSD
-            sqrtPriceX96
-            tick
-            logIndex
-            }
-            collects {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            }
-            flashed {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            }
-        }    
-    }
+    return build_transactions_query("GetAerodromeTransactions", fields)
 
-    """
-    
 def get_aerodrome_tokens_query():
     """Fetch all tokens from the specified DEX subgraph."""
     return """
@@ -489,141 +169,13 @@ def get_aerodrome_tokens_query():
         }
     }
     """
-    
+
 # Quickswap V3 Queries #
-def get_quickswap_v3_query():
+def get_quickswap_v3_query(fields: List[str]):
     """
-    Query to fetch transactions within a time period from Quickswap V3.
-    """
-    return """
-    query GetQuickswapV3Transactions($startTimestamp: Int!, $endTimestamp: Int!, $skip: Int!) {
-        transactions(
-            first: 1000
-            skip: $skip
-            where: { timestamp_gte: $startTimestamp, timestamp_lte: $endTimestamp }
-            orderBy: timestamp
-            orderDirection: asc
-        ) {
-            id
-            blockNumber
-            timestamp
-            gasPrice
-            mints {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                fee
-                liquidity
-            }
-            owner
-            sender
-            origin
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            burns {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                fee
-                liquidity
-            }
-            owner
-            origin
-            amount0
-            amount1
-            amountUSD
-            tickLower
-            tickUpper
-            logIndex
-            }
-            swaps {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-                token1 {
-                id
-                symbol
-                decimals
-                name
-                }
-                fee
-                liquidity
-            }
-            sender
-            recipient
-            amount0
-            amount1
-            amountUSD
-            tick
-            logIndex
-            }
-            collects {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            }
-            flashed {
-            id
-            timestamp
-            pool {
-                id
-                token0 {
-                id
-                symbol
-                decimals
-                name
-                }
-            }
-            }
-        }    
-    }
+    Query to fetch transactions within a time period from Quickswap V3, selecting only the given fields.
     """
+    return build_transactions_query("GetQuickswapV3Transactions", fields)
 
 def get_quickswap_v3_tokens_query():
     """Fetch all tokens from the specified DEX subgraph."""
@@ -1,31 +1,27 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .base_querier import BaseQuerier
+from .pool_cache import PoolCache
 from .queries import get_quickswap_v3_query, get_quickswap_v3_tokens_query
 
 class QuickswapV3Querier(BaseQuerier):
-    def __init__(self, url: str):
-        super().__init__(url)
+    def __init__(
+        self,
+        url: str,
+        fields: List[str],
+        pool_fields: List[str],
+        pool_cache: Optional[PoolCache] = None,
+        event_fields: Optional[Dict[str, List[str]]] = None,
+        dex_id: Optional[str] = None
+    ):
+        super().__init__(url, fields, pool_fields, pool_cache, event_fields, dex_id=dex_id)
+        self._query = get_quickswap_v3_query(fields)
         self.logger = logging.getLogger(__name__)
         self.logger.debug("Initialized QuickswapV3Querier...")
     
-    def get_transactions(self, start_timestamp: int, end_timestamp: int, skip: int = 0) -> Dict[str, Any]:
-        variables = {
-            "startTimestamp": start_timestamp,
-            "endTimestamp": end_timestamp,
-            "skip": skip
-        }
-        try:
-            response = self._send_query(get_quickswap_v3_query(), variables)
-            self.logger.debug(
-                f"Retrieved {len(response.get('data', {}).get('transactions', []))} "
-                f"transactions between {start_timestamp} and {end_timestamp}"
-            )
-            return response
-        except Exception as e:
-            self.logger.error(f"Error getting transactions: {str(e)}", exc_info=True)
-            raise
-    
+    def _transactions_query(self) -> str:
+        return self._query
+
     def get_tokens(self, skip: int = 0) -> Dict[str, Any]:
         variables = {
             "first": 1000,
@@ -0,0 +1,247 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Waiters that are not at the head of the queue check back this often
+POLL_INTERVAL = 0.05
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = Settings.RETRY_MAX_DELAY) -> float:
+    """
+    Return a jittered exponential backoff delay.
+
+    Args:
+        attempt: Number of attempts that failed so far, starting at 1
+        base: Delay in seconds before jitter after the first failure
+        cap: Upper bound of the delay before jitter
+
+    Returns:
+        float: Seconds to wait, drawn uniformly up to base * 2 ** (attempt - 1)
+    """
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header, in seconds or as an HTTP date, to seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for requests to the subgraph gateway.
+
+    A token bucket caps the request rate and an AIMD controller caps the number of
+    requests in flight. Successful fast responses grow both additively, throttling,
+    server errors and slow responses shrink them multiplicatively. Waiting requests
+    are served in weighted fair order so DEXes with a higher priority weight get a
+    larger share of the budget when it is contended.
+
+    The limiter is shared by the sync transport running on worker threads and the
+    async transport running on the event loop, its state is guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        rate: float = Settings.RATE_LIMIT_RPS,
+        burst: int = Settings.RATE_LIMIT_BURST,
+        initial_concurrency: int = Settings.MAX_CONCURRENT_QUERIES,
+        max_concurrency: int = Settings.RATE_LIMIT_MAX_CONCURRENCY,
+        target_latency: float = Settings.RATE_LIMIT_TARGET_LATENCY,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            rate: Maximum requests per second, the gateway's budget
+            burst: Number of requests that can be sent at once after an idle period
+            initial_concurrency: Requests allowed in flight before any feedback
+            max_concurrency: Upper bound for the requests in flight
+            target_latency: Seconds, responses slower than this shrink the concurrency
+            weights: Priority weight per DEX, DEXes without one weigh 1
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+        self.target_latency = target_latency
+        self.weights = dict(weights if weights is not None else Settings.DEX_PRIORITIES)
+        self.in_flight = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._cooldown_until = 0.0
+        self._decreased_at = 0.0
+        self._throttle_streak = 0
+        self._waiters: List[Tuple[float, int]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        logger.info(
+            f"Initialized RateLimiter at {rate} requests/s, burst {burst}, "
+            f"concurrency {self.concurrency:.0f}/{max_concurrency}"
+        )
+
+    def acquire(self, dex_id: Optional[str] = None):
+        """Block the calling thread until a request may be sent"""
+        ticket = self._enqueue(dex_id)
+        granted = False
+        try:
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0:
+                    granted = True
+                    return
+                time.sleep(min(wait, POLL_INTERVAL))
+        finally:
+            if not granted:
+                self._dequeue(ticket)
+
+    async def acquire_async(self, dex_id: Optional[str] = None):
+        """Wait on the event loop until a request may be sent"""
+        ticket = self._enqueue(dex_id)
+        granted = False
+        try:
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0:
+                    granted = True
+                    return
+                await asyncio.sleep(min(wait, POLL_INTERVAL))
+        finally:
+            if not granted:
+                self._dequeue(ticket)
+
+    def release(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """
+        Return a slot and adjust the rate and concurrency from the outcome of the request
+
+        Args:
+            status: HTTP status of the response, None when no response was received
+            latency: Seconds until the response headers were received
+            retry_after: Seconds the gateway asked to wait before sending again
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if status == 429 or status is None or status >= 500:
+                if status == 429:
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                self._throttle_streak += 1
+                pause = retry_after if retry_after is not None else backoff_delay(self._throttle_streak)
+                self._cooldown_until = max(self._cooldown_until, now + pause)
+                self._decrease(now, 0.5)
+                return
+
+            self._throttle_streak = 0
+            if latency > self.target_latency:
+                self._decrease(now, 0.9)
+                return
+
+            # Additive increase, about one more slot per round trip at full concurrency
+            self.concurrency = min(self.concurrency + 1 / self.concurrency, self.max_concurrency)
+            self.rate = min(self.rate + self.max_rate / 100, self.max_rate)
+
+    def set_weight(self, key: str, weight: float):
+        """Set the priority weight of a queue of requests, such as a backfill of a DEX"""
+        with self._lock:
+            self.weights[key] = weight
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Report the current limits and how often the gateway pushed back"""
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "concurrency": int(self.concurrency),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "errors": self.errors,
+            }
+
+    def _decrease(self, now: float, factor: float):
+        """Shrink the limits, at most once per target latency so one burst of failures counts once"""
+        if now - self._decreased_at < self.target_latency:
+            return
+        self._decreased_at = now
+        self.concurrency = max(self.concurrency * factor, 1.0)
+        self.rate = max(self.rate * factor, self.max_rate / 100)
+        logger.info(f"Backing off to {self.rate:.2f} requests/s and concurrency {self.concurrency:.1f}")
+
+    def _enqueue(self, dex_id: Optional[str]) -> Tuple[float, int]:
+        """Queue a request behind the ones with an earlier weighted finish tag"""
+        weight = self.weights.get(dex_id, 1.0) if dex_id else 1.0
+        with self._lock:
+            start = max(self._virtual_time, self._finish_tags.get(dex_id, 0.0))
+            tag = start + 1 / weight
+            self._finish_tags[dex_id] = tag
+            ticket = (tag, next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            return ticket
+
+    def _dequeue(self, ticket: Tuple[float, int]):
+        """Drop a request that gave up waiting"""
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    def _try_grant(self, ticket: Tuple[float, int]) -> float:
+        """Grant a slot to the ticket if it is next in line, return 0 or the seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            self._tokens = min(self._tokens + (now - self._refilled_at) * self.rate, self.burst)
+            self._refilled_at = now
+            if self._waiters[0] != ticket:
+                return POLL_INTERVAL
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+            if self.in_flight >= int(self.concurrency):
+                return POLL_INTERVAL
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            self._virtual_time = ticket[0]
+            heapq.heappop(self._waiters)
+            return 0
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it on first use"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, BinaryIO, Optional
+from config.settings import Settings
+from .streaming import loads
+
+logger = logging.getLogger(__name__)
+
+OFF = 'off'
+RECORD = 'record'            # Always query the subgraph and store the responses
+REPLAY = 'replay'            # Only serve stored responses, a miss is an error
+READ_THROUGH = 'read_through'  # Serve stored responses, query and store on a miss
+MODES = (OFF, RECORD, REPLAY, READ_THROUGH)
+
+
+class ResponseCache:
+    """
+    Content addressed on-disk store of raw subgraph responses.
+
+    Responses are keyed by querier, query hash and variables and appended as gzip
+    members to segment files, an index file maps every key to its segment and
+    offset. Reading a response decompresses it incrementally, so replayed pages can
+    be fed to the streaming decoder without holding the decoded body.
+
+    Only windows that ended before the finality lag are stored, the subgraph can
+    still change more recent ones.
+    """
+
+    def __init__(
+        self,
+        directory: str = Settings.RESPONSE_CACHE_DIR,
+        mode: str = Settings.RESPONSE_CACHE_MODE,
+        finality: float = Settings.RESPONSE_CACHE_FINALITY.total_seconds(),
+        segment_size: int = Settings.RESPONSE_CACHE_SEGMENT_SIZE,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Directory holding the segment and index files
+            mode: One of 'off', 'record', 'replay' or 'read_through'
+            finality: Seconds after which a window is considered final
+            segment_size: Size in bytes after which a new segment file is started
+        """
+        if mode not in MODES:
+            raise ValueError(f"Invalid response cache mode {mode!r}, expected one of {MODES}")
+        self.directory = directory
+        self.mode = mode
+        self.finality = finality
+        self.segment_size = segment_size
+        self._index: Dict[str, tuple[int, int, int]] = {}
+        self._segment = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if mode != OFF:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+            logger.info(f"Initialized ResponseCache in {mode} mode with {len(self._index)} responses from {directory}")
+
+    @property
+    def reads(self) -> bool:
+        """Whether stored responses are served"""
+        return self.mode in (REPLAY, READ_THROUGH)
+
+    @property
+    def writes(self) -> bool:
+        """Whether fetched responses are stored"""
+        return self.mode in (RECORD, READ_THROUGH)
+
+    def covers(self, end_timestamp: int) -> bool:
+        """Whether a window ending at end_timestamp goes through the cache"""
+        if self.mode == OFF:
+            return False
+        # Replay never falls back to the network, whatever the window
+        return self.mode == REPLAY or end_timestamp <= time.time() - self.finality
+
+    @staticmethod
+    def key(namespace: str, query: str, variables: Dict[str, Any]) -> str:
+        """Return the content address of a query"""
+        query_hash = hashlib.sha256(query.encode()).hexdigest()
+        payload = json.dumps([namespace, query_hash, variables], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """
+        Return a reader decompressing the stored response body.
+
+        Returns:
+            Binary file-like object, None when the key is not stored
+
+        Raises:
+            LookupError: When the key is not stored in replay mode
+        """
+        entry = self._index.get(key)
+        if entry is None:
+            self.misses += 1
+            if self.mode == REPLAY:
+                raise LookupError(f"No recorded response for {key} in replay mode")
+            return None
+        self.hits += 1
+        segment, offset, length = entry
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            compressed = f.read(length)
+        return gzip.GzipFile(fileobj=io.BytesIO(compressed))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the decoded stored response, None when the key is not stored"""
+        stream = self.open(key)
+        if stream is None:
+            return None
+        with stream:
+            return loads(stream.read())
+
+    def put(self, key: str, body: bytes):
+        """Store a raw response body, keys already stored are left untouched"""
+        if key in self._index:
+            return
+        compressed = gzip.compress(body)
+        with self._lock:
+            if key in self._index:
+                return
+            path = self._segment_path(self._segment)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_size:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            with open(self._index_path(), 'a') as f:
+                f.write(json.dumps([key, self._segment, offset, len(compressed)]) + '\n')
+            self._index[key] = (self._segment, offset, len(compressed))
+
+    def put_response(self, key: str, response: Dict[str, Any]):
+        """Store a decoded response"""
+        self.put(key, json.dumps(response, separators=(',', ':')).encode())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:05d}.gz")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.jsonl")
+
+    def _load_index(self):
+        """Read the index, skipping entries of a write that did not complete"""
+        if not os.path.exists(self._index_path()):
+            return
+        sizes = {}
+        with open(self._index_path()) as f:
+            for line in f:
+                try:
+                    key, segment, offset, length = json.loads(line)
+                except ValueError:
+                    continue
+                if segment not in sizes:
+                    path = self._segment_path(segment)
+                    sizes[segment] = os.path.getsize(path) if os.path.exists(path) else 0
+                if offset + length <= sizes[segment]:
+                    self._index[key] = (segment, offset, length)
+                    self._segment = max(self._segment, segment)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating it on first use"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
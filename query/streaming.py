@@ -0,0 +1,135 @@
+import json
+import logging
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ijson picks its fastest backend (yajl2_c when compiled) on import
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(body: bytes) -> Dict[str, Any]:
+    """Decode a whole response body, with orjson when available"""
+    return orjson.loads(body) if orjson else json.loads(body)
+
+
+class _RowCollector:
+    """Assemble the rows of data.<entity> from ijson parse events"""
+
+    def __init__(self, entity: str):
+        self.item_prefix = f"data.{entity}.item"
+        self.builder = None
+        self.errors: List[str] = []
+
+    def feed(self, prefix: str, event: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Consume one parse event, return a row once it is complete"""
+        if self.builder is not None:
+            self.builder.event(event, value)
+            if prefix == self.item_prefix and event == 'end_map':
+                row, self.builder = self.builder.value, None
+                return row
+        elif prefix == self.item_prefix and event == 'start_map':
+            self.builder = ijson.ObjectBuilder()
+            self.builder.event(event, value)
+        elif prefix == 'errors.item.message':
+            self.errors.append(value)
+        return None
+
+    def raise_for_errors(self):
+        if self.errors:
+            raise ValueError(f"GraphQL errors in streamed response: {self.errors}")
+
+
+def iter_rows(stream, entity: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of data.<entity> from a response body while it is being read.
+
+    Args:
+        stream: File-like object returning the (decompressed) response body
+        entity: Root field of the response, such as 'transactions'
+    """
+    if ijson is None:
+        response = loads(stream.read())
+        if response.get('errors'):
+            raise ValueError(f"GraphQL errors in response: {response['errors']}")
+        yield from (response.get('data') or {}).get(entity) or []
+        return
+
+    collector = _RowCollector(entity)
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        row = collector.feed(prefix, event, value)
+        if row is not None:
+            yield row
+    collector.raise_for_errors()
+
+
+async def iter_rows_async(stream, entity: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the rows of data.<entity> from an aiohttp response body while it is being received.
+
+    Args:
+        stream: aiohttp StreamReader of the response body
+        entity: Root field of the response, such as 'transactions'
+    """
+    if ijson is None:
+        response = loads(await stream.read())
+        if response.get('errors'):
+            raise ValueError(f"GraphQL errors in response: {response['errors']}")
+        for row in (response.get('data') or {}).get(entity) or []:
+            yield row
+        return
+
+    collector = _RowCollector(entity)
+    async for prefix, event, value in ijson.parse_async(stream, use_float=True):
+        row = collector.feed(prefix, event, value)
+        if row is not None:
+            yield row
+    collector.raise_for_errors()
+
+
+class PageTracker:
+    """Pass rows through while counting them and remembering the keyset cursor of the last one"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+        self.cursor: Optional[Tuple[int, str]] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in self.rows:
+            self.count += 1
+            self.cursor = (int(row['timestamp']), row['id'])
+            yield row
+
+
+class TeeReader:
+    """Pass a response body through to the decoder while keeping a copy of the raw bytes"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks: List[bytes] = []
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.chunks.append(data)
+        return data
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.chunks)
+
+
+class AsyncTeeReader(TeeReader):
+    """TeeReader for an aiohttp StreamReader"""
+
+    async def read(self, size: int = -1) -> bytes:
+        data = await self.stream.read(size)
+        self.chunks.append(data)
+        return data
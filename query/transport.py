@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import Settings
+from .rate_limiter import RateLimiter, get_rate_limiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Only advertise brotli when urllib3 is able to decode it
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HTTPTransport:
+    """Keep-alive HTTP session shared by every querier talking to the subgraph gateway"""
+
+    def __init__(
+        self,
+        pool_size: int = Settings.HTTP_POOL_SIZE,
+        connect_timeout: float = Settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = Settings.HTTP_READ_TIMEOUT,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Initialize the transport
+
+        Args:
+            pool_size: Maximum number of kept-alive connections per host
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the server to send a response
+            limiter: Rate limiter shared with the other transports
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.limiter = limiter or get_rate_limiter()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        })
+        logger.info(f"Initialized HTTPTransport with pool size {pool_size}, timeouts {self.timeout}")
+
+    def post(self, url: str, json: Dict[str, Any], dex_id: Optional[str] = None, **kwargs) -> requests.Response:
+        """POST a JSON body over a pooled connection once the rate limiter lets it through"""
+        self.limiter.acquire(dex_id)
+        started = time.monotonic()
+        status, retry_after = None, None
+        try:
+            response = self.session.post(url, json=json, timeout=self.timeout, **kwargs)
+            status, retry_after = response.status_code, parse_retry_after(response.headers.get("Retry-After"))
+            return response
+        finally:
+            self.limiter.release(status, time.monotonic() - started, retry_after)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        Report connection reuse across all host pools.
+
+        Returns:
+            dict: requests sent, connections opened and requests served by a reused connection
+        """
+        total_requests, total_connections = 0, 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                # Pool was evicted while we were iterating
+                continue
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+        return {
+            "requests": total_requests,
+            "connections_opened": total_connections,
+            "connections_reused": max(total_requests - total_connections, 0),
+        }
+
+    def close(self):
+        """Close the session and all pooled connections"""
+        self.session.close()
+
+
+_transport: Optional[HTTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Return the process-wide HTTP transport, creating it on first use"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HTTPTransport()
+    return _transport
+
+
+class AsyncHTTPTransport:
+    """aiohttp session shared by every querier running on the event loop"""
+
+    def __init__(
+        self,
+        pool_size: int = Settings.HTTP_POOL_SIZE,
+        connect_timeout: float = Settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = Settings.HTTP_READ_TIMEOUT,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Initialize the transport
+
+        Args:
+            pool_size: Maximum number of kept-alive connections per host
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the server to send a response
+            limiter: Rate limiter bounding the requests in flight across all queriers
+        """
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.limiter = limiter or get_rate_limiter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests_sent = 0
+        self.in_flight = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        logger.info(f"Initialized AsyncHTTPTransport with pool size {pool_size}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the session lazily, it has to be bound to the running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count new and reused connections through aiohttp request tracing"""
+        async def on_connection_create_end(session, context, params):
+            self.connections_opened += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def post_json(self, url: str, json: Dict[str, Any], dex_id: Optional[str] = None) -> Dict[str, Any]:
+        """POST a JSON body and return the decoded JSON response"""
+        async with self.stream(url, json, dex_id) as response:
+            return await response.json(content_type=None)
+
+    async def post_raw(self, url: str, json: Dict[str, Any], dex_id: Optional[str] = None) -> bytes:
+        """POST a JSON body and return the undecoded (decompressed) response body"""
+        async with self.stream(url, json, dex_id) as response:
+            return await response.read()
+
+    @asynccontextmanager
+    async def stream(self, url: str, json: Dict[str, Any], dex_id: Optional[str] = None):
+        """POST a JSON body once the rate limiter lets it through and yield the response before its body has been read"""
+        session = self._get_session()
+        await self.limiter.acquire_async(dex_id)
+        self.in_flight += 1
+        self.requests_sent += 1
+        started = time.monotonic()
+        released = False
+        try:
+            async with session.post(url, json=json) as response:
+                self.limiter.release(
+                    response.status,
+                    time.monotonic() - started,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+                released = True
+                response.raise_for_status()
+                yield response
+        finally:
+            if not released:
+                self.limiter.release(None, time.monotonic() - started)
+            self.in_flight -= 1
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Report requests sent, currently in flight and connection reuse"""
+        return {
+            "requests": self.requests_sent,
+            "in_flight": self.in_flight,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+        }
+
+    async def close(self):
+        """Close the session and all pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+_async_transport: Optional[AsyncHTTPTransport] = None
+
+
+def get_async_transport() -> AsyncHTTPTransport:
+    """Return the process-wide async HTTP transport, creating it on first use"""
+    global _async_transport
+    if _async_transport is None:
+        _async_transport = AsyncHTTPTransport()
+    return _async_transport
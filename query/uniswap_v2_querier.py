@@ -1,32 +1,29 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .base_querier import BaseQuerier
+from .pool_cache import PoolCache
 from .queries import get_uniswap_v2_query, get_uniswap_v2_tokens_query
 
 class UniswapV2Querier(BaseQuerier):
-    def __init__(self, url: str):
-        super().__init__(url)
+    POOL_ENTITY = 'pair'
+
+    def __init__(
+        self,
+        url: str,
+        fields: List[str],
+        pool_fields: List[str],
+        pool_cache: Optional[PoolCache] = None,
+        event_fields: Optional[Dict[str, List[str]]] = None,
+        dex_id: Optional[str] = None
+    ):
+        super().__init__(url, fields, pool_fields, pool_cache, event_fields, dex_id=dex_id)
+        self._query = get_uniswap_v2_query(fields)
         self.logger = logging.getLogger(__name__)
         self.logger.debug("Initialized UniswapV2Querier...")
 
-    def get_transactions(self, start_timestamp: int, end_timestamp: int, skip: int = 0) -> Dict[str, Any]:
+    def _transactions_query(self) -> str:
+        return self._query
 
-        variables = {
-            "startTimestamp": start_timestamp,
-            "endTimestamp": end_timestamp,
-            "skip": skip
-        }
-        try:
-            response = self._send_query(get_uniswap_v2_query(), variables)
-            self.logger.debug(
-                f"Retrieved {len(response.get('data', {}).get('transactions', []))} "
-                f"transactions between {start_timestamp} and {end_timestamp}"
-            )
-            return response
-        except Exception as e:
-            self.logger.error(f"Error getting transactions: {str(e)}", exc_info=True)
-            raise
-    
     def get_tokens(self, skip: int = 0) -> Dict[str, Any]:
         """
         Get tokens from the specified DEX subgraph
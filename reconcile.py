@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from database import Database
+from config.settings import Settings
+from factory.pipeline_factory import PipelineFactory
+from pipelines.process_pool import close_process_pool
+from pipelines.reconciler import Reconciler
+from query.transport import get_async_transport
+
+logging.basicConfig(
+    filename='maintenance.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refetch the minutes whose stored events fall short of the subgraph, from the last checkpoint")
+    parser.add_argument("--dex", action="append", help="DEX to reconcile, all of DEXES by default")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Start when a DEX has no checkpoint yet, defaults to one day ago")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    try:
+        db = Database(Settings.POSTGRES_CONFIG)
+        default_start = int(args.start.timestamp()) if args.start else None
+        for dex_id, pipeline in PipelineFactory.load_pipelines(db, args.dex or Settings.DEXES).items():
+            totals = await Reconciler(pipeline).run_once(default_start)
+            print(
+                f"{dex_id}: {totals['windows']} windows checked, {totals['gaps']} gaps, "
+                f"{totals['minutes']} minutes and {totals['events_refetched']} events refetched"
+            )
+    finally:
+        await get_async_transport().close()
+        close_process_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+from database import Database
+from config.settings import Settings
+from factory.pipeline_factory import PipelineFactory
+from pipelines.dead_letters import get_dead_letter_store
+from pipelines.process_pool import close_process_pool
+from query.transport import get_async_transport
+
+logging.basicConfig(
+    filename='maintenance.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Store the pages that were dead-lettered after failing their retries")
+    parser.add_argument("--dex", help="Only replay the letters of this DEX")
+    parser.add_argument("--list", action="store_true", help="List the letters instead of replaying them")
+    return parser.parse_args()
+
+
+async def replay(db, dex_id=None):
+    """
+    Replay the dead letters oldest first, removing the ones that are stored
+
+    Returns:
+        tuple[int, int]: letters replayed and letters that failed again
+    """
+    store = get_dead_letter_store()
+    pipelines = {}
+    replayed, failed = 0, 0
+    for letter in store.list(dex_id):
+        try:
+            pipeline = pipelines.get(letter.dex_id)
+            if pipeline is None:
+                pipeline = pipelines[letter.dex_id] = PipelineFactory.get_pipeline(letter.dex_id, db)
+                # Letters lie behind the live watermark
+                pipeline.track_watermark = False
+            events = await pipeline.replay_dead_letter_async(letter)
+            store.remove(letter.id)
+            replayed += 1
+            logger.info(f"Replayed dead letter {letter.id}: {events} events")
+        except Exception as e:
+            failed += 1
+            letter.attempts += 1
+            letter.error = str(e)
+            store.put(letter)
+            logger.error(f"Replaying dead letter {letter.id} failed: {e}", exc_info=True)
+    return replayed, failed
+
+
+async def main():
+    args = parse_args()
+    if args.list:
+        for letter in get_dead_letter_store().list(args.dex):
+            payload = "with payload" if letter.payload is not None else "to refetch"
+            print(
+                f"{letter.id}: {letter.stage} of {letter.event_type or 'transactions'} "
+                f"{letter.start_timestamp}-{letter.end_timestamp} after {letter.cursor}, {payload}, "
+                f"{letter.attempts} failed replays: {letter.error}"
+            )
+        return
+
+    try:
+        replayed, failed = await replay(Database(Settings.POSTGRES_CONFIG), args.dex)
+        print(f"Replayed {replayed} dead letters, {failed} failed again")
+    finally:
+        await get_async_transport().close()
+        close_process_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
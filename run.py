@@ -1,9 +1,12 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
 from database import Database
 from config.settings import Settings
 from factory.pipeline_factory import PipelineFactory
+from pipelines.ingestion import ingest
+from pipelines.process_pool import close_process_pool
+from pipelines.reconciler import Reconciler
+from query.transport import get_async_transport
 
 logging.basicConfig(
     filename='maintenance.log',
@@ -13,56 +16,31 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-QUERY_INTERVAL = int(Settings.QUERY_INTERVAL)
 
-
-async def run_pipeline(pipeline, start_time, end_time):
-    """
-    Run the pipeline for a given time range asynchronously
-    """
-    try:
-        logger.info(f"Starting pipeline for {pipeline.dexId} from {start_time} to {end_time}")
-        stats = await asyncio.to_thread(pipeline.process_time_range, start_time, end_time)
-        logger.info(
-            f"Pipeline completed: {stats['transactions_processed']} transactions, "
-            f"{stats['events_processed']} events."
-        )
-    except Exception as e:
-        logger.error(f"Error in pipeline {pipeline.__class__.__name__}: {e}", exc_info=True)
-
-async def initial_query(pipelines):
+async def reconcile_loop(db):
     """
-    Query data for the previous day for all pipelines
+    Refetch the minutes the stored events fall short of the subgraph at regular intervals
     """
-    start_time = datetime.now() - timedelta(days=1)
-    end_time = datetime.now()
-    logger.info(f"Starting initial query for the previous day: {start_time.date()} to {end_time.date()}")
-
-    tasks = []
-    for pipeline in pipelines.values():
-        tasks.append(run_pipeline(pipeline, start_time, end_time))
-
-    # Run all initial queries concurrently
-    await asyncio.gather(*tasks)
-    logger.info("Initial query completed.")
-
-async def query_loop(pipelines):
+    # Dedicated pipelines, reconciliation must not move the live watermarks
+    reconcilers = [Reconciler(pipeline) for pipeline in PipelineFactory.load_pipelines(db, Settings.DEXES).values()]
+    while True:
+        for reconciler in reconcilers:
+            try:
+                await reconciler.run_once()
+            except Exception as e:
+                logger.error(f"Error reconciling {reconciler.dex_id}: {e}", exc_info=True)
+        await asyncio.sleep(Settings.RECONCILE_INTERVAL.total_seconds())
+
+async def partition_loop(db):
     """
-    Continuously query data at regular intervals
+    Provision the partitions of the coming months at regular intervals, so inserts never create them
     """
     while True:
-        start_time = datetime.now() - timedelta(seconds=int(QUERY_INTERVAL * 1.5))
-        end_time = datetime.now()
-
-        tasks = []
-        for pipeline in pipelines.values():
-            tasks.append(run_pipeline(pipeline, start_time, end_time))
-
-        # Run all pipelines concurrently
-        await asyncio.gather(*tasks)
-
-        logger.info(f"Sleeping for {QUERY_INTERVAL} seconds...")
-        await asyncio.sleep(QUERY_INTERVAL)
+        await asyncio.sleep(Settings.PARTITION_MAINTENANCE_INTERVAL.total_seconds())
+        try:
+            await asyncio.to_thread(db.provision_partitions)
+        except Exception as e:
+            logger.error(f"Error provisioning partitions: {e}", exc_info=True)
 
 async def query_tokens(pipelines):
     """
@@ -91,12 +69,11 @@ async def main():
 
         logger.info(f"Loaded pipelines for DEXes: {', '.join(pipelines.keys())}")
 
-        # Run initial query for the previous day
-        await asyncio.gather(
-            initial_query(pipelines),
-            query_loop(pipelines),
-            query_tokens(pipelines),
-        )
+        # Catch up from the watermarks, then keep following the subgraphs
+        tasks = [ingest(pipelines), query_tokens(pipelines), partition_loop(db)]
+        if Settings.RECONCILE:
+            tasks.append(reconcile_loop(db))
+        await asyncio.gather(*tasks)
         
     except KeyboardInterrupt:
         logger.warning("Received KeyboardInterrupt. Shutting down...") 
@@ -105,6 +82,10 @@ async def main():
         logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
         raise
 
+    finally:
+        await get_async_transport().close()
+        close_process_pool()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Settings reads the DEXes at import, the modules under test do not use them
+os.environ.setdefault('DEXES', 'uniswap_v3')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The factories and pipelines import each other, load them in the order the entry points do
+import factory  # noqa: E402,F401
@@ -0,0 +1,87 @@
+from query.batcher import QueryBatch
+from query.queries import build_events_query
+
+TRANSACTIONS_QUERY = """
+query GetTransactions($cursorTimestamp: Int!, $endTimestamp: Int!) {
+    transactions(where: { timestamp_gt: $cursorTimestamp, timestamp_lte: $endTimestamp }) {
+        id
+        swaps { id }
+    }
+}
+"""
+
+POOLS_QUERY = """
+query {
+    top: pools(first: 5) { id }
+    token_days { id }
+}
+"""
+
+
+def build_batch():
+    batch = QueryBatch()
+    assert batch.add(TRANSACTIONS_QUERY, {"cursorTimestamp": 10, "endTimestamp": 20}) == 0
+    assert batch.add(POOLS_QUERY, {}) == 1
+    return batch
+
+
+def test_root_fields_are_aliased_per_query():
+    query, _ = build_batch().build()
+
+    assert "b0_transactions: transactions(where: { timestamp_gt: $b0_cursorTimestamp" in query
+    assert "b1_top: pools(first: 5)" in query
+    assert "b1_token_days: token_days" in query
+    # Nested fields keep their names
+    assert "swaps { id }" in query
+    assert "b0_swaps" not in query
+
+
+def test_variables_are_renamed_per_query():
+    query, variables = build_batch().build()
+
+    assert query.startswith("query Batch($b0_cursorTimestamp: Int!, $b0_endTimestamp: Int!) {")
+    assert "$cursorTimestamp" not in query
+    assert variables == {"b0_cursorTimestamp": 10, "b0_endTimestamp": 20}
+
+
+def test_same_query_twice_gets_distinct_aliases():
+    batch = QueryBatch()
+    query = build_events_query("swaps", ["id", "timestamp"])
+    batch.add(query, {"cursorTimestamp": 1, "cursorId": "", "endTimestamp": 2})
+    batch.add(query, {"cursorTimestamp": 3, "cursorId": "0xa", "endTimestamp": 4})
+
+    combined, variables = batch.build()
+
+    assert "b0_swaps: swaps(" in combined and "b1_swaps: swaps(" in combined
+    assert variables == {
+        "b0_cursorTimestamp": 1, "b0_cursorId": "", "b0_endTimestamp": 2,
+        "b1_cursorTimestamp": 3, "b1_cursorId": "0xa", "b1_endTimestamp": 4,
+    }
+
+
+def test_split_round_trips_responses():
+    batch = build_batch()
+    transactions = [{"id": "0x1", "swaps": []}]
+    pools = [{"id": "0xp"}]
+
+    responses = batch.split({"data": {
+        "b0_transactions": transactions,
+        "b1_top": pools,
+        "b1_token_days": [],
+    }})
+
+    assert responses == [
+        {"data": {"transactions": transactions}},
+        {"data": {"top": pools, "token_days": []}},
+    ]
+
+
+def test_split_routes_errors_by_path():
+    batch = build_batch()
+    owned = {"message": "bad pools", "path": ["b1_top"]}
+    shared = {"message": "indexer unavailable"}
+
+    responses = batch.split({"data": None, "errors": [owned, shared]})
+
+    assert responses[0] == {"data": {}, "errors": [shared]}
+    assert responses[1] == {"data": {}, "errors": [owned, shared]}
@@ -0,0 +1,54 @@
+import pytest
+from factory.querier_factory import QuerierFactory
+
+
+@pytest.fixture
+def querier(monkeypatch):
+    querier = QuerierFactory.get_querier('uniswap_v3')
+    querier.sent = []
+    querier.response = {"data": {"transactions": [], "swaps": []}}
+
+    def send_query(query, variables):
+        querier.sent.append((query, variables))
+        return querier.response
+
+    monkeypatch.setattr(querier, "_send_query", send_query)
+    return querier
+
+
+def test_first_page_starts_at_the_window_start(querier):
+    querier.get_transactions(100, 200)
+
+    query, variables = querier.sent[0]
+    assert variables == {"cursorTimestamp": 100, "cursorId": "", "endTimestamp": 200}
+    assert "{ timestamp: $cursorTimestamp, id_gt: $cursorId }" in query
+    assert "{ timestamp_gt: $cursorTimestamp, timestamp_lte: $endTimestamp }" in query
+    assert "orderBy: timestamp" in query
+
+
+def test_next_page_continues_after_the_cursor(querier):
+    querier.get_transactions(100, 200, cursor=(150, "0xb"))
+
+    assert querier.sent[0][1] == {"cursorTimestamp": 150, "cursorId": "0xb", "endTimestamp": 200}
+
+
+def test_event_pages_use_the_same_cursor_variables(querier):
+    querier.get_events('swaps', 100, 200, cursor=(150, "0xb"))
+
+    query, variables = querier.sent[0]
+    assert "swaps(" in query
+    assert variables == {"cursorTimestamp": 150, "cursorId": "0xb", "endTimestamp": 200}
+
+
+def test_cursor_is_the_last_row_of_a_page(querier):
+    rows = [{"id": "0xa", "timestamp": "150"}, {"id": "0xc", "timestamp": "151"}]
+
+    assert querier.get_cursor(rows) == (151, "0xc")
+    assert querier.get_cursor([]) is None
+
+
+def test_graphql_errors_fail_the_page(querier):
+    querier.response = {"data": None, "errors": [{"message": "indexer unavailable"}]}
+
+    with pytest.raises(ValueError, match="indexer unavailable"):
+        querier.get_transactions(100, 200)
@@ -0,0 +1,83 @@
+import time
+from email.utils import formatdate
+import pytest
+from query import rate_limiter
+from query.rate_limiter import RateLimiter, backoff_delay, parse_retry_after
+
+
+def make_limiter(**kwargs):
+    options = dict(rate=10.0, burst=5, initial_concurrency=4, max_concurrency=8, target_latency=1.0, weights={})
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def send(limiter, status=200, latency=0.1, retry_after=None):
+    limiter.acquire()
+    limiter.release(status, latency, retry_after)
+
+
+def test_backoff_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+
+    assert [backoff_delay(attempt, base=1.0, cap=10.0) for attempt in range(1, 6)] == [1, 2, 4, 8, 10]
+
+
+def test_backoff_delay_is_jittered():
+    delays = [backoff_delay(3, base=1.0) for _ in range(200)]
+
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+
+
+def test_throttling_halves_the_limits_and_pauses():
+    limiter = make_limiter()
+
+    send(limiter, status=429, retry_after=30)
+
+    assert limiter.concurrency == 2
+    assert limiter.rate == 5
+    assert limiter.throttled == 1
+    ticket = limiter._enqueue(None)
+    assert 29 < limiter._try_grant(ticket) <= 30
+
+
+def test_burst_of_failures_backs_off_once():
+    limiter = make_limiter()
+
+    for _ in range(3):
+        send(limiter, status=503, retry_after=0)
+
+    assert limiter.concurrency == 2
+    assert limiter.errors == 3
+
+
+def test_slow_responses_shrink_the_limits_gently():
+    limiter = make_limiter()
+
+    send(limiter, latency=2.0)
+
+    assert limiter.concurrency == pytest.approx(3.6)
+    assert limiter.rate == pytest.approx(9.0)
+
+
+def test_fast_responses_recover_up_to_the_maximum():
+    limiter = make_limiter(burst=1000)
+    send(limiter, status=500, retry_after=0)
+    assert limiter.concurrency == 2
+
+    send(limiter)
+    assert limiter.concurrency == pytest.approx(2.5)
+    assert limiter.rate == pytest.approx(5.1)
+
+    for _ in range(200):
+        send(limiter)
+    assert limiter.concurrency == 8
+    assert limiter.rate == 10
+    assert limiter.get_metrics()["requests"] == 202
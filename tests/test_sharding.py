@@ -0,0 +1,95 @@
+from pipelines.sharding import Shard, ShardPlanner
+
+PAGE = 10
+
+
+def make_planner(start=0, end=999, cursor=None):
+    return ShardPlanner(start, end, page_size=PAGE, initial_width=100, min_width=10, max_width=400, cursor=cursor)
+
+
+def test_first_shard_resumes_from_cursor():
+    planner = make_planner(cursor=(0, "0xa"))
+
+    assert planner.next_shard() == Shard(0, 99, (0, "0xa"))
+    assert planner.next_shard() == Shard(100, 199)
+
+
+def test_full_page_narrows_and_splits_the_rest_of_its_window():
+    planner = make_planner()
+    shard = planner.next_shard()
+
+    planner.record_page(shard, PAGE, (40, "0x9"))
+
+    assert planner.width == 50
+    # The first half continues after the page, the second half starts fresh
+    assert planner.next_shard() == Shard(40, 69, (40, "0x9"))
+    assert planner.next_shard() == Shard(70, 99)
+    assert planner.next_shard() == Shard(100, 149)
+
+
+def test_narrow_remainder_is_paged_whole():
+    planner = make_planner()
+    shard = planner.next_shard()
+
+    planner.record_page(shard, PAGE, (85, "0x3"))
+
+    assert planner.next_shard() == Shard(85, 99, (85, "0x3"))
+    assert planner.next_shard() == Shard(100, 149)
+
+
+def test_sparse_pages_widen_up_to_max_width():
+    planner = make_planner(end=10000)
+    for _ in range(4):
+        planner.record_page(planner.next_shard(), 0, None)
+
+    assert planner.width == 400
+    assert planner.next_shard() == Shard(1100, 1499)
+
+
+def test_range_is_handed_out_once():
+    planner = make_planner(end=249)
+    shards = []
+    while (shard := planner.next_shard()) is not None:
+        shards.append(shard)
+        planner.record_page(shard, PAGE - 1, (shard.end, "0x1"))
+
+    covered = [second for shard in shards for second in range(shard.start, shard.end + 1)]
+    assert covered == list(range(250))
+
+
+def test_watermark_waits_for_earlier_windows():
+    planner = make_planner()
+    first, second = planner.next_shard(), planner.next_shard()
+
+    planner.record_page(second, 3, (150, "0x2"))
+    assert planner.watermark is None
+
+    planner.record_page(first, 3, (50, "0x1"))
+    assert planner.watermark == (150, "0x2")
+
+
+def test_watermark_hands_off_to_the_rest_of_a_full_window():
+    planner = make_planner()
+    first = planner.next_shard()
+
+    planner.record_page(first, PAGE, (40, "0x9"))
+    assert planner.watermark == (40, "0x9")
+
+    # The second half of the window is still open
+    rest = planner.next_shard()
+    planner.record_page(rest, 2, (60, "0x4"))
+    assert planner.watermark == (60, "0x4")
+
+    planner.record_page(planner.next_shard(), 1, (80, "0x5"))
+    assert planner.watermark == (80, "0x5")
+
+
+def test_watermark_stops_before_a_failed_window():
+    planner = make_planner()
+    first, second, third = planner.next_shard(), planner.next_shard(), planner.next_shard()
+
+    planner.record_page(first, 3, (50, "0x1"))
+    planner.record_page(second, 0, None, failed=True)
+    planner.record_page(third, 3, (250, "0x3"))
+
+    assert planner.watermark == (50, "0x1")